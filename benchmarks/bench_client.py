@@ -0,0 +1,93 @@
+import torch
+
+import payloads
+from harness import ReplayServer, benchmark
+from pymilldb import ClientMetrics, GraphWalker, NodeIterator, Sampler, TensorStore
+from pymilldb.protocol import RequestType
+
+
+def _replay(stack, responses) -> "ReplayServer":
+    server = ReplayServer(responses)
+    stack.callback(server.close)
+    return server
+
+
+def _register_recv(label: str, name: str) -> None:
+    # Frame reassembly alone, the response is not decoded
+    @benchmark(f"MDBClient._recv[{label}]")
+    def _(stack):
+        data = payloads.load(name)
+        client = _replay(stack, {RequestType.TENSOR_STORE_MULTI_GET: data}).connect()
+        return lambda: client._request(RequestType.TENSOR_STORE_MULTI_GET, b""), len(data)
+
+
+for _label, _name in [("1 frame", "node"), ("16 MiB", "multi_get_4096x1024")]:
+    _register_recv(_label, _name)
+
+
+@benchmark("Sampler.subgraph[100k edges]")
+def _(stack):
+    data = payloads.load("subgraph_100k")
+    sampler = Sampler(_replay(stack, {RequestType.SAMPLER_SUBGRAPH: data}).connect())
+    return lambda: sampler.subgraph(2000, [15, 5]), len(data)
+
+
+@benchmark("GraphWalker.get_node")
+def _(stack):
+    data = payloads.load("node")
+    walker = GraphWalker(_replay(stack, {RequestType.GRAPH_WALKER_GET_NODE: data}).connect())
+    return lambda: walker.get_node("Q0"), len(data)
+
+
+@benchmark("GraphWalker.get_node[metrics]")
+def _(stack):
+    data = payloads.load("node")
+    client = _replay(stack, {RequestType.GRAPH_WALKER_GET_NODE: data}).connect()
+    client.metrics = ClientMetrics()
+    walker = GraphWalker(client)
+    return lambda: walker.get_node("Q0"), len(data)
+
+
+@benchmark("GraphWalker.get_edges[10k]")
+def _(stack):
+    data = payloads.load("edges_10k")
+    walker = GraphWalker(_replay(stack, {RequestType.GRAPH_WALKER_GET_EDGES: data}).connect())
+    return lambda: walker.get_edges("Q0", "outgoing"), len(data)
+
+
+@benchmark("NodeIterator.__next__[1M]")
+def _(stack):
+    data = payloads.load("node_batch_1m")
+    server = _replay(
+        stack,
+        {
+            RequestType.NODE_ITERATOR_CREATE: payloads.load("node_iterator_create"),
+            RequestType.NODE_ITERATOR_BEGIN: b"",
+            RequestType.NODE_ITERATOR_NEXT: data,
+        },
+    )
+    iterator = iter(stack.enter_context(NodeIterator(server.connect(), 1_000_000)))
+    return lambda: next(iterator), len(data)
+
+
+def _register_multi_get(num_keys: int, tensor_size: int, preallocated: bool) -> None:
+    @benchmark(f"TensorStore.multi_get[{num_keys}x{tensor_size}{' out' if preallocated else ''}]")
+    def _(stack):
+        data = payloads.load(f"multi_get_{num_keys}x{tensor_size}")
+        server = _replay(
+            stack,
+            {
+                RequestType.TENSOR_STORE_OPEN: payloads.load(f"tensor_store_open_{tensor_size}"),
+                RequestType.TENSOR_STORE_MULTI_GET: data,
+                RequestType.TENSOR_STORE_CLOSE: b"",
+            },
+        )
+        store = stack.enter_context(TensorStore(server.connect(), f"bench{tensor_size}"))
+        keys = list(range(num_keys))
+        out = torch.empty(num_keys, tensor_size) if preallocated else None
+        return lambda: store.multi_get(keys, out=out), len(data)
+
+
+for _num_keys, _tensor_size in payloads.MULTI_GET_SHAPES[:2]:
+    _register_multi_get(_num_keys, _tensor_size, False)
+_register_multi_get(*payloads.MULTI_GET_SHAPES[1], True)
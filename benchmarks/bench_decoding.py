@@ -0,0 +1,68 @@
+import payloads
+from harness import benchmark
+from pymilldb import graph, node_iterator, packer, tensor_store
+from pymilldb.stand_in_server import _pack_properties
+
+_VALUES = [True, -12345, 0.5, "charlie"]
+
+
+@benchmark("graph._unpack_properties[1k]")
+def _(stack):
+    properties = {f"prop{i}": _VALUES[i % len(_VALUES)] for i in range(1_000)}
+    data = _pack_properties(properties)
+    return lambda: graph._unpack_properties(data, 0), len(data)
+
+
+@benchmark("graph._unpack_node")
+def _(stack):
+    data = payloads.load("node")
+    return lambda: graph._unpack_node(data, "Q0"), len(data)
+
+
+@benchmark("graph._unpack_edges[10k]")
+def _(stack):
+    data = payloads.load("edges_10k")
+    return lambda: graph._unpack_edges(data), len(data)
+
+
+@benchmark("graph._unpack_edge_table[10k]")
+def _(stack):
+    data = payloads.load("edges_10k")
+    return lambda: graph._unpack_edge_table(data), len(data)
+
+
+@benchmark("node_iterator._unpack_batch[1M]")
+def _(stack):
+    data = payloads.load("node_batch_1m")
+    return lambda: node_iterator._unpack_batch(data), len(data)
+
+
+@benchmark("node_iterator._unpack_batch_array[1M]")
+def _(stack):
+    data = payloads.load("node_batch_1m")
+    return lambda: node_iterator._unpack_batch_array(data), len(data)
+
+
+@benchmark("GraphSample.local_edge_index[100k]")
+def _(stack):
+    data = payloads.load("subgraph_100k")
+    sample = packer.unpack_graph(data)
+
+    def op():
+        # The relabeling is cached by the sample
+        sample._local_edge_index = None
+        return sample.local_edge_index
+
+    return op, 16 * sample.num_edges
+
+
+def _register_multi_get(num_keys: int, tensor_size: int) -> None:
+    # The decoding done by `TensorStore.multi_get`
+    @benchmark(f"tensor_store._unpack_tensor[{num_keys}x{tensor_size}]")
+    def _(stack):
+        data = payloads.load(f"multi_get_{num_keys}x{tensor_size}")
+        return lambda: tensor_store._unpack_tensor(data).reshape(num_keys, tensor_size), len(data)
+
+
+for _num_keys, _tensor_size in payloads.MULTI_GET_SHAPES[:2]:
+    _register_multi_get(_num_keys, _tensor_size)
@@ -0,0 +1,65 @@
+import numpy as np
+import torch
+
+import payloads
+from harness import benchmark
+from pymilldb import packer
+
+
+def _ids(num_ids: int) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 2**62, num_ids, dtype=np.int64)
+
+
+def _register_ids(label: str, num_ids: int) -> None:
+    @benchmark(f"packer.pack_uint64_vector[list {label}]")
+    def _(stack):
+        ids = _ids(num_ids).tolist()
+        return lambda: packer.pack_uint64_vector(ids), 8 * num_ids
+
+    @benchmark(f"packer.pack_uint64_vector[ndarray {label}]")
+    def _(stack):
+        ids = _ids(num_ids)
+        return lambda: packer.pack_uint64_vector(ids), 8 * num_ids
+
+    @benchmark(f"packer.unpack_uint64_vector[{label}]")
+    def _(stack):
+        data = packer.pack_uint64_vector(_ids(num_ids))
+        return lambda: packer.unpack_uint64_vector(data, 0, len(data)), len(data)
+
+    @benchmark(f"packer.unpack_uint64_array[{label}]")
+    def _(stack):
+        data = packer.pack_uint64_vector(_ids(num_ids))
+        return lambda: packer.unpack_uint64_array(data, 0, len(data)), len(data)
+
+
+def _register_tensors(num_rows: int, tensor_size: int) -> None:
+    label = f"{num_rows}x{tensor_size}"
+
+    @benchmark(f"packer.pack_float_vector[{label}]")
+    def _(stack):
+        tensors = torch.randn(num_rows, tensor_size)
+        return lambda: packer.pack_float_vector(tensors), 4 * tensors.numel()
+
+    @benchmark(f"packer.unpack_float_array[{label}]")
+    def _(stack):
+        data = packer.pack_float_vector(torch.randn(num_rows, tensor_size))
+        return lambda: packer.unpack_float_array(data, 0, len(data)), len(data)
+
+
+for _label, _num_ids in [("1k", 1_000), ("1M", 1_000_000)]:
+    _register_ids(_label, _num_ids)
+
+for _num_rows, _tensor_size in [(1024, 128), (1024, 1024)]:
+    _register_tensors(_num_rows, _tensor_size)
+
+
+@benchmark("packer.pack_string_vector[10k]")
+def _(stack):
+    strings = [f"Q{i}" for i in range(10_000)]
+    return lambda: packer.pack_string_vector(strings), sum(len(s) + 1 for s in strings)
+
+
+@benchmark("packer.unpack_graph[100k edges]")
+def _(stack):
+    data = payloads.load("subgraph_100k")
+    return lambda: packer.unpack_graph(data), len(data)
@@ -0,0 +1,184 @@
+import json
+import platform
+import socket
+import statistics
+import threading
+import timeit
+import tracemalloc
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import torch
+
+from pymilldb import MDBClient, packer, protocol
+from pymilldb.protocol import REQUEST_HEADER_SIZE, StatusCode
+
+# A benchmark setup receives an exit stack for its resources and returns the operation to
+# time together with the number of payload bytes processed by one call
+Setup = Callable[[ExitStack], Tuple[Callable[[], object], int]]
+
+## Registered benchmarks by name, in registration order.
+BENCHMARKS: Dict[str, Setup] = dict()
+
+
+## Decorator that registers a benchmark setup under `name`.
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name} is already registered")
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+## Server that answers every request of a type with the same recorded payload.
+#
+# It isolates the client side of a call, the socket pair and the responses framed in advance
+# leave only the framing and the decoding of `MDBClient` to be measured.
+class ReplayServer:
+    ## Constructor. `responses` maps request types to their response payloads.
+    def __init__(self, responses: Dict[protocol.RequestType, bytes]) -> None:
+        self._frames = {
+            int(request_type): protocol.pack_response(StatusCode.SUCCESS, payload)
+            for request_type, payload in responses.items()
+        }
+        self._sockets: List[socket.socket] = list()
+
+    ## Returns a `MDBClient` connected through a new socket pair.
+    def connect(self) -> MDBClient:
+        return MDBClient(sock=self.socketpair(), connect=self.socketpair)
+
+    ## Returns the client side of a new socket pair served in a background thread.
+    def socketpair(self) -> socket.socket:
+        client_sock, server_sock = socket.socketpair()
+        self._sockets.append(server_sock)
+        threading.Thread(target=self._serve, args=(server_sock,), daemon=True).start()
+        return client_sock
+
+    ## Closes every connection.
+    def close(self) -> None:
+        for sock in self._sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self._sockets = list()
+
+    def _serve(self, sock: socket.socket) -> None:
+        header = bytearray(REQUEST_HEADER_SIZE)
+        try:
+            while True:
+                if not _recv_into(sock, memoryview(header)):
+                    return
+                data = bytearray(packer.unpack_uint64(header, 1, REQUEST_HEADER_SIZE))
+                if not _recv_into(sock, memoryview(data)):
+                    return
+                frames = self._frames.get(header[0])
+                if frames is None:
+                    message = f"No recorded response for request type {header[0]}".encode("utf-8")
+                    frames = protocol.pack_response(StatusCode.EXCEPTION, message)
+                sock.sendall(frames)
+        except OSError:
+            pass
+
+
+def _recv_into(sock: socket.socket, view: memoryview) -> bool:
+    while len(view) > 0:
+        num_bytes = sock.recv_into(view)
+        if num_bytes == 0:
+            return False
+        view = view[num_bytes:]
+    return True
+
+
+## Times `op` and measures its peak allocation.
+#
+# The number of calls per sample is calibrated so that a sample takes about `min_time` seconds
+# and `repeat` samples are taken. The peak is measured with `tracemalloc` on a separate call,
+# so tracing does not slow down the timed ones. NumPy buffers are traced, torch storages are not.
+def measure(op: Callable[[], object], nbytes: int, min_time: float = 0.2, repeat: int = 5) -> dict:
+    op()
+    timer = timeit.Timer(op)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    seconds = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    median = statistics.median(seconds)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": median,
+        "min_seconds": min(seconds),
+        "ops_per_sec": 1.0 / median,
+        "mb_per_sec": nbytes / median / 1e6,
+        "bytes": nbytes,
+        "alloc_peak": peak - baseline,
+    }
+
+
+## Runs the benchmarks whose name contains any of `filters`, or every benchmark if empty.
+def run(filters: List[str], min_time: float, repeat: int, report: Callable[[str, dict], None]) -> Dict[str, dict]:
+    # glibc raises its mmap threshold after freeing a large block, from then on large buffers
+    # reuse heap memory instead of page faulting. Doing it upfront keeps every result
+    # independent of the benchmarks that ran before it
+    np.empty(16 << 20, dtype=np.uint8)
+    results = dict()
+    for name, setup in BENCHMARKS.items():
+        if filters and not any(f in name for f in filters):
+            continue
+        with ExitStack() as stack:
+            op, nbytes = setup(stack)
+            results[name] = measure(op, nbytes, min_time, repeat)
+        report(name, results[name])
+    return results
+
+
+## Environment stored along with the results, timings are only comparable on the same machine.
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+    }
+
+
+def save(path: str, results: Dict[str, dict]) -> None:
+    with open(path, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, dict]:
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+## Returns the relative change of throughput of every benchmark also found in `baseline`.
+#
+# Positive values are speedups and negative values are slowdowns.
+def compare(results: Dict[str, dict], baseline: Dict[str, dict]) -> Dict[str, float]:
+    return {
+        name: result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1.0
+        for name, result in results.items()
+        if name in baseline
+    }
+
+
+def format_bytes(num_bytes: float) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GiB"
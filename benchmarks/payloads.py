@@ -0,0 +1,98 @@
+import os
+from typing import Callable, Dict, List
+
+import torch
+
+from pymilldb import TensorStore, packer
+from pymilldb.graph import _pack_direction, _pack_node_key
+from pymilldb.protocol import RequestType
+from pymilldb.sampler import _pack_sample_request
+from pymilldb.stand_in_server import StandInServer, SyntheticGraph
+from pymilldb.tensor_store import _pack_keys
+
+## Directory where recorded payloads are kept between runs, `run.py --payloads` changes it.
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".payloads")
+
+# Dimensions and number of keys of the recorded tensor store responses
+TENSOR_SIZES = [128, 1024]
+MULTI_GET_SHAPES = [(1024, 128), (1024, 1024), (4096, 1024)]
+
+
+# Each recorder serves a synthetic graph with a `StandInServer` and returns the raw response
+# payloads of its requests by name
+def _record_sampler() -> Dict[str, bytes]:
+    with StandInServer(SyntheticGraph(num_nodes=200_000, avg_degree=16), seed=0) as server:
+        client = server.connect()
+        data, _ = client._request(RequestType.SAMPLER_SUBGRAPH, _pack_sample_request(2000, [15, 5]))
+    return {"subgraph_100k": data}
+
+
+def _record_graph_walker() -> Dict[str, bytes]:
+    # Few nodes with many edges, so a single node has about 10k edges
+    with StandInServer(SyntheticGraph(num_nodes=100, avg_degree=10_000)) as server:
+        client = server.connect()
+        node, _ = client._request(RequestType.GRAPH_WALKER_GET_NODE, _pack_node_key("Q0"))
+        edges, _ = client._request(RequestType.GRAPH_WALKER_GET_EDGES, _pack_node_key("Q0") + _pack_direction("outgoing"))
+    return {"node": node, "edges_10k": edges}
+
+
+def _record_node_iterator() -> Dict[str, bytes]:
+    with StandInServer(SyntheticGraph(num_nodes=1_000_000, avg_degree=1)) as server:
+        client = server.connect()
+        create, _ = client._request(RequestType.NODE_ITERATOR_CREATE, packer.pack_uint64(1_000_000))
+        client._request(RequestType.NODE_ITERATOR_BEGIN, create)
+        batch, _ = client._request(RequestType.NODE_ITERATOR_NEXT, create)
+    return {"node_iterator_create": create, "node_batch_1m": batch}
+
+
+def _record_tensor_store() -> Dict[str, bytes]:
+    generator = torch.Generator().manual_seed(0)
+    payloads = dict()
+    with StandInServer() as server:
+        client = server.connect()
+        for tensor_size in TENSOR_SIZES:
+            name = f"bench{tensor_size}"
+            TensorStore.create(client, name, tensor_size)
+            data, _ = client._request(RequestType.TENSOR_STORE_OPEN, packer.pack_string(name))
+            payloads[f"tensor_store_open_{tensor_size}"] = data
+            num_keys = max(n for n, size in MULTI_GET_SHAPES if size == tensor_size)
+            with TensorStore(client, name) as store:
+                store.multi_insert(list(range(num_keys)), torch.randn(num_keys, tensor_size, generator=generator))
+        for num_keys, tensor_size in MULTI_GET_SHAPES:
+            handle = payloads[f"tensor_store_open_{tensor_size}"][:8]
+            msg = handle + _pack_keys(list(range(num_keys)))
+            data, _ = client._request(RequestType.TENSOR_STORE_MULTI_GET, msg)
+            payloads[f"multi_get_{num_keys}x{tensor_size}"] = data
+    return payloads
+
+
+_RECORDERS: List[Callable[[], Dict[str, bytes]]] = [
+    _record_sampler,
+    _record_graph_walker,
+    _record_node_iterator,
+    _record_tensor_store,
+]
+
+
+## Records every payload into `directory`, replacing the existing ones.
+def record() -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    names = list()
+    for recorder in _RECORDERS:
+        for name, data in recorder().items():
+            with open(os.path.join(directory, f"{name}.bin"), "wb") as file:
+                file.write(data)
+            names.append(name)
+    return names
+
+
+## Returns a recorded payload, recording every payload first if it is missing.
+#
+# Payloads are plain response bodies, so they can be replaced by responses captured from a
+# real server under the same names.
+def load(name: str) -> bytes:
+    path = os.path.join(directory, f"{name}.bin")
+    if not os.path.exists(path):
+        record()
+    with open(path, "rb") as file:
+        return file.read()
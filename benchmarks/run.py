@@ -0,0 +1,76 @@
+"""Client-side microbenchmarks of PyMillDB.
+
+Measures the encoding, framing and decoding done by the client, without a database:
+responses are recorded once from the stand-in server and replayed, either to the decoding
+functions directly or to the public classes through a local socket pair.
+
+    python benchmarks/run.py                          # run everything
+    python benchmarks/run.py -k unpack_graph -k _recv # run a subset
+    python benchmarks/run.py --save baseline.json     # keep the results
+    python benchmarks/run.py --compare baseline.json  # fail on regressions
+
+Timings are only comparable between runs on the same machine.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+import harness  # noqa: E402
+import payloads  # noqa: E402
+
+# Registration order is the reporting order
+import bench_packer  # noqa: E402, F401, I001
+import bench_decoding  # noqa: E402, F401
+import bench_client  # noqa: E402, F401
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Client-side microbenchmarks of PyMillDB")
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="run benchmarks whose name contains this")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing sample")
+    parser.add_argument("--repeat", type=int, default=5, help="timing samples per benchmark")
+    parser.add_argument("--payloads", default=payloads.directory, help="directory of the recorded payloads")
+    parser.add_argument("--record", action="store_true", help="record the payloads again before running")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="slowdown reported as a regression")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in harness.BENCHMARKS:
+            print(name)
+        return 0
+
+    payloads.directory = args.payloads
+    if args.record:
+        payloads.record()
+
+    baseline = harness.load(args.compare) if args.compare is not None else dict()
+
+    def report(name: str, result: dict) -> None:
+        line = (
+            f"{name:<48} {result['ops_per_sec']:>12,.1f} ops/s {result['mb_per_sec']:>10,.1f} MB/s "
+            f"{harness.format_bytes(result['alloc_peak']):>10} peak"
+        )
+        if name in baseline:
+            change = harness.compare({name: result}, baseline)[name]
+            flag = "  REGRESSION" if change < -args.tolerance else ""
+            line += f" {change:>+8.1%}{flag}"
+        print(line, flush=True)
+
+    results = harness.run(args.filters, args.min_time, args.repeat, report)
+    if args.save is not None:
+        harness.save(args.save, results)
+
+    regressions = [name for name, change in harness.compare(results, baseline).items() if change < -args.tolerance]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
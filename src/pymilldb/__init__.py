@@ -1,19 +1,38 @@
-from .graph import (BuilderEdge, BuilderNode, GraphBuilder, GraphWalker,
-                    WalkerEdge, WalkerNode)
+from .async_mdb_client import AsyncMDBClient
+from .graph import (AsyncGraphWalker, BuilderEdge, BuilderNode, EdgeTable,
+                    GraphBuilder, GraphWalker, GraphWriter, WalkerEdge,
+                    WalkerNode)
 from .mdb_client import MDBClient
-from .node_iterator import NodeIterator
-from .sampler import Sampler
-from .tensor_store import TensorStore
+from .mdb_client_pool import MDBClientPool
+from .metrics import ClientMetrics
+from .node_iterator import AsyncNodeIterator, NodeIterator, PartitionedNodeIterator
+from .sampler import AsyncSampler, Sampler, SamplerDataset, SampleStream
+from .tensor_cache import TensorCache
+from .tensor_store import AsyncTensorStore, LocalTensorStore, TensorStore
 
 __all__ = [
     "BuilderEdge",
     "BuilderNode",
     "WalkerEdge",
     "WalkerNode",
+    "EdgeTable",
     "GraphBuilder",
+    "GraphWriter",
     "GraphWalker",
     "MDBClient",
+    "MDBClientPool",
+    "ClientMetrics",
     "NodeIterator",
+    "PartitionedNodeIterator",
     "Sampler",
+    "SamplerDataset",
+    "SampleStream",
     "TensorStore",
+    "TensorCache",
+    "LocalTensorStore",
+    "AsyncMDBClient",
+    "AsyncGraphWalker",
+    "AsyncNodeIterator",
+    "AsyncSampler",
+    "AsyncTensorStore",
 ]
@@ -0,0 +1,126 @@
+import asyncio
+import socket
+from collections import deque
+from typing import Deque, Tuple
+
+from . import decorators, packer, protocol
+
+
+## Asyncio counterpart of `MDBClient`.
+#
+# Speaks the same framing as `MDBClient` over asyncio streams. Requests are written as soon
+# as they are made and responses are matched to them in order by a background reader task,
+# so any number of coroutines can have requests in flight on the same connection.
+#
+# The async interfaces (`AsyncSampler`, `AsyncTensorStore`, `AsyncGraphWalker` and
+# `AsyncNodeIterator`) take an `AsyncMDBClient` instance.
+class AsyncMDBClient:
+    ## Constructor. The connection is opened with `connect` or by entering the context manager.
+    #
+    # When `sock` is given, the client uses that already connected socket instead of
+    # connecting to `host` and `port`.
+    def __init__(
+        self, host: str = "localhost", port: int = protocol.DEFAULT_PORT, sock: socket.socket | None = None
+    ) -> None:
+        ## Address of the server.
+        self.address = (host, port)
+
+        self._sock = sock
+        self._reader: asyncio.StreamReader = None
+        self._writer: asyncio.StreamWriter = None
+        self._reader_task: asyncio.Task = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._closed = True
+
+    ## Returns `True` if the connection with the server is closed.
+    def is_closed(self) -> bool:
+        return self._closed
+
+    ## Opens the connection with the server.
+    async def connect(self) -> "AsyncMDBClient":
+        if self._closed:
+            try:
+                if self._sock is None:
+                    self._reader, self._writer = await asyncio.open_connection(*self.address)
+                else:
+                    self._reader, self._writer = await asyncio.open_connection(sock=self._sock)
+            except ConnectionRefusedError as e:
+                raise ConnectionError(f"Couldn't connect to MillenniumDB server at {self.address}") from e
+            self._closed = False
+            self._reader_task = asyncio.get_running_loop().create_task(self._read_responses())
+        return self
+
+    ## Closes the connection with the server. Requests still in flight fail with `ConnectionError`.
+    async def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._fail_pending(ConnectionError("Connection closed by the client"))
+
+    ## Enter context manager.
+    async def __aenter__(self) -> "AsyncMDBClient":
+        return await self.connect()
+
+    ## Exit context manager.
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    # Sends a request and waits for its response
+    @decorators.check_closed
+    async def _request(self, request_type: protocol.RequestType, data: bytes) -> Tuple[bytearray, protocol.StatusCode]:
+        # The future is queued before yielding to the event loop, so responses are matched to
+        # requests in the order in which they were written
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._writer.write(packer.pack_byte(request_type) + packer.pack_uint64(len(data)))
+        self._writer.write(data)
+        await self._writer.drain()
+        return await future
+
+    async def _read_responses(self) -> None:
+        try:
+            while True:
+                # Same frame layout as `MDBClient._recv`
+                data = bytearray()
+                while True:
+                    msg = await self._reader.readexactly(protocol.BUFFER_SIZE)
+                    msg_size = int.from_bytes(msg[1:3], "little")
+                    data += memoryview(msg)[protocol.HEADER_SIZE : msg_size]
+                    if protocol.last_message(msg[0]):
+                        break
+
+                if not self._pending:
+                    raise ConnectionError("Received a response without a pending request")
+                # Decoded before taking the future, so it is failed with the others if invalid
+                error = protocol.error_status(msg[0])
+                status = protocol.decode_status(msg[0])
+                future = self._pending.popleft()
+                # The caller may have been cancelled, the response is discarded
+                if future.done():
+                    continue
+                if error:
+                    future.set_exception(Exception(data.decode("utf-8", errors="replace")))
+                else:
+                    future.set_result((data, status))
+        except Exception as e:
+            # The stream can not be read anymore, so every pending and later request fails
+            self._closed = True
+            self._writer.close()
+            if isinstance(e, (asyncio.IncompleteReadError, OSError)) and not isinstance(e, ConnectionError):
+                e = ConnectionError("Server closed the connection")
+            self._fail_pending(e)
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
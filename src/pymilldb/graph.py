@@ -1,45 +1,112 @@
-import re
-from typing import TYPE_CHECKING, Dict, List, Literal
+import gzip
+import multiprocessing
+import os
+import string
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain
+from numbers import Integral
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Literal, Mapping, Set, Tuple
 
-from . import packer
+import numpy as np
+
+from . import decorators, packer
 from .protocol import RequestType
 
 if TYPE_CHECKING:
+    from .async_mdb_client import AsyncMDBClient
     from .mdb_client import MDBClient
+    from .mdb_client_pool import MDBClientPool
 
 PropertiesDict = Dict[str, str | int | float | bool]
 
 
 def dump_properties_milldb(properties: PropertiesDict) -> str:
-    ret = ""
-    for k, v in properties.items():
-        ret += ""
-        value_type = type(v)
-        if value_type == str:
-            ret += f' {k}:"{v}"'
-        elif value_type in [int, float]:
-            ret += f" {k}:{v}"
-        elif value_type == bool:
-            ret += f" {k}:{str(v).lower()}"
-        else:
-            print(f'Skipping property with type "{value_type}". Only str, int, float and bool are supported.')
-    return ret
+    return "".join([_format_property(k, v) for k, v in properties.items()])
+
+
+# Names must match the pattern "[a-zA-Z][a-zA-Z0-9_]*" from their start, so only their first
+# character is checked
+_IDENTIFIER_START = frozenset(string.ascii_letters)
+
+# Lines formatted by a `GraphBuilder` or `GraphWriter` before they are written
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def _format_property(key: str, value: str | int | float | bool) -> str:
+    value_type = type(value)
+    if value_type == str:
+        return f' {key}:"{value}"'
+    elif value_type in [int, float]:
+        return f" {key}:{value}"
+    elif value_type == bool:
+        return f" {key}:{str(value).lower()}"
+    print(f'Skipping property with type "{value_type}". Only str, int, float and bool are supported.')
+    return ""
+
+
+# Formats the values of a str, int, float or bool property column, doing the type check of
+# `dump_properties_milldb` once for the whole column
+def _format_property_column(key: str, value_type: type, values: Iterable) -> List[str]:
+    if value_type == str:
+        return [f' {key}:"{value}"' for value in values]
+    elif value_type == bool:
+        true, false = f" {key}:true", f" {key}:false"
+        return [true if value else false for value in values]
+    return [f" {key}:{value}" for value in values]
+
+
+def _is_identifier(name: str) -> bool:
+    return str(name)[:1] in _IDENTIFIER_START
+
+
+def _skip_node(name: str) -> None:
+    print(f'Skipping node. Identifier "{name}" does not match the pattern "[a-zA-Z][a-zA-Z0-9_]*".')
+
+
+def _skip_edge(endpoint: str, name: str) -> None:
+    print(f'Skipping edge. {endpoint} identifier "{name}" does not match the pattern "[a-zA-Z][a-zA-Z0-9_]*".')
+
+
+# Opens a file for writing or appending bytes, compressed with "gzip" or "zstd". With "infer"
+# the compression is taken from the ".gz" and ".zst" extensions
+def _open_output(
+    path: str, compression: Literal["infer", "gzip", "zstd"] | None, mode: Literal["wb", "ab"] = "wb"
+) -> BinaryIO:
+    if compression == "infer":
+        compression = {".gz": "gzip", ".zst": "zstd"}.get(os.path.splitext(path)[1])
+    if compression is None:
+        return open(path, mode)
+    elif compression == "gzip":
+        return gzip.open(path, mode, compresslevel=6)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError('zstd compression requires the "zstandard" package') from e
+        return zstandard.open(path, mode)
+    raise ValueError(f'compression must be "infer", "gzip", "zstd" or None, got {compression}')
 
 
 ## MillenniumDB's Quad Model node representation in GraphBuilder class
 class BuilderNode:
+    __slots__ = ("name", "labels", "properties")
+
     def __init__(
         self,
         name: str,
-        labels: List[str] = list(),
-        properties: PropertiesDict = dict(),
+        labels: List[str] | None = None,
+        properties: PropertiesDict | None = None,
     ):
         ## Node name
         self.name: str = name
         ## Node labels
-        self.labels: List[str] = labels
+        self.labels: List[str] = list() if labels is None else labels
         ## Node properties
-        self.properties: PropertiesDict = properties
+        self.properties: PropertiesDict = dict() if properties is None else properties
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(name={self.name}, num_labels={len(self.labels)}, num_properties={len(self.properties)})"
@@ -47,12 +114,14 @@ class BuilderNode:
 
 ## MillenniumDB's Quad Model node representation in GraphWalker class
 class WalkerNode(BuilderNode):
+    __slots__ = ("node_id",)
+
     def __init__(
         self,
         node_id: int,
         name: str,
-        labels: List[str] = list(),
-        properties: PropertiesDict = dict(),
+        labels: List[str] | None = None,
+        properties: PropertiesDict | None = None,
     ):
         super().__init__(name, labels, properties)
         ## Node identifier
@@ -66,12 +135,14 @@ class WalkerNode(BuilderNode):
 #
 # Note that the source and target nodes are node names rather than identifiers
 class BuilderEdge:
+    __slots__ = ("source", "target", "edge_type", "properties")
+
     def __init__(
         self,
         source: str,
         target: str,
         edge_type: str,
-        properties: PropertiesDict = dict(),
+        properties: PropertiesDict | None = None,
     ):
         ## Source node name
         self.source = source
@@ -80,7 +151,7 @@ class BuilderEdge:
         ## Edge type
         self.edge_type = edge_type
         ## Edge properties
-        self.properties = properties
+        self.properties = dict() if properties is None else properties
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(source={self.source}, target={self.target}, edge_type={self.edge_type}, num_properties={len(self.properties)})"
@@ -90,13 +161,15 @@ class BuilderEdge:
 #
 # Note that the source and target nodes are identifiers rather than names
 class WalkerEdge(BuilderEdge):
+    __slots__ = ("edge_id",)
+
     def __init__(
         self,
         edge_id: int,
         source: int,
         target: int,
         edge_type: str,
-        propeties: PropertiesDict = dict(),
+        propeties: PropertiesDict | None = None,
     ):
         super().__init__(source, target, edge_type, propeties)
         ## Edge identifier
@@ -106,220 +179,1104 @@ class WalkerEdge(BuilderEdge):
         return f"{self.__class__.__name__}(edge_id={self.edge_id}, source={self.source}, target={self.target}, edge_type={self.edge_type}, num_properties={len(self.properties)})"
 
 
+# Typed arrays holding the property values of the columns of these types, other values are
+# kept in lists
+_PROPERTY_ARRAY_TYPECODES = {bool: "b", int: "q", float: "d"}
+
+
+# Properties of the nodes or the edges of a `GraphBuilder`, stored by column. There is a column
+# for every key and value type, holding the rows that have that property and their values
+class _PropertyColumns:
+    def __init__(self) -> None:
+        self.columns: Dict[Tuple[str, type], Tuple[array, array | list]] = dict()
+
+    def append(self, row: int, properties: PropertiesDict) -> None:
+        for key, value in properties.items():
+            rows, values = self._column(key, type(value))
+            try:
+                values.append(value)
+            except OverflowError:
+                # Integers beyond int64 go to a column of Python objects
+                rows, values = self._column(key, object)
+                values.append(value)
+            rows.append(row)
+
+    # Appends the values of a property to the increasing `rows`, with NumPy numeric and
+    # string columns appended at once
+    def extend(self, key: str, rows: np.ndarray, values: np.ndarray) -> None:
+        kind = values.dtype.kind
+        if kind == "u" and len(values) > 0 and values.max() > np.iinfo(np.int64).max:
+            kind = "O"
+        if kind in "biuf":
+            value_type = {"b": bool, "i": int, "u": int, "f": float}[kind]
+            column_rows, column_values = self._column(key, value_type)
+            column_rows.frombytes(rows.astype(np.int64).tobytes())
+            column_values.frombytes(values.astype(column_values.typecode).tobytes())
+            return
+        values = values.tolist()
+        value_types = set(map(type, values))
+        if len(value_types) == 1 and int not in value_types:
+            column_rows, column_values = self._column(key, value_types.pop())
+            column_rows.frombytes(rows.astype(np.int64).tobytes())
+            column_values.extend(values)
+            return
+        for row, value in zip(rows.tolist(), values):
+            self.append(row, {key: value})
+
+    def _column(self, key: str, value_type: type) -> Tuple[array, array | list]:
+        column = self.columns.get((key, value_type))
+        if column is None:
+            typecode = _PROPERTY_ARRAY_TYPECODES.get(value_type)
+            column = (array("q"), list() if typecode is None else array(typecode))
+            self.columns[(key, value_type)] = column
+        return column
+
+    # Rows are appended in increasing order, so each column is searched with a bisection
+    def get(self, row: int) -> PropertiesDict:
+        properties = dict()
+        for (key, value_type), (rows, values) in self.columns.items():
+            i = bisect_left(rows, row)
+            if i < len(rows) and rows[i] == row:
+                properties[key] = bool(values[i]) if value_type is bool else values[i]
+        return properties
+
+    # Returns the formatted properties of the rows from `start` to `end`, leaving out the
+    # `skipped` rows
+    def format(self, start: int, end: int, skipped: Set[int]) -> List[str]:
+        formatted = [""] * (end - start)
+        for (key, value_type), (rows, values) in self.columns.items():
+            lo = bisect_left(rows, start)
+            hi = bisect_left(rows, end, lo)
+            if lo == hi:
+                continue
+            if value_type in [str, int, float, bool]:
+                texts = _format_property_column(key, value_type, values[lo:hi])
+            else:
+                # Unsupported values are reported, so only the ones that are written are formatted
+                texts = [
+                    "" if row in skipped else _format_property(key, value)
+                    for row, value in zip(rows[lo:hi], values[lo:hi])
+                ]
+            for row, text in zip(rows[lo:hi], texts):
+                formatted[row - start] += text
+        return formatted
+
+    def memory_usage(self) -> int:
+        num_bytes = sys.getsizeof(self.columns)
+        for rows, values in self.columns.values():
+            num_bytes += sys.getsizeof(rows) + sys.getsizeof(values)
+            if isinstance(values, list):
+                num_bytes += sum(map(sys.getsizeof, values))
+        return num_bytes
+
+
+# Read-only view of a node of a `GraphBuilder`, decoded from its columns on access
+class _BuilderNodeView(BuilderNode):
+    __slots__ = ("_builder", "_row")
+
+    def __init__(self, builder: "GraphBuilder", row: int) -> None:
+        self._builder = builder
+        self._row = row
+
+    @property
+    def name(self) -> str:
+        return self._builder._names[self._builder._node_names[self._row]]
+
+    @property
+    def labels(self) -> List[str]:
+        builder, row = self._builder, self._row
+        codes = builder._node_labels[builder._node_label_offsets[row] : builder._node_label_offsets[row + 1]]
+        return [builder._labels[code] for code in codes]
+
+    @property
+    def properties(self) -> PropertiesDict:
+        return self._builder._node_properties.get(self._row)
+
+
+# Read-only view of an edge of a `GraphBuilder`, decoded from its columns on access
+class _BuilderEdgeView(BuilderEdge):
+    __slots__ = ("_builder", "_row")
+
+    def __init__(self, builder: "GraphBuilder", row: int) -> None:
+        self._builder = builder
+        self._row = row
+
+    @property
+    def source(self) -> str:
+        return self._builder._names[self._builder._edge_sources[self._row]]
+
+    @property
+    def target(self) -> str:
+        return self._builder._names[self._builder._edge_targets[self._row]]
+
+    @property
+    def edge_type(self) -> str:
+        return self._builder._edge_types[self._builder._edge_type_codes[self._row]]
+
+    @property
+    def properties(self) -> PropertiesDict:
+        return self._builder._edge_properties.get(self._row)
+
+
 ## Interface for building and dumping graphs in MillenniumDB's Quad Model format
 #
+# The graph is stored by column: node names are interned to integer ids shared by nodes and
+# edge endpoints, labels and edge types are dictionary encoded, edges are parallel integer
+# arrays and properties are kept in typed columns. `nodes` and `edges` return read-only views
+# of the stored elements, decoded when accessed.
+#
 # For more details on the format, see: https://github.com/MillenniumDB/MillenniumDB-Dev/blob/dev/doc/quad_model.md
 class GraphBuilder:
     ## Constructor.
     def __init__(self):
-        self._nodes: Dict[str, BuilderNode] = dict()
-        self._edges: List[BuilderEdge] = list()
+        # Interned names of the nodes and edge endpoints
+        self._names: List[str] = list()
+        self._name_ids: Dict[str, int] = dict()
+        # Node row of every name id, -1 for the names that were only used by edges
+        self._name_rows = array("q")
+        # Whether every name is a valid identifier, filled in when the graph is dumped
+        self._valid_names = bytearray()
+
+        # Name id of every node, and its label codes in CSR format
+        self._node_names = array("q")
+        self._node_label_offsets = array("q", [0])
+        self._node_labels = array("i")
+        self._labels: List[str] = list()
+        self._label_codes: Dict[str, int] = dict()
+        self._node_properties = _PropertyColumns()
+
+        # Name ids of the endpoints and type code of every edge
+        self._edge_sources = array("q")
+        self._edge_targets = array("q")
+        self._edge_type_codes = array("i")
+        self._edge_types: List[str] = list()
+        self._edge_type_ids: Dict[str, int] = dict()
+        self._edge_properties = _PropertyColumns()
+
+    ## Number of nodes.
+    @property
+    def num_nodes(self) -> int:
+        return len(self._node_names)
+
+    ## Number of edges.
+    @property
+    def num_edges(self) -> int:
+        return len(self._edge_sources)
 
     @property
     def nodes(self) -> List[BuilderNode]:
-        return list(self._nodes.values())
+        return [_BuilderNodeView(self, row) for row in range(self.num_nodes)]
 
     @property
     def edges(self) -> List[BuilderEdge]:
-        return self._edges
+        return [_BuilderEdgeView(self, row) for row in range(self.num_edges)]
 
     ## Add a node to the graph
     def add_node(self, node: BuilderNode):
-        if node.name in self._nodes:
+        name_id = self._intern(node.name)
+        if self._name_rows[name_id] >= 0:
             raise ValueError(f'Node "{node.name}" already exists in the graph.')
-        self._nodes[node.name] = node
+        row = len(self._node_names)
+        self._name_rows[name_id] = row
+        self._node_names.append(name_id)
+        for label in node.labels:
+            self._node_labels.append(self._label_code(label))
+        self._node_label_offsets.append(len(self._node_labels))
+        self._node_properties.append(row, node.properties)
 
     ## Add an edge to the graph
     def add_edge(self, edge: BuilderEdge):
-        self._edges.append(edge)
+        row = len(self._edge_sources)
+        self._edge_sources.append(self._intern(edge.source))
+        self._edge_targets.append(self._intern(edge.target))
+        self._edge_type_codes.append(self._edge_type_code(edge.edge_type))
+        self._edge_properties.append(row, edge.properties)
+
+    ## Adds the nodes given by columns and returns the positions of the rejected rows.
+    #
+    # Columns can be sequences, NumPy arrays, pandas Series or Arrow arrays. `labels` is either
+    # a label for every node or a column holding a label, a list of labels or `None` per node.
+    # `properties` maps property keys to columns, such as a dict, a pandas DataFrame or an
+    # Arrow Table, and `None` or NaN values leave the property out of their row. NumPy numeric
+    # values are stored as Python int, float and bool.
+    #
+    # Rows are rejected, without adding them, when their name does not match the pattern
+    # "[a-zA-Z][a-zA-Z0-9_]*", when it repeats an earlier row or when the node already
+    # exists. The checks run on whole columns, and the positions of the rejected rows are
+    # returned as an int64 array.
+    def add_nodes_from(
+        self,
+        names: Iterable[str],
+        labels: str | Iterable[str | List[str] | None] | None = None,
+        properties: Mapping[str, Iterable] | None = None,
+    ) -> np.ndarray:
+        names = _column(names, "names")
+        num_rows = len(names)
+        counts, codes = self._encode_labels(labels, num_rows)
+        properties = _property_columns(properties, num_rows)
+
+        keep = _valid_identifiers(names)
+        valid = np.flatnonzero(keep)
+        name_ids = self._intern_many(names if len(valid) == num_rows else names[valid])
+        # Only the first row of every name is kept, unless the node already exists
+        first = np.zeros(len(valid), dtype=bool)
+        first[np.unique(name_ids, return_index=True)[1]] = True
+        first &= np.frombuffer(self._name_rows, dtype=np.int64)[name_ids] < 0
+        keep[valid[~first]] = False
+        name_ids = name_ids[first]
+
+        start = len(self._node_names)
+        rows = np.arange(start, start + len(name_ids), dtype=np.int64)
+        name_rows = np.frombuffer(self._name_rows, dtype=np.int64)
+        name_rows[name_ids] = rows
+        del name_rows
+        self._node_names.frombytes(name_ids.tobytes())
+        offsets = self._node_label_offsets[-1] + np.cumsum(counts[keep], dtype=np.int64)
+        self._node_label_offsets.frombytes(offsets.tobytes())
+        self._node_labels.frombytes(codes[np.repeat(keep, counts)].tobytes())
+        for key, values in properties:
+            self._extend_properties(self._node_properties, key, rows, values[keep])
+        return np.flatnonzero(~keep)
+
+    ## Adds the edges given by columns and returns the positions of the rejected rows.
+    #
+    # Columns are given as in `add_nodes_from`, and `edge_types` is either a type for every
+    # edge or a column of types. Rows are rejected, without adding them, when their source or
+    # target does not match the pattern "[a-zA-Z][a-zA-Z0-9_]*".
+    def add_edges_from(
+        self,
+        sources: Iterable[str],
+        targets: Iterable[str],
+        edge_types: str | Iterable[str],
+        properties: Mapping[str, Iterable] | None = None,
+    ) -> np.ndarray:
+        sources = _column(sources, "sources")
+        targets = _column(targets, "targets")
+        num_rows = len(sources)
+        if len(targets) != num_rows:
+            raise ValueError(f"targets must have {num_rows} rows, got {len(targets)}")
+        if isinstance(edge_types, str):
+            type_codes = np.full(num_rows, self._edge_type_code(edge_types), dtype=np.int32)
+        else:
+            edge_types = _column(edge_types, "edge_types")
+            if len(edge_types) != num_rows:
+                raise ValueError(f"edge_types must have {num_rows} rows, got {len(edge_types)}")
+            type_codes = _encode(edge_types.tolist(), self._edge_type_code)
+        properties = _property_columns(properties, num_rows)
+
+        keep = _valid_identifiers(sources) & _valid_identifiers(targets)
+        if not keep.all():
+            sources, targets, type_codes = sources[keep], targets[keep], type_codes[keep]
+
+        start = len(self._edge_sources)
+        rows = np.arange(start, start + len(sources), dtype=np.int64)
+        endpoints = self._intern_many(np.concatenate([sources, targets]))
+        self._edge_sources.frombytes(endpoints[: len(sources)].tobytes())
+        self._edge_targets.frombytes(endpoints[len(sources) :].tobytes())
+        self._edge_type_codes.frombytes(type_codes.tobytes())
+        for key, values in properties:
+            self._extend_properties(self._edge_properties, key, rows, values[keep])
+        return np.flatnonzero(~keep)
+
+    ## Returns the approximate memory used by the graph in bytes, by component and in total.
+    #
+    # Strings are counted once, as they are interned. Computing the size of the string
+    # properties walks every one of them.
+    def memory_usage(self) -> Dict[str, int]:
+        usage = {
+            "names": sys.getsizeof(self._names)
+            + sys.getsizeof(self._name_ids)
+            + sum(map(sys.getsizeof, self._names))
+            + sys.getsizeof(self._name_rows),
+            "nodes": sys.getsizeof(self._node_names)
+            + sys.getsizeof(self._node_label_offsets)
+            + sys.getsizeof(self._node_labels)
+            + _dictionary_size(self._labels, self._label_codes),
+            "node_properties": self._node_properties.memory_usage(),
+            "edges": sys.getsizeof(self._edge_sources)
+            + sys.getsizeof(self._edge_targets)
+            + sys.getsizeof(self._edge_type_codes)
+            + _dictionary_size(self._edge_types, self._edge_type_ids),
+            "edge_properties": self._edge_properties.memory_usage(),
+        }
+        usage["total"] = sum(usage.values())
+        return usage
+
+    # Returns whether every name is a valid identifier, checking the names interned since the
+    # previous call
+    def _validate_names(self) -> bytearray:
+        names = self._names[len(self._valid_names) :]
+        self._valid_names.extend([_is_identifier(name) for name in names])
+        return self._valid_names
+
+    # Writes the nodes and edges of a shard
+    def _dump_shard(
+        self,
+        path: str,
+        compression: Literal["infer", "gzip", "zstd"] | None,
+        chunk_size: int,
+        valid: bytearray,
+        shard: int,
+        num_shards: int,
+    ) -> None:
+        num_nodes, num_edges = self.num_nodes, self.num_edges
+        with _open_output(path, compression) as f:
+            nodes_end = num_nodes * (shard + 1) // num_shards
+            for start in range(num_nodes * shard // num_shards, nodes_end, chunk_size):
+                f.write(self._format_nodes(start, min(start + chunk_size, nodes_end), valid).encode("utf-8"))
+            edges_end = num_edges * (shard + 1) // num_shards
+            for start in range(num_edges * shard // num_shards, edges_end, chunk_size):
+                f.write(self._format_edges(start, min(start + chunk_size, edges_end), valid).encode("utf-8"))
+
+    # Returns the lines of the nodes from `start` to `end`
+    def _format_nodes(self, start: int, end: int, valid: bytearray) -> str:
+        names, node_names, offsets, codes = self._names, self._node_names, self._node_label_offsets, self._node_labels
+        labels = [f" :{label}" for label in self._labels]
+        skipped = {row for row in range(start, end) if not valid[node_names[row]]}
+        properties = self._node_properties.format(start, end, skipped)
+        lines = list()
+        for row in range(start, end):
+            name = names[node_names[row]]
+            if row in skipped:
+                _skip_node(name)
+                continue
+            lines.append(name)
+            lines.extend([labels[code] for code in codes[offsets[row] : offsets[row + 1]]])
+            lines.append(properties[row - start])
+            lines.append("\n")
+        return "".join(lines)
+
+    # Returns the lines of the edges from `start` to `end`
+    def _format_edges(self, start: int, end: int, valid: bytearray) -> str:
+        names, sources, targets, codes = self._names, self._edge_sources, self._edge_targets, self._edge_type_codes
+        edge_types = [f" :{edge_type}" for edge_type in self._edge_types]
+        skipped = {row for row in range(start, end) if not (valid[sources[row]] and valid[targets[row]])}
+        properties = self._edge_properties.format(start, end, skipped)
+        lines = list()
+        for row in range(start, end):
+            source, target = sources[row], targets[row]
+            if not valid[source]:
+                _skip_edge("Source", names[source])
+                continue
+            elif not valid[target]:
+                _skip_edge("Target", names[target])
+                continue
+            lines.append(f"{names[source]}->{names[target]}{edge_types[codes[row]]}{properties[row - start]}\n")
+        return "".join(lines)
+
+    # Returns the ids of a column of node names, interning the new ones. Each distinct name
+    # is looked up once
+    def _intern_many(self, names: np.ndarray) -> np.ndarray:
+        unique, inverse = _factorize(names.astype(str))
+        return self._intern_list(unique.tolist())[inverse]
+
+    # Returns the ids of a list of node names, interning the new ones
+    def _intern_list(self, names: List[str]) -> np.ndarray:
+        name_ids, start = self._name_ids, len(self._names)
+        ids = np.fromiter(
+            (name_ids.setdefault(name, len(name_ids)) for name in names), dtype=np.int64, count=len(names)
+        )
+        num_new = len(name_ids) - start
+        if num_new > 0:
+            # New ids are given in order of first appearance
+            is_new = np.flatnonzero(ids >= start)
+            first = is_new[np.unique(ids[is_new], return_index=True)[1]]
+            self._names.extend([names[i] for i in first.tolist()])
+            self._name_rows.frombytes(np.full(num_new, -1, dtype=np.int64).tobytes())
+        return ids
+
+    def _label_code(self, label: str) -> int:
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self._labels)
+            self._labels.append(label)
+        return code
+
+    def _edge_type_code(self, edge_type: str) -> int:
+        code = self._edge_type_ids.get(edge_type)
+        if code is None:
+            code = self._edge_type_ids[edge_type] = len(self._edge_types)
+            self._edge_types.append(edge_type)
+        return code
+
+    # Returns the number of labels of every row and the codes of all of them
+    def _encode_labels(self, labels, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        if labels is None:
+            return np.zeros(num_rows, dtype=np.int64), np.empty(0, dtype=np.int32)
+        if isinstance(labels, str):
+            return np.ones(num_rows, dtype=np.int64), np.full(num_rows, self._label_code(labels), dtype=np.int32)
+        items = list(labels) if isinstance(labels, (list, tuple)) else _column(labels, "labels").tolist()
+        if len(items) != num_rows:
+            raise ValueError(f"labels must have {num_rows} rows, got {len(items)}")
+        if all(isinstance(item, str) for item in items):
+            return np.ones(num_rows, dtype=np.int64), _encode(items, self._label_code)
+        lists = [() if item is None else (item,) if isinstance(item, str) else list(item) for item in items]
+        counts = np.fromiter(map(len, lists), dtype=np.int64, count=num_rows)
+        return counts, _encode(list(chain.from_iterable(lists)), self._label_code)
+
+    # Adds a property column, leaving out its missing values
+    @staticmethod
+    def _extend_properties(columns: _PropertyColumns, key: str, rows: np.ndarray, values: np.ndarray) -> None:
+        present = ~_missing(values)
+        if not present.all():
+            rows, values = rows[present], values[present]
+        columns.extend(key, rows, values)
+
+    # Returns the id of a node name, interning it if it is new
+    def _intern(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            self._name_rows.append(-1)
+        return name_id
 
     ## Dump the graph to a file in MillenniumDB's Quad Model format
-    def dump_milldb(self, path: str) -> None:
-        with open(path, "w") as f:
-            for node in self.nodes:
-                if not re.match("[a-zA-Z][a-zA-Z0-9_]*", str(node.name)):
-                    print(
-                        f'Skipping node. Identifier "{node.name}" does not match the pattern "[a-zA-Z][a-zA-Z0-9_]*".'
-                    )
-                    continue
-                f.write(node.name)
-                for label in node.labels:
-                    f.write(f" :{label}")
-                f.write(dump_properties_milldb(node.properties))
-                f.write("\n")
-
-            for edge in self.edges:
-                if not re.match("[a-zA-Z][a-zA-Z0-9_]*", str(edge.source)):
-                    print(
-                        f'Skipping edge. Source identifier "{edge.source}" does not match the pattern "[a-zA-Z][a-zA-Z0-9_]*".'
-                    )
-                    continue
-                elif not re.match("[a-zA-Z][a-zA-Z0-9_]*", str(edge.target)):
-                    print(
-                        f'Skipping edge. Target identifier "{edge.target}" does not match the pattern "[a-zA-Z][a-zA-Z0-9_]*".'
+    #
+    # Nodes and edges whose names do not match the pattern "[a-zA-Z][a-zA-Z0-9_]*" are skipped.
+    # Every distinct name is checked once and lines are formatted and written `chunk_size`
+    # elements at a time. The file is compressed with `compression="gzip"` or `"zstd"`, the
+    # latter requiring the `zstandard` package, and by default the compression is inferred from
+    # the ".gz" and ".zst" extensions.
+    #
+    # With `num_shards` greater than one, the nodes and edges are split in contiguous ranges
+    # written to `num_shards` files in parallel, by forked processes that share the graph
+    # where the platform supports it and by threads otherwise. `path` must then contain a
+    # "{shard}" field that is replaced by the shard number. Concatenating the shards gives a
+    # valid file.
+    def dump_milldb(
+        self,
+        path: str,
+        compression: Literal["infer", "gzip", "zstd"] | None = "infer",
+        num_shards: int = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be positive integer, got {num_shards}")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive integer, got {chunk_size}")
+        if num_shards > 1 and "{shard}" not in path:
+            raise ValueError('path must contain a "{shard}" field when num_shards is greater than one')
+
+        valid = self._validate_names()
+        if num_shards == 1:
+            self._dump_shard(path, compression, chunk_size, valid, 0, 1)
+            return
+        global _dumped_builder
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Forked processes inherit the graph instead of receiving a copy of it
+            executor = ProcessPoolExecutor(num_shards, mp_context=multiprocessing.get_context("fork"))
+            dump_shard = _dump_forked_shard
+            _dumped_builder = self
+        else:
+            executor = ThreadPoolExecutor(num_shards)
+            dump_shard = self._dump_shard
+        try:
+            with executor:
+                futures = [
+                    executor.submit(
+                        dump_shard, path.format(shard=shard), compression, chunk_size, valid, shard, num_shards
                     )
-                    continue
-                f.write(f"{edge.source}->{edge.target} :{edge.edge_type}")
-                f.write(dump_properties_milldb(edge.properties))
-                f.write("\n")
+                    for shard in range(num_shards)
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            _dumped_builder = None
 
     def __repr__(self) -> str:
-        return f"{self.__class__.__name__}(num_nodes={len(self.nodes)}, num_edges={len(self.edges)})"
+        return f"{self.__class__.__name__}(num_nodes={self.num_nodes}, num_edges={self.num_edges})"
 
 
-## Interface for walking across graphs in MillenniumDB
-class GraphWalker:
-    ## Constructor
-    def __init__(self, client: "MDBClient"):
-        ## Client instance
-        self.client = client
+## Writes a graph in MillenniumDB's Quad Model format as its elements are added
+#
+# Unlike `GraphBuilder`, the elements are not kept. Their lines are formatted when they are
+# added and written `chunk_size` lines at a time, so memory does not grow with the graph.
+# Nodes and edges can be added in any order, nodes are not checked for duplicate names and
+# elements whose names do not match the pattern "[a-zA-Z][a-zA-Z0-9_]*" are skipped. The
+# compression is chosen as in `GraphBuilder.dump_milldb`.
+class GraphWriter:
+    ## Constructor.
+    def __init__(
+        self,
+        path: str,
+        compression: Literal["infer", "gzip", "zstd"] | None = "infer",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive integer, got {chunk_size}")
 
-    def _unpack_properties(self, data: bytes, hi: int) -> PropertiesDict:
-        lo, hi = hi, hi + 8
-        num_properties = packer.unpack_uint64(data, lo, hi)
-        properties = dict()
-        for _ in range(num_properties):
-            # Key
+        ## Path of the file.
+        self.path = path
+        ## Number of lines formatted before they are written.
+        self.chunk_size = chunk_size
+        ## Number of nodes written.
+        self.num_nodes = 0
+        ## Number of edges written.
+        self.num_edges = 0
+
+        self._file = _open_output(path, compression)
+        self._lines: List[str] = list()
+        self._closed = False
+
+    ## Enter context manager.
+    def __enter__(self):
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_):
+        self.close()
+
+    ## Write a node to the file
+    @decorators.check_closed
+    def add_node(self, node: BuilderNode) -> None:
+        if not _is_identifier(node.name):
+            _skip_node(node.name)
+            return
+        labels = "".join([f" :{label}" for label in node.labels])
+        self._lines.append(f"{node.name}{labels}{dump_properties_milldb(node.properties)}\n")
+        self.num_nodes += 1
+        if len(self._lines) >= self.chunk_size:
+            self.flush()
+
+    ## Write an edge to the file
+    @decorators.check_closed
+    def add_edge(self, edge: BuilderEdge) -> None:
+        if not _is_identifier(edge.source):
+            _skip_edge("Source", edge.source)
+            return
+        elif not _is_identifier(edge.target):
+            _skip_edge("Target", edge.target)
+            return
+        properties = dump_properties_milldb(edge.properties)
+        self._lines.append(f"{edge.source}->{edge.target} :{edge.edge_type}{properties}\n")
+        self.num_edges += 1
+        if len(self._lines) >= self.chunk_size:
+            self.flush()
+
+    ## Writes the pending lines to the file.
+    @decorators.check_closed
+    def flush(self) -> None:
+        if self._lines:
+            self._file.write("".join(self._lines).encode("utf-8"))
+            self._lines = list()
+
+    ## Writes the pending lines and closes the file.
+    def close(self) -> None:
+        if not self._closed:
+            try:
+                self.flush()
+            finally:
+                self._closed = True
+                self._file.close()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={self.path}, num_nodes={self.num_nodes}, num_edges={self.num_edges})"
+
+
+# Returns a column given as a sequence, NumPy array, pandas Series or Arrow array as an array
+def _column(values, name: str) -> np.ndarray:
+    column = np.asarray(values)
+    if column.ndim != 1:
+        raise ValueError(f"{name} must be a column, got shape {column.shape}")
+    return column
+
+
+# Returns the key and column of every property, given as a mapping from keys to columns, a
+# pandas DataFrame or an Arrow Table
+def _property_columns(properties, num_rows: int) -> List[Tuple[str, np.ndarray]]:
+    if properties is None:
+        return list()
+    if hasattr(properties, "column_names"):
+        items = [(key, properties.column(key)) for key in properties.column_names]
+    else:
+        items = list(properties.items())
+    columns = list()
+    for key, values in items:
+        column = _column(values, f'Property "{key}"')
+        if len(column) != num_rows:
+            raise ValueError(f'Property "{key}" must have {num_rows} rows, got {len(column)}')
+        columns.append((key, column))
+    return columns
+
+
+# Returns whether every name of a column is a valid identifier, checking its first character
+def _valid_identifiers(names: np.ndarray) -> np.ndarray:
+    first = names.astype(str).astype("U1")
+    return ((first >= "a") & (first <= "z")) | ((first >= "A") & (first <= "Z"))
+
+
+# Returns the distinct strings of a column and the position of every string among them.
+# Strings are hashed as a whole column and grouped by their hash, which is much faster than
+# sorting them. Hashes are checked to be collision-free, falling back to sorting otherwise
+def _factorize(strings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    if len(strings) == 0:
+        return strings, np.empty(0, dtype=np.int64)
+    # Every string is a row of UCS-4 code points, padded with zeros
+    code_points = np.ascontiguousarray(strings).view(np.uint32).reshape(len(strings), -1)
+    hashes = np.full(len(strings), 14695981039346656037, dtype=np.uint64)
+    for column in code_points.T:
+        hashes ^= column
+        hashes *= np.uint64(1099511628211)
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    unique = strings[first]
+    if not np.array_equal(unique[inverse], strings):
+        unique, inverse = np.unique(strings, return_inverse=True)
+    return unique, inverse.ravel()
+
+
+# Returns whether every value of a column is None or NaN
+def _missing(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind == "f":
+        return np.isnan(values)
+    elif values.dtype.kind == "O":
+        return np.fromiter(map(_is_missing, values.tolist()), dtype=bool, count=len(values))
+    return np.zeros(len(values), dtype=bool)
+
+
+def _is_missing(value) -> bool:
+    try:
+        return value is None or bool(value != value)
+    except TypeError:
+        # pandas.NA cannot be converted to bool
+        return True
+
+
+# Returns the code of every value, looking up each distinct value once
+def _encode(values: List[str], code: Callable[[str], int]) -> np.ndarray:
+    codes = {value: code(value) for value in dict.fromkeys(values)}
+    return np.fromiter(map(codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+
+# Builder whose shards are being written by forked processes
+_dumped_builder: GraphBuilder | None = None
+
+
+def _dump_forked_shard(*args) -> None:
+    _dumped_builder._dump_shard(*args)
+
+
+def _dictionary_size(values: List[str], codes: Dict[str, int]) -> int:
+    return sys.getsizeof(values) + sys.getsizeof(codes) + sum(map(sys.getsizeof, values))
+
+
+def _unpack_properties(data: bytes, hi: int) -> PropertiesDict:
+    lo, hi = hi, hi + 8
+    num_properties = packer.unpack_uint64(data, lo, hi)
+    properties = dict()
+    for _ in range(num_properties):
+        # Key
+        lo, hi = hi, data.index(b"\x00", hi)
+        key = packer.unpack_string(data, lo, hi)
+        hi += 1
+        # Value
+        value_type_code = data[hi]
+        hi += 1
+        if value_type_code == 1:
+            # bool
+            value = packer.unpack_bool(data, hi)
+            hi += 1
+        elif value_type_code == 2:
+            # int64
+            lo, hi = hi, hi + 8
+            value = packer.unpack_int64(data, lo, hi)
+        elif value_type_code == 3:
+            # float
+            lo, hi = hi, hi + 4
+            value = packer.unpack_float(data, lo, hi)
+        elif value_type_code == 4:
+            # string
             lo, hi = hi, data.index(b"\x00", hi)
-            key = packer.unpack_string(data, lo, hi)
+            value = packer.unpack_string(data, lo, hi)
             hi += 1
-            # Value
+        else:
+            raise ValueError(f"Invalid property value type code: {value_type_code}")
+        properties[key] = value
+    return properties, lo, hi
+
+
+def _pack_node_key(node_id: int | str) -> bytes:
+    msg = b""
+    if isinstance(node_id, Integral):
+        msg += packer.pack_bool(True)
+        msg += packer.pack_uint64(node_id)
+    elif isinstance(node_id, str):
+        msg += packer.pack_bool(False)
+        msg += packer.pack_string(node_id)
+    else:
+        raise TypeError(f"node_id must be int or str, got {type(node_id)}")
+    return msg
+
+
+def _pack_direction(direction: Literal["outgoing", "incoming"]) -> bytes:
+    if direction not in ["outgoing", "incoming"]:
+        raise ValueError('Direction must be either "outgoing" or "incoming".')
+    return packer.pack_bool(direction == "outgoing")
+
+
+def _pack_edge_ids_by_type_request(
+    edge_type: str, node_id: int | str | None, direction: Literal["outgoing", "incoming"] | None
+) -> bytes:
+    msg = b""
+    msg += packer.pack_string(edge_type)
+    if node_id is None:
+        msg += packer.pack_bool(False)
+    else:
+        direction_msg = _pack_direction(direction)
+        msg += packer.pack_bool(True)
+        msg += _pack_node_key(node_id)
+        msg += direction_msg
+    return msg
+
+
+def _pack_node_keys(node_ids: List[int] | List[str] | np.ndarray) -> bytes:
+    # Integer arrays are packed as a whole, without checking every element
+    if isinstance(node_ids, np.ndarray):
+        if node_ids.dtype.kind not in "iu":
+            raise TypeError(f"node_ids array must have an integer dtype, got {node_ids.dtype}")
+        return packer.pack_bool(True) + packer.pack_uint64_vector(node_ids)
+    if all(isinstance(node_id, Integral) for node_id in node_ids):
+        return packer.pack_bool(True) + packer.pack_uint64_vector(node_ids)
+    if all(isinstance(node_id, str) for node_id in node_ids):
+        return packer.pack_bool(False) + packer.pack_string_vector(node_ids)
+    raise TypeError("node_ids must be List[int] or List[str]")
+
+
+# Size of the fixed size property values by type code: bool, int64 and float
+_PROPERTY_SIZES = {1: 1, 2: 8, 3: 4}
+
+_unpack_count = struct.Struct(">Q").unpack_from
+
+
+# Decodes the edges in `data[start:end]` into an `EdgeTable`. Only the position of every edge
+# and of its properties is found in Python, skipping the properties without decoding them,
+# and the fixed size fields are gathered with NumPy
+def _unpack_edge_table(data: bytes, start: int = 0, end: int | None = None) -> "EdgeTable":
+    end = len(data) if end is None else end
+    starts, type_codes, property_offsets = list(), list(), list()
+    codes: Dict[bytes, int] = dict()
+    # The loop runs once per edge and property, so lookups are kept local
+    index, sizes = data.index, _PROPERTY_SIZES
+    hi = start
+    while hi < end:
+        starts.append(hi)
+        lo, hi = hi + 24, index(b"\x00", hi + 24)
+        edge_type = bytes(data[lo:hi])
+        code = codes.get(edge_type)
+        if code is None:
+            code = codes[edge_type] = len(codes)
+        type_codes.append(code)
+        hi += 1
+        property_offsets.append(hi)
+        (num_properties,) = _unpack_count(data, hi)
+        hi += 8
+        for _ in range(num_properties):
+            hi = index(b"\x00", hi) + 1
             value_type_code = data[hi]
             hi += 1
-            if value_type_code == 1:
-                # bool
-                value = packer.unpack_bool(data, hi)
-                hi += 1
-            elif value_type_code == 2:
-                # int64
-                lo, hi = hi, hi + 8
-                value = packer.unpack_int64(data, lo, hi)
-            elif value_type_code == 3:
-                # float
-                lo, hi = hi, hi + 4
-                value = packer.unpack_float(data, lo, hi)
-            elif value_type_code == 4:
-                # string
-                lo, hi = hi, data.index(b"\x00", hi)
-                value = packer.unpack_string(data, lo, hi)
-                hi += 1
+            if value_type_code == 4:
+                hi = index(b"\x00", hi) + 1
+            elif value_type_code in sizes:
+                hi += sizes[value_type_code]
             else:
                 raise ValueError(f"Invalid property value type code: {value_type_code}")
-            properties[key] = value
-        return properties, lo, hi
+
+    # Source, target and edge id of every edge as rows of 24 bytes
+    buffer = np.frombuffer(data, np.uint8)
+    rows = buffer[np.asarray(starts, dtype=np.int64)[:, None] + np.arange(24)]
+    fields = rows.view(packer.UINT64).reshape(len(starts), 3)
+    return EdgeTable(
+        data,
+        fields[:, 0].astype(np.int64),
+        fields[:, 1].astype(np.int64),
+        fields[:, 2].astype(np.uint64),
+        np.asarray(type_codes, dtype=np.int32),
+        [packer.unpack_string(edge_type, 0, len(edge_type)) for edge_type in codes],
+        np.asarray(property_offsets, dtype=np.int64),
+    )
+
+
+# Decodes the edge counts of every node followed by their edges, grouped by node
+def _unpack_edges_many(data: bytes, columnar: bool = False) -> Tuple[np.ndarray, "List[WalkerEdge] | EdgeTable"]:
+    lo, hi = 0, 8
+    num_nodes = packer.unpack_uint64(data, lo, hi)
+    lo, hi = hi, hi + 8 * num_nodes
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(packer.unpack_uint64_array(data, lo, hi, np.int64), out=offsets[1:])
+    return offsets, _unpack_edge_table(data, hi) if columnar else _unpack_edges(data, hi)
+
+
+def _unpack_ids(data: bytes) -> List[int]:
+    return packer.unpack_uint64_vector(data, 0, len(data))
+
+
+def _unpack_node(data: bytes, node_id: int | str) -> WalkerNode:
+    node, _ = _unpack_node_at(data, 0, node_id)
+    return node
+
+
+# Decodes the node that starts at `data[hi]`, returning it with the position after its end
+def _unpack_node_at(data: bytes, hi: int, node_id: int | str) -> Tuple[WalkerNode, int]:
+    # Name
+    lo, hi = hi, data.index(b"\x00", hi)
+    name = packer.unpack_string(data, lo, hi)
+    hi += 1
+    # Labels
+    lo, hi = hi, hi + 8
+    num_labels = packer.unpack_uint64(data, lo, hi)
+    labels = list()
+    for _ in range(num_labels):
+        lo, hi = hi, data.index(b"\x00", hi)
+        label = packer.unpack_string(data, lo, hi)
+        hi += 1
+        labels.append(label)
+    # Properties
+    properties, _, hi = _unpack_properties(data, hi)
+    return WalkerNode(node_id=node_id, name=name, labels=labels, properties=properties), hi
+
+
+def _unpack_nodes(data: bytes, node_ids: List[int | str]) -> List[WalkerNode]:
+    nodes = list()
+    hi = 0
+    for node_id in node_ids:
+        node, hi = _unpack_node_at(data, hi, node_id)
+        nodes.append(node)
+    return nodes
+
+
+# Decodes the edges in `data[start:end]`, up to the end of `data` by default
+def _unpack_edges(data: bytes, start: int = 0, end: int | None = None) -> List[WalkerEdge]:
+    end = len(data) if end is None else end
+    edges = list()
+    lo, hi = start, start
+    while hi < end:
+        lo, hi = hi, hi + 8
+        source = packer.unpack_uint64(data, lo, hi)
+        lo, hi = hi, hi + 8
+        target = packer.unpack_uint64(data, lo, hi)
+        lo, hi = hi, hi + 8
+        edge_id = packer.unpack_uint64(data, lo, hi)
+        lo, hi = hi, data.index(b"\x00", hi)
+        edge_type = packer.unpack_string(data, lo, hi)
+        hi += 1
+        properties, lo, hi = _unpack_properties(data, hi)
+        edges.append(
+            WalkerEdge(
+                source=source,
+                target=target,
+                edge_type=edge_type,
+                edge_id=edge_id,
+                propeties=properties,
+            )
+        )
+    return edges
+
+
+## Columnar representation of the edges returned by `GraphWalker.get_edges`.
+#
+# Sources, targets and edge ids are decoded into arrays and edge types are dictionary
+# encoded, while the properties are left in the response buffer and decoded only when a row
+# or a column is accessed. Indexing with an integer returns a `WalkerEdge` and indexing with
+# a slice returns an `EdgeTable` sharing the buffer.
+class EdgeTable:
+    ## Constructor, the tables are created by `GraphWalker`.
+    def __init__(
+        self,
+        data: bytes,
+        source: np.ndarray,
+        target: np.ndarray,
+        edge_id: np.ndarray,
+        type_codes: np.ndarray,
+        edge_types: List[str],
+        property_offsets: np.ndarray,
+    ) -> None:
+        ## Source node identifiers as int64.
+        self.source = source
+        ## Target node identifiers as int64.
+        self.target = target
+        ## Edge identifiers, kept as uint64 as they use the most significant bit.
+        self.edge_id = edge_id
+        ## Index into `edge_types` of the type of every edge.
+        self.type_codes = type_codes
+        ## Distinct edge types.
+        self.edge_types = edge_types
+
+        self._data = data
+        # Position in `_data` where the properties of every edge start
+        self._property_offsets = property_offsets
+
+    def __len__(self) -> int:
+        return len(self.edge_id)
+
+    def __getitem__(self, index: int | slice) -> "WalkerEdge | EdgeTable":
+        if isinstance(index, slice):
+            return EdgeTable(
+                self._data,
+                self.source[index],
+                self.target[index],
+                self.edge_id[index],
+                self.type_codes[index],
+                self.edge_types,
+                self._property_offsets[index],
+            )
+        return WalkerEdge(
+            edge_id=int(self.edge_id[index]),
+            source=int(self.source[index]),
+            target=int(self.target[index]),
+            edge_type=self.edge_types[self.type_codes[index]],
+            propeties=self.properties(index),
+        )
+
+    def __iter__(self) -> Iterator["WalkerEdge"]:
+        return (self[i] for i in range(len(self)))
+
+    ## Returns the type of every edge.
+    def types(self) -> List[str]:
+        edge_types = self.edge_types
+        return [edge_types[code] for code in self.type_codes.tolist()]
+
+    ## Decodes the properties of an edge.
+    def properties(self, index: int) -> PropertiesDict:
+        properties, _, _ = _unpack_properties(self._data, int(self._property_offsets[index]))
+        return properties
+
+    ## Decodes a property of every edge, `default` for the edges without it.
+    def property_column(self, key: str, default=None) -> List[str | int | float | bool]:
+        return [self.properties(i).get(key, default) for i in range(len(self))]
+
+    ## Returns the edges as `WalkerEdge` objects.
+    def to_edges(self) -> List["WalkerEdge"]:
+        return list(self)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(num_edges={len(self)}, num_edge_types={len(self.edge_types)})"
+
+
+## Interface for walking across graphs in MillenniumDB
+#
+# Lookups can be pipelined with `MDBClient.pipeline`, every method then returns a `PipelineResult`.
+class GraphWalker:
+    ## Constructor
+    def __init__(self, client: "MDBClient | MDBClientPool"):
+        ## Client instance
+        self.client = client
 
     ## Describe a node by its identifier or name
     def get_node(self, node_id: int | str) -> WalkerNode:
         # Send request
-        msg = b""
-        if isinstance(node_id, int):
-            msg += packer.pack_bool(True)
-            msg += packer.pack_uint64(node_id)
-        elif isinstance(node_id, str):
-            msg += packer.pack_bool(False)
-            msg += packer.pack_string(node_id)
-        else:
-            raise TypeError(f"node_id must be int or str, got {type(node_id)}")
-        self.client._send(RequestType.GRAPH_WALKER_GET_NODE, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        # Name
-        lo, hi = 0, data.index(b"\x00")
-        name = packer.unpack_string(data, lo, hi)
-        hi += 1
-        # Labels
-        lo, hi = hi, hi + 8
-        num_labels = packer.unpack_uint64(data, lo, hi)
-        labels = list()
-        for _ in range(num_labels):
-            lo, hi = hi, data.index(b"\x00", hi)
-            label = packer.unpack_string(data, lo, hi)
-            hi += 1
-            labels.append(label)
-        # Properties
-        properties, _, _ = self._unpack_properties(data, hi)
-        return WalkerNode(node_id=node_id, name=name, labels=labels, properties=properties)
+        msg = _pack_node_key(node_id)
+        return self.client._call(RequestType.GRAPH_WALKER_GET_NODE, msg, lambda data: _unpack_node(data, node_id))
 
     ## Get all node_ids with a given label
     def get_node_ids_by_label(self, label: str) -> List[int]:
         # Send request
         msg = b""
         msg += packer.pack_string(label)
-        self.client._send(RequestType.GRAPH_WALKER_GET_NODE_IDS_BY_LABEL, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        return packer.unpack_uint64_vector(data, 0, len(data))
+        return self.client._call(RequestType.GRAPH_WALKER_GET_NODE_IDS_BY_LABEL, msg, _unpack_ids)
 
     ## Get all edge_ids with a given type. Optionally filter it by a node_id and its direction
     def get_edge_ids_by_type(
         self, edge_type: str, node_id: int = None, direction: Literal["outgoing", "incoming"] = None
     ) -> List[int]:
         # Send request
-        msg = b""
-        msg += packer.pack_string(edge_type)
-        if node_id is None:
-            msg += packer.pack_bool(False)
-        else:
-            if direction not in ["outgoing", "incoming"]:
-                raise ValueError('Direction must be either "outgoing" or "incoming".')
-            msg += packer.pack_bool(True)
-            if isinstance(node_id, int):
-                msg += packer.pack_bool(True)
-                msg += packer.pack_uint64(node_id)
-            elif isinstance(node_id, str):
-                msg += packer.pack_bool(False)
-                msg += packer.pack_string(node_id)
-            else:
-                raise TypeError(f"node_id must be int or str, got {type(node_id)}")
-            msg += packer.pack_bool(direction == "outgoing")
-        self.client._send(RequestType.GRAPH_WALKER_GET_EDGE_IDS_BY_TYPE, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        return packer.unpack_uint64_vector(data, 0, len(data))
+        msg = _pack_edge_ids_by_type_request(edge_type, node_id, direction)
+        return self.client._call(RequestType.GRAPH_WALKER_GET_EDGE_IDS_BY_TYPE, msg, _unpack_ids)
 
     ## Get all outgoing or incoming edges from a node by its identifier or name
-    def get_edges(self, node_id: int | str, direction: Literal["outgoing", "incoming"]) -> List[WalkerNode]:
-        if direction not in ["outgoing", "incoming"]:
-            raise ValueError('Direction must be either "outgoing" or "incoming".')
+    #
+    # When `columnar` is `True` the edges are returned as an `EdgeTable`, which only decodes
+    # the properties that are accessed.
+    def get_edges(
+        self, node_id: int | str, direction: Literal["outgoing", "incoming"], columnar: bool = False
+    ) -> List[WalkerEdge] | EdgeTable:
         # Send request
-        msg = b""
-        if isinstance(node_id, int):
-            msg += packer.pack_bool(True)
-            msg += packer.pack_uint64(node_id)
-        elif isinstance(node_id, str):
-            msg += packer.pack_bool(False)
-            msg += packer.pack_string(node_id)
-        else:
-            raise TypeError(f"node_id must be int or str, got {type(node_id)}")
-        msg += packer.pack_bool(direction == "outgoing")
-        self.client._send(RequestType.GRAPH_WALKER_GET_EDGES, msg)
+        direction_msg = _pack_direction(direction)
+        msg = _pack_node_key(node_id) + direction_msg
+        decode = _unpack_edge_table if columnar else _unpack_edges
+        return self.client._call(RequestType.GRAPH_WALKER_GET_EDGES, msg, decode)
 
-        # Handle response
-        data, _ = self.client._recv()
+    ## Describe several nodes by their identifiers or names with a single request
+    #
+    # Nodes are returned in the order of `node_ids`. The request is only served by
+    # `stand_in_server` for now. With `pymilldb_server`, call `get_node` for every node inside
+    # `MDBClient.pipeline` instead.
+    def get_nodes(self, node_ids: List[int] | List[str] | np.ndarray) -> List[WalkerNode]:
+        # Send request
+        msg = _pack_node_keys(node_ids)
+        keys = node_ids.tolist() if isinstance(node_ids, np.ndarray) else list(node_ids)
+        return self.client._call(RequestType.GRAPH_WALKER_GET_NODES, msg, lambda data: _unpack_nodes(data, keys))
 
-        edges = list()
-        lo, hi = 0, 0
-        while hi < len(data):
-            lo, hi = hi, hi + 8
-            source = packer.unpack_uint64(data, lo, hi)
-            lo, hi = hi, hi + 8
-            target = packer.unpack_uint64(data, lo, hi)
-            lo, hi = hi, hi + 8
-            edge_id = packer.unpack_uint64(data, lo, hi)
-            lo, hi = hi, data.index(b"\x00", hi)
-            edge_type = packer.unpack_string(data, lo, hi)
-            hi += 1
-            properties, lo, hi = self._unpack_properties(data, hi)
-            edges.append(
-                WalkerEdge(
-                    source=source,
-                    target=target,
-                    edge_type=edge_type,
-                    edge_id=edge_id,
-                    propeties=properties,
-                )
-            )
-        return edges
+    ## Get all outgoing or incoming edges of several nodes with a single request
+    #
+    # Returns the edges of every node one after the other, grouped in the order of
+    # `node_ids`, together with the CSR-style offsets of the groups: the edges of
+    # `node_ids[i]` are `edges[offsets[i]:offsets[i + 1]]`. The edges are an `EdgeTable` when
+    # `columnar` is `True`. The request is only served by `stand_in_server` for now. With
+    # `pymilldb_server`, call `get_edges` for every node inside `MDBClient.pipeline` instead.
+    def get_edges_many(
+        self,
+        node_ids: List[int] | List[str] | np.ndarray,
+        direction: Literal["outgoing", "incoming"],
+        columnar: bool = False,
+    ) -> Tuple[np.ndarray, "List[WalkerEdge] | EdgeTable"]:
+        # Send request
+        direction_msg = _pack_direction(direction)
+        msg = _pack_node_keys(node_ids) + direction_msg
+        return self.client._call(
+            RequestType.GRAPH_WALKER_GET_EDGES_MANY, msg, lambda data: _unpack_edges_many(data, columnar)
+        )
+
+
+## Asyncio counterpart of `GraphWalker`.
+class AsyncGraphWalker:
+    ## Constructor
+    def __init__(self, client: "AsyncMDBClient"):
+        ## Client instance
+        self.client = client
+
+    ## Describe a node by its identifier or name
+    async def get_node(self, node_id: int | str) -> WalkerNode:
+        msg = _pack_node_key(node_id)
+        data, _ = await self.client._request(RequestType.GRAPH_WALKER_GET_NODE, msg)
+        return _unpack_node(data, node_id)
+
+    ## Get all node_ids with a given label
+    async def get_node_ids_by_label(self, label: str) -> List[int]:
+        msg = packer.pack_string(label)
+        data, _ = await self.client._request(RequestType.GRAPH_WALKER_GET_NODE_IDS_BY_LABEL, msg)
+        return _unpack_ids(data)
+
+    ## Get all edge_ids with a given type. Optionally filter it by a node_id and its direction
+    async def get_edge_ids_by_type(
+        self, edge_type: str, node_id: int = None, direction: Literal["outgoing", "incoming"] = None
+    ) -> List[int]:
+        msg = _pack_edge_ids_by_type_request(edge_type, node_id, direction)
+        data, _ = await self.client._request(RequestType.GRAPH_WALKER_GET_EDGE_IDS_BY_TYPE, msg)
+        return _unpack_ids(data)
+
+    ## Get all outgoing or incoming edges from a node by its identifier or name
+    async def get_edges(
+        self, node_id: int | str, direction: Literal["outgoing", "incoming"], columnar: bool = False
+    ) -> List[WalkerEdge] | EdgeTable:
+        direction_msg = _pack_direction(direction)
+        msg = _pack_node_key(node_id) + direction_msg
+        data, _ = await self.client._request(RequestType.GRAPH_WALKER_GET_EDGES, msg)
+        return _unpack_edge_table(data) if columnar else _unpack_edges(data)
+
+    ## Describe several nodes by their identifiers or names with a single request
+    async def get_nodes(self, node_ids: List[int] | List[str] | np.ndarray) -> List[WalkerNode]:
+        msg = _pack_node_keys(node_ids)
+        data, _ = await self.client._request(RequestType.GRAPH_WALKER_GET_NODES, msg)
+        return _unpack_nodes(data, node_ids.tolist() if isinstance(node_ids, np.ndarray) else list(node_ids))
+
+    ## Get all outgoing or incoming edges of several nodes with a single request
+    async def get_edges_many(
+        self,
+        node_ids: List[int] | List[str] | np.ndarray,
+        direction: Literal["outgoing", "incoming"],
+        columnar: bool = False,
+    ) -> Tuple[np.ndarray, "List[WalkerEdge] | EdgeTable"]:
+        direction_msg = _pack_direction(direction)
+        msg = _pack_node_keys(node_ids) + direction_msg
+        data, _ = await self.client._request(RequestType.GRAPH_WALKER_GET_EDGES_MANY, msg)
+        return _unpack_edges_many(data, columnar)
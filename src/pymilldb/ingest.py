@@ -0,0 +1,469 @@
+import argparse
+import bz2
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Set, Tuple
+
+from .graph import _open_output
+
+## Default size in bytes of the blocks of input converted by each task.
+DEFAULT_BLOCK_SIZE = 64 << 20
+
+## Size in bytes of the blocks read when copying files and extracting nodes.
+COPY_BLOCK_SIZE = 16 << 20
+
+## Default number of partitions used to deduplicate the node names.
+DEFAULT_NUM_PARTITIONS = 16
+
+## Default number of partitions per worker process in `convert_ntriples`.
+PARTITIONS_PER_WORKER = 4
+
+# A whole N-Triples line of the Wikidata truthy dump, with a single alternative per kind of
+# object. Alternatives are tried in order, which gives the same results as trying a pattern
+# per kind of object on the object text in turn
+_TRIPLE = re.compile(
+    rb"<http://www\.wikidata\.org/entity/(\w\d+)> "
+    rb"<http://www\.wikidata\.org/prop/direct/(\w\d+)> "
+    rb"(?:"
+    # Entity
+    rb"<http://www\.wikidata\.org/entity/(\w\d+)>"
+    # String, with an optional datatype or language
+    rb'|"((?:[^"\\]|\\.)*)"(?:'
+    rb"\^\^<http://www\.w3\.org/2001/XMLSchema#\w+>"
+    rb"|\^\^<http://www\.opengis\.net/ont/geosparql#wktLiteral>"
+    rb"|\^\^<http://www\.w3\.org/1998/Math/MathML>"
+    rb"|@(.+)"
+    rb")?"
+    # Other IRI
+    rb"|<(.+)>"
+    # Anonymous node
+    rb"|(_:\w+)"
+    rb") [^ ]*$"
+)
+
+# Subject of a line whose predicate or object is not converted, it is still a node
+_SUBJECT = re.compile(rb"<http://www\.wikidata\.org/entity/(\w\d+)> ")
+
+# Properties of the node lines written for every entity
+_NODE_PROPERTIES = b" feat:[1,1,1]"
+
+
+## Converts a Wikidata N-Triples dump to MillenniumDB's Quad Model format.
+#
+# The input is split in blocks of about `block_size` bytes converted in parallel by
+# `num_workers` processes, each matching every line against a single pattern. Uncompressed
+# inputs are split in byte ranges read by the workers themselves, while ".gz" and ".bz2"
+# inputs are decompressed as a stream and the blocks are sent to the workers, with a bounded
+# number of them in flight.
+#
+# The edges of every block are written to `edges-{block}.milldb` in `output_dir`. The entities
+# seen by each block are spilled to disk, split in `num_partitions` partitions by the hash of
+# their name, and every partition is deduplicated on its own and written to
+# `nodes-{partition}.milldb`. Each worker holds the names of one partition at a time, so up to
+# `min(num_workers, num_partitions)` partitions are in memory together, about that fraction of
+# `num_partitions` of all the distinct names. `num_partitions` defaults to
+# `PARTITIONS_PER_WORKER` times `num_workers`, which bounds the peak to about a quarter of the
+# names whatever the number of cores, and more partitions lower it further.
+#
+# Anonymous objects become the node `_a{offset}`, where `offset` is the position of their line
+# in the input, so names do not depend on how the input was split. Returns the number of
+# lines read, of edges written, of lines skipped and of nodes written.
+def convert_ntriples(
+    input_path: str,
+    output_dir: str,
+    num_workers: int | None = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    num_partitions: int | None = None,
+) -> Dict[str, int]:
+    if block_size < 1:
+        raise ValueError(f"block_size must be positive integer, got {block_size}")
+    num_workers = num_workers or os.cpu_count() or 1
+    if num_partitions is None:
+        num_partitions = PARTITIONS_PER_WORKER * num_workers
+    if num_partitions < 1:
+        raise ValueError(f"num_partitions must be positive integer, got {num_partitions}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    spill_dir = os.path.join(output_dir, "entities")
+    os.makedirs(spill_dir, exist_ok=True)
+    stats = {"lines": 0, "edges": 0, "skipped": 0, "nodes": 0}
+    spills: List[Tuple[str, List[int]]] = list()
+    try:
+        with ProcessPoolExecutor(num_workers) as executor:
+            tasks = _block_tasks(input_path, output_dir, block_size, num_partitions)
+            for block_stats, spill in _bounded(executor, tasks, 2 * num_workers):
+                for key, value in block_stats.items():
+                    stats[key] += value
+                spills.append(spill)
+
+            futures = [
+                executor.submit(
+                    _write_partition_nodes,
+                    [(path, offsets[partition], offsets[partition + 1]) for path, offsets in spills],
+                    os.path.join(output_dir, f"nodes-{partition:05d}.milldb"),
+                )
+                for partition in range(num_partitions)
+            ]
+            stats["nodes"] = sum(future.result() for future in futures)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return stats
+
+
+# Opens a file for reading bytes, decompressing ".gz" and ".bz2" files
+def _open_input(path: str) -> BinaryIO:
+    extension = os.path.splitext(path)[1]
+    if extension == ".gz":
+        return gzip.open(path, "rb")
+    elif extension == ".bz2":
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+# Yields the arguments of `_convert_block` for every block of the input
+def _block_tasks(input_path: str, output_dir: str, block_size: int, num_partitions: int) -> Iterator[tuple]:
+    def task(block: int, data: bytes | None, start: int, end: int) -> tuple:
+        edges_path = os.path.join(output_dir, f"edges-{block:05d}.milldb")
+        spill_path = os.path.join(output_dir, "entities", f"{block:05d}")
+        return input_path, data, start, end, edges_path, spill_path, num_partitions
+
+    if os.path.splitext(input_path)[1] not in [".gz", ".bz2"]:
+        # Workers read their own byte range
+        size = os.path.getsize(input_path)
+        for block, start in enumerate(range(0, size, block_size)):
+            yield task(block, None, start, min(start + block_size, size))
+        return
+
+    with _open_input(input_path) as f:
+        block, start = 0, 0
+        while True:
+            data = f.read(block_size)
+            if not data:
+                return
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            yield task(block, data, start, start + len(data))
+            block, start = block + 1, start + len(data)
+
+
+# Submits `_convert_block` for every task keeping up to `window` in flight, and yields their
+# results in order
+def _bounded(executor: ProcessPoolExecutor, tasks: Iterator[tuple], window: int) -> Iterator:
+    pending: List[Future] = list()
+    for task in tasks:
+        pending.append(executor.submit(_convert_block, *task))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+# Reads the lines starting in the byte range from `start` to `end` of a file. Returns them
+# together with the offset of the first one
+def _read_range(input_path: str, start: int, end: int) -> Tuple[bytes, int]:
+    with open(input_path, "rb") as f:
+        if start > 0:
+            # The line that crosses `start` belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+            start = f.tell()
+        if start >= end:
+            return b"", start
+        data = f.read(end - start)
+        if not data.endswith(b"\n"):
+            data += f.readline()
+        return data, start
+
+
+# Converts a block of lines starting at byte `start` of the input, writing its edges and
+# spilling its entities. Returns the counters of the block and the spill file, together with
+# the offsets of its partitions
+def _convert_block(
+    input_path: str,
+    data: bytes | None,
+    start: int,
+    end: int,
+    edges_path: str,
+    spill_path: str,
+    num_partitions: int,
+) -> Tuple[Dict[str, int], Tuple[str, List[int]]]:
+    if data is None:
+        data, start = _read_range(input_path, start, end)
+
+    match = _TRIPLE.match
+    # Kept in order of appearance, so the output does not depend on the hash seed
+    entities: Dict[bytes, None] = dict()
+    edges: List[bytes] = list()
+    num_lines, offset = 0, start
+    for line in data.split(b"\n"):
+        line_offset, offset = offset, offset + len(line) + 1
+        if not line:
+            continue
+        num_lines += 1
+        m = match(line)
+        if m is None:
+            subject = _SUBJECT.match(line)
+            if subject is not None:
+                entities[subject.group(1)] = None
+            continue
+        subject, predicate, entity, string, language, iri, anonymous = m.groups()
+        entities[subject] = None
+        if entity is not None:
+            entities[entity] = None
+            edges.append(b"%s->%s :%s\n" % (subject, entity, predicate))
+        elif string is not None:
+            if language is None:
+                edges.append(b'%s->"%s" :%s\n' % (subject, string, predicate))
+            else:
+                edges.append(b'%s->"%s" :%s language:"%s"\n' % (subject, string, predicate, language))
+        elif iri is not None:
+            edges.append(b'%s->"%s" :%s\n' % (subject, iri, predicate))
+        else:
+            edges.append(b"%s->_a%d :%s\n" % (subject, line_offset, predicate))
+
+    with open(edges_path, "wb") as f:
+        f.write(b"".join(edges))
+    offsets = _spill(entities, spill_path, num_partitions)
+    stats = {"lines": num_lines, "edges": len(edges), "skipped": num_lines - len(edges)}
+    return stats, (spill_path, offsets)
+
+
+# Partition of a node name, stable across processes
+def _partition(name: bytes, num_partitions: int) -> int:
+    return zlib.crc32(name) % num_partitions
+
+
+# Writes distinct node names grouped by partition, one per line. Returns the offset of every
+# partition in the file, followed by its size
+def _spill(names: Iterable[bytes], path: str, num_partitions: int) -> List[int]:
+    partitions: List[List[bytes]] = [list() for _ in range(num_partitions)]
+    for name in names:
+        partitions[_partition(name, num_partitions)].append(name)
+    offsets = [0]
+    with open(path, "wb") as f:
+        for partition in partitions:
+            if partition:
+                f.write(b"\n".join(partition) + b"\n")
+            offsets.append(f.tell())
+    return offsets
+
+
+# Writes a node line for every distinct name of a partition, given as byte ranges of the
+# spill files. Returns the number of nodes written
+def _write_partition_nodes(ranges: List[Tuple[str, int, int]], output_path: str) -> int:
+    with open(output_path, "wb") as out:
+        return _write_nodes(ranges, out)
+
+
+# Writes a node line for every distinct name of the byte ranges of spill files, holding only
+# the distinct names in memory. Returns the number of nodes written
+def _write_nodes(ranges: List[Tuple[str, int, int]], out: BinaryIO) -> int:
+    seen: Set[bytes] = set()
+    for path, start, end in ranges:
+        for names in _read_names(path, start, end):
+            new = [name for name in dict.fromkeys(names) if name not in seen]
+            seen.update(new)
+            out.write(b"".join([name + _NODE_PROPERTIES + b"\n" for name in new]))
+    return len(seen)
+
+
+# Yields the names of a byte range of a spill file, a block at a time
+def _read_names(path: str, start: int, end: int) -> Iterator[List[bytes]]:
+    if start == end:
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        while start < end:
+            data = f.read(min(COPY_BLOCK_SIZE, end - start))
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            start += len(data)
+            yield data.split(b"\n")[:-1]
+
+
+## Writes a node line for every distinct source of the edges of Quad Model files.
+#
+# Sources are deduplicated within blocks of the input, spilled to `num_partitions` files in
+# `spill_dir` by the hash of their name and then deduplicated one partition at a time, so
+# the names of a single partition are held in memory, about the number of nodes divided by
+# `num_partitions`. Memory still grows with the number of nodes, pick `num_partitions` so
+# that this share fits in memory. The spill files are removed afterwards, and `spill_dir`
+# defaults to a temporary directory next to the output.
+#
+# Node lines are written grouped by partition rather than in order of first appearance, so
+# they are the same set as `mdb_edges_to_mdb_nodes.py` writes but in another order.
+#
+# Inputs compressed with gzip or bzip2 are read as a stream. The output is compressed as in
+# `GraphBuilder.dump_milldb` and is appended to with `append=True`. Returns the number of
+# nodes written.
+def extract_nodes(
+    edge_paths: List[str],
+    output_path: str,
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+    spill_dir: str | None = None,
+    append: bool = False,
+) -> int:
+    return _build(edge_paths, output_path, num_partitions, spill_dir, append, copy_edges=False)["nodes"]
+
+
+## Concatenates files with large binary block copies, and returns the number of bytes written.
+#
+# A line break is added after any file that does not end with one. Inputs compressed with
+# gzip or bzip2 are decompressed, and the output is compressed as in
+# `GraphBuilder.dump_milldb` and is appended to with `append=True`.
+def concat_files(paths: List[str], output_path: str, append: bool = False) -> int:
+    with _open_output(output_path, "infer", "ab" if append else "wb") as out:
+        return sum(_copy(path, out) for path in paths)
+
+
+## Writes the edges of Quad Model files followed by a node line for every distinct source.
+#
+# A single pipeline replacing the concatenation of the edge files and the extraction of their
+# nodes with intermediate files: the edges are copied to the output in large blocks while
+# their sources are collected from the same blocks, and the node lines are appended once the
+# edges are written. Sources are deduplicated one partition at a time as in `extract_nodes`,
+# and inputs and output are handled as in `concat_files`. Returns the number of bytes of
+# edges and the number of nodes written.
+def build_quad_file(
+    edge_paths: List[str],
+    output_path: str,
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+    spill_dir: str | None = None,
+    append: bool = False,
+) -> Dict[str, int]:
+    return _build(edge_paths, output_path, num_partitions, spill_dir, append, copy_edges=True)
+
+
+def _build(
+    edge_paths: List[str],
+    output_path: str,
+    num_partitions: int,
+    spill_dir: str | None,
+    append: bool,
+    copy_edges: bool,
+) -> Dict[str, int]:
+    if num_partitions < 1:
+        raise ValueError(f"num_partitions must be positive integer, got {num_partitions}")
+    if spill_dir is None:
+        spill_dir = os.path.dirname(os.path.abspath(output_path))
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as directory:
+        spill_paths = [os.path.join(directory, f"{partition:05d}") for partition in range(num_partitions)]
+        with _open_output(output_path, "infer", "ab" if append else "wb") as out:
+            num_bytes = 0
+            spill_files = [open(path, "wb") for path in spill_paths]
+            try:
+                for path in edge_paths:
+                    last = b"\n"
+                    for block in _read_blocks(path):
+                        if copy_edges:
+                            out.write(block)
+                            num_bytes, last = num_bytes + len(block), block[-1:]
+                        _spill_sources(block, spill_files)
+                    if last != b"\n":
+                        out.write(b"\n")
+                        num_bytes += 1
+            finally:
+                for f in spill_files:
+                    f.close()
+            num_nodes = 0
+            for path in spill_paths:
+                num_nodes += _write_nodes([(path, 0, os.path.getsize(path))], out)
+    return {"bytes": num_bytes, "nodes": num_nodes}
+
+
+# Yields the blocks of whole lines of a file, decompressing ".gz" and ".bz2" files
+def _read_blocks(path: str) -> Iterator[bytes]:
+    with _open_input(path) as f:
+        while True:
+            data = f.read(COPY_BLOCK_SIZE)
+            if not data:
+                return
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            yield data
+
+
+# Copies a file to `out` in blocks, ending it with a line break. Returns the bytes written
+def _copy(path: str, out: BinaryIO) -> int:
+    num_bytes, last = 0, b"\n"
+    with _open_input(path) as f:
+        while True:
+            data = f.read(COPY_BLOCK_SIZE)
+            if not data:
+                break
+            out.write(data)
+            num_bytes, last = num_bytes + len(data), data[-1:]
+    if last != b"\n":
+        out.write(b"\n")
+        num_bytes += 1
+    return num_bytes
+
+
+# Spills the distinct sources of a block of edge lines, which come before their "->"
+def _spill_sources(block: bytes, spill_files: List[BinaryIO]) -> None:
+    sources: Dict[bytes, None] = dict()
+    for line in block.split(b"\n"):
+        end = line.find(b"->")
+        if end > 0:
+            sources[line[:end]] = None
+    num_partitions = len(spill_files)
+    partitions: List[List[bytes]] = [list() for _ in range(num_partitions)]
+    for name in sources:
+        partitions[_partition(name, num_partitions)].append(name)
+    for f, partition in zip(spill_files, partitions):
+        if partition:
+            f.write(b"\n".join(partition) + b"\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tools to prepare MillenniumDB's Quad Model files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="convert a Wikidata N-Triples dump")
+    convert.add_argument("input", help="N-Triples file, optionally compressed with gzip or bzip2")
+    convert.add_argument("output_dir", help="directory of the edge and node shards")
+    convert.add_argument("--workers", type=int, default=None, help="worker processes, one per core by default")
+    convert.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="bytes of input per task")
+    convert.add_argument(
+        "--partitions", type=int, default=None, help="partitions of the node names, 4 per worker by default"
+    )
+
+    nodes = subparsers.add_parser("nodes", help="write a node for every distinct source of edge files")
+    nodes.add_argument("output", help="output file, compressed if it ends with .gz or .zst")
+    nodes.add_argument("inputs", nargs="+", help="edge files, optionally compressed with gzip or bzip2")
+    nodes.add_argument("--append", action="store_true", help="append to the output instead of replacing it")
+    nodes.add_argument("--partitions", type=int, default=DEFAULT_NUM_PARTITIONS, help="partitions of the node names")
+    nodes.add_argument("--spill-dir", default=None, help="directory of the spill files, next to the output by default")
+
+    concat = subparsers.add_parser("concat", help="concatenate files")
+    concat.add_argument("output", help="output file, compressed if it ends with .gz or .zst")
+    concat.add_argument("inputs", nargs="+", help="files, optionally compressed with gzip or bzip2")
+    concat.add_argument("--append", action="store_true", help="append to the output instead of replacing it")
+
+    build = subparsers.add_parser("build", help="write edge files followed by a node for every distinct source")
+    build.add_argument("output", help="output file, compressed if it ends with .gz or .zst")
+    build.add_argument("inputs", nargs="+", help="edge files, optionally compressed with gzip or bzip2")
+    build.add_argument("--append", action="store_true", help="append to the output instead of replacing it")
+    build.add_argument("--partitions", type=int, default=DEFAULT_NUM_PARTITIONS, help="partitions of the node names")
+    build.add_argument("--spill-dir", default=None, help="directory of the spill files, next to the output by default")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        stats = convert_ntriples(args.input, args.output_dir, args.workers, args.block_size, args.partitions)
+    elif args.command == "nodes":
+        stats = {"nodes": extract_nodes(args.inputs, args.output, args.partitions, args.spill_dir, args.append)}
+    elif args.command == "concat":
+        stats = {"bytes": concat_files(args.inputs, args.output, args.append)}
+    else:
+        stats = build_quad_file(args.inputs, args.output, args.partitions, args.spill_dir, args.append)
+    print(", ".join(f"{value} {key}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
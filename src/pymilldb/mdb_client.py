@@ -1,7 +1,12 @@
 import socket
-from typing import Tuple
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Tuple
 
 from . import decorators, packer, protocol
+from .metrics import ClientMetrics, RequestRecord
+from .pipeline import Pipeline
 
 
 ## Interface for stablishing a connection with the server for
@@ -9,20 +14,79 @@ from . import decorators, packer, protocol
 #
 # Almost every class and function in this library needs a `MDBClient` instance
 # as an argument to communicate with the server.
+#
+# A client is a single connection. Requests are serialized with a lock, so a client can be
+# shared between threads, but only one request is on the wire at a time. See `MDBClientPool`
+# for concurrent requests over several connections.
 class MDBClient:
     ## Constructor.
-    def __init__(self, host: str = "localhost", port: int = 8080) -> None:
+    #
+    # When `sock` is given, the client uses that already connected socket instead of
+    # connecting to `host` and `port`. When `metrics` is given, every request is recorded
+    # in it, see `ClientMetrics`.
+    #
+    # Classes that open connections of their own, such as `Sampler.stream` and
+    # `PartitionedNodeIterator`, connect to `host` and `port` again. A client created from a
+    # socket has no address to connect to, so `connect` must be given to them: a function that
+    # returns a new socket connected to the same server.
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8080,
+        sock: socket.socket | None = None,
+        metrics: ClientMetrics | None = None,
+        connect: Callable[[], socket.socket] | None = None,
+    ) -> None:
         ## Address of the server.
         self.address = (host, port)
+        ## Metrics of the requests, `None` when disabled.
+        self.metrics = metrics
 
+        self._connect_socket = connect
+        self._from_socket = sock is not None
         self._sock = None
         self._closed = True
-        self._connect()
+        self._header = bytearray(protocol.HEADER_SIZE)
+        self._lock = threading.RLock()
+        self._pipeline: Pipeline = None
+        if sock is None:
+            self._connect()
+        else:
+            self._sock = sock
+            self._closed = False
 
     ## Returns `True` if the connection with the server is closed.
     def is_closed(self) -> bool:
         return self._closed
 
+    ## Returns `True` if the connection is open and has no unexpected data waiting to be read.
+    #
+    # A connection closed by the server or with leftover bytes from an interrupted request
+    # can not be used anymore.
+    def is_healthy(self) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            timeout = self._sock.gettimeout()
+            try:
+                self._sock.settimeout(0.0)
+                self._sock.recv(1, socket.MSG_PEEK)
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            finally:
+                self._sock.settimeout(timeout)
+            return False
+
+    ## Context manager that yields the connection to use for a sequence of requests.
+    #
+    # A client is its own single connection. This mirrors `MDBClientPool.connection`, so code
+    # that keeps per-connection state can take either of them.
+    @contextmanager
+    def connection(self) -> Iterator["MDBClient"]:
+        yield self
+
     ## Closes the connection with the server.
     def close(self) -> None:
         if not self._closed:
@@ -38,6 +102,43 @@ class MDBClient:
     def __exit__(self, *_) -> None:
         self.close()
 
+    ## Context manager that puts the client in pipelined mode.
+    #
+    # Inside the block every request made through this client, for instance with
+    # `GraphWalker.get_node` or `TensorStore.contains`, is queued and returns a
+    # `PipelineResult` instead of its result. Queued requests are sent together with a single
+    # `sendall` when the block exits, when `max_pending` requests are queued, when `flush` is
+    # called or when a result is read, and their responses are read in order. This saves a
+    # round trip per request when requests do not depend on each other.
+    #
+    # The client is locked by the calling thread for the whole block. Request errors are stored
+    # in their results, and the first one that was never retrieved is raised when the block exits.
+    @contextmanager
+    def pipeline(self, max_pending: int = 1024) -> Iterator[Pipeline]:
+        with self._lock:
+            if self._pipeline is not None:
+                raise RuntimeError("The client is already in pipelined mode")
+            pipeline = Pipeline(self, max_pending)
+            self._pipeline = pipeline
+            try:
+                yield pipeline
+                pipeline.flush()
+            except BaseException as e:
+                pipeline._discard(e)
+                raise
+            finally:
+                self._pipeline = None
+            pipeline._raise_unretrieved()
+
+    # Opens a new connection to the same server, with the same metrics
+    def _reconnect(self) -> "MDBClient":
+        if self._connect_socket is not None:
+            sock = self._connect_socket()
+            return MDBClient(*self.address, sock=sock, metrics=self.metrics, connect=self._connect_socket)
+        if self._from_socket:
+            raise ValueError("The client was created from a socket, give it `connect` to open more connections")
+        return MDBClient(*self.address, metrics=self.metrics)
+
     def _connect(self) -> None:
         try:
             self._sock = socket.create_connection(self.address)
@@ -47,37 +148,141 @@ class MDBClient:
                 f"Couldn't connect to MillenniumDB server at {self.address}"
             ) from e
 
+    # Sends a request and receives its response as a single operation. Requests queued in
+    # pipelined mode are sent first, so the responses keep the order of the requests
+    @decorators.check_closed
+    def _request(self, request_type: protocol.RequestType, data: bytes) -> Tuple[bytearray, protocol.StatusCode]:
+        data, status, record = self._exchange(request_type, data)
+        if record is not None:
+            self.metrics._end(record)
+        return data, status
+
+    # Makes a request whose response is decoded with `decode`. In pipelined mode the request is
+    # queued and a `PipelineResult` is returned instead
+    @decorators.check_closed
+    def _call(self, request_type: protocol.RequestType, data: bytes, decode: Callable[[bytearray], Any] | None) -> Any:
+        with self._lock:
+            if self._pipeline is not None:
+                return self._pipeline._call(request_type, data, decode)
+            data, _, record = self._exchange(request_type, data)
+        if record is not None:
+            return self.metrics._decode(record, data, decode)
+        return None if decode is None else decode(data)
+
+    # Sends a request and receives its response. When metrics are enabled the record of the
+    # request is returned too, and the caller ends it once the response is decoded
+    @decorators.check_closed
+    def _exchange(
+        self, request_type: protocol.RequestType, data: bytes
+    ) -> Tuple[bytearray, protocol.StatusCode, RequestRecord | None]:
+        with self._lock:
+            if self._pipeline is not None:
+                self._pipeline.flush()
+            if self.metrics is None:
+                self._send(request_type, data)
+                return *self._recv(), None
+            record = self.metrics._begin(request_type, data)
+            try:
+                self._send(request_type, data)
+                record.sent = time.perf_counter()
+                return *self._recv(record), record
+            except BaseException as e:
+                self.metrics._end(record, e)
+                raise
+
+    # Makes a request and calls `work` while the server handles it. Returns the result of `work`
+    # and the response decoded with `decode`. The response is read even if `work` fails, so the
+    # stream stays in sync. With metrics enabled the `server` phase includes the time of `work`
+    @decorators.check_closed
+    def _overlap(
+        self,
+        request_type: protocol.RequestType,
+        data: bytes,
+        work: Callable[[], Any],
+        decode: Callable[[bytearray], Any],
+    ) -> Tuple[Any, Any]:
+        with self._lock:
+            if self._pipeline is not None:
+                self._pipeline.flush()
+            record = None if self.metrics is None else self.metrics._begin(request_type, data)
+            try:
+                self._send(request_type, data)
+                if record is not None:
+                    record.sent = time.perf_counter()
+                try:
+                    value = work()
+                finally:
+                    response, _ = self._recv(record)
+            except BaseException as e:
+                if record is not None:
+                    self.metrics._end(record, e)
+                raise
+        if record is not None:
+            return value, self.metrics._decode(record, response, decode)
+        return value, decode(response)
+
     @decorators.check_closed
     def _send(self, request_type: protocol.RequestType, data: bytes) -> None:
         header = packer.pack_byte(request_type) + packer.pack_uint64(len(data))
-        self._sock.sendall(header + data)
+        self._sendall(header + data)
 
     @decorators.check_closed
-    def _recv(self) -> Tuple[bytes, protocol.StatusCode]:
-        # Helper function to receive exactly `length` bytes
-        def recvall(length: int) -> bytes:
-            data = b""
-            while len(data) < length:
-                msg = self._sock.recv(length - len(data))
-                if len(msg) == 0:
-                    raise ConnectionError("Server closed the connection")
-                data += msg
-            return data
+    def _sendall(self, buffer: bytes) -> None:
+        try:
+            self._sock.sendall(buffer)
+        except BaseException:
+            # A partially sent request leaves the stream in an unknown state
+            self.close()
+            raise
 
+    @decorators.check_closed
+    def _recv(self, record: RequestRecord | None = None) -> Tuple[bytearray, protocol.StatusCode]:
         # Each message contains:
         # - 1 bit                      : Last message flag
         # - 7 bits                     : Status code
         # - 2 bytes                    : message.size()
         # - (message.size() - 3) bytes : Data
-        data = b""
-        while True:
-            msg = recvall(protocol.BUFFER_SIZE)
-            msg_size = int.from_bytes(msg[1:3], "little")
-            data += msg[3:msg_size]
-            if protocol.last_message(msg[0]):
-                break
+        #
+        # Every frame header is read into `header` and its payload is received straight after the
+        # previous payload in `data`. The padding of a frame is overwritten by the next one, so the
+        # whole response is reassembled without copying.
+        header = self._header
+        data = bytearray(protocol.BUFFER_SIZE)
+        size = 0
+        num_frames = 0
+        try:
+            while True:
+                self._recv_into(memoryview(header))
+                if num_frames == 0 and record is not None:
+                    record.first_byte = time.perf_counter()
+                num_frames += 1
+                if size + protocol.PAYLOAD_SIZE > len(data):
+                    # Double the capacity so the reassembly stays linear in the response size
+                    data.extend(bytes(max(len(data), protocol.PAYLOAD_SIZE)))
+                with memoryview(data) as view:
+                    self._recv_into(view[size : size + protocol.PAYLOAD_SIZE])
+                size += int.from_bytes(header[1:3], "little") - protocol.HEADER_SIZE
+                if protocol.last_message(header[0]):
+                    break
+        except BaseException:
+            # A partially received response leaves the stream in an unknown state
+            self.close()
+            raise
+        del data[size:]
+        if record is not None:
+            record.received = time.perf_counter()
+            record.bytes_received = size
+            record.frames_received = num_frames
 
         # Check if the server threw an exception
-        if protocol.error_status(msg[0]):
+        if protocol.error_status(header[0]):
             raise Exception(data.decode("utf-8"))
-        return data, protocol.decode_status(msg[0])
+        return data, protocol.decode_status(header[0])
+
+    # Fills `view` with exactly `len(view)` bytes from the socket
+    def _recv_into(self, view: memoryview) -> None:
+        while len(view) > 0:
+            num_bytes = self._sock.recv_into(view)
+            if num_bytes == 0:
+                raise ConnectionError("Server closed the connection")
+            view = view[num_bytes:]
@@ -0,0 +1,193 @@
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Tuple
+
+from . import decorators, protocol
+from .mdb_client import MDBClient
+from .metrics import ClientMetrics
+
+
+## Thread-safe pool of `MDBClient` connections.
+#
+# Connections are created lazily up to `max_size` and are handed out exclusively to one
+# thread at a time. Every class that takes a `MDBClient` also takes a pool: stateless
+# requests check out a connection for a single request, `TensorStore` opens its handle on
+# each connection it uses and `NodeIterator` keeps one connection checked out while it
+# is alive.
+class MDBClientPool:
+    ## Constructor.
+    #
+    # `timeout` is the maximum number of seconds to wait for a free connection, `None`
+    # waits forever. When `check_health` is `True` idle connections are checked before being
+    # handed out and replaced if the server closed them. When `metrics` is given, it is shared
+    # by every connection of the pool, see `ClientMetrics`.
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = protocol.DEFAULT_PORT,
+        max_size: int = 8,
+        timeout: float | None = None,
+        check_health: bool = True,
+        metrics: ClientMetrics | None = None,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive integer, got {max_size}")
+
+        ## Address of the server.
+        self.address = (host, port)
+        ## Maximum number of open connections.
+        self.max_size = max_size
+        ## Maximum number of seconds to wait for a free connection.
+        self.timeout = timeout
+        ## Whether idle connections are checked before being handed out.
+        self.check_health = check_health
+        ## Metrics of the requests of every connection, `None` when disabled.
+        self.metrics = metrics
+
+        self._idle: List[MDBClient] = list()
+        # Thread that checked out every connection in use
+        self._owners: Dict[MDBClient, int] = dict()
+        self._num_connections = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    ## Returns `True` if the pool is closed.
+    def is_closed(self) -> bool:
+        return self._closed
+
+    ## Number of open connections, both idle and checked out.
+    def size(self) -> int:
+        return self._num_connections
+
+    ## Closes the idle connections. Checked out connections are closed when they are released.
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, list()
+            self._num_connections -= len(idle)
+            self._condition.notify_all()
+        for client in idle:
+            client.close()
+
+    ## Enter context manager.
+    def __enter__(self) -> "MDBClientPool":
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    ## Checks out a connection. It must be given back with `release`.
+    @decorators.check_closed
+    def acquire(self, timeout: float | None = None) -> MDBClient:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._num_connections >= self.max_size:
+                    if self._closed:
+                        raise Exception(f"{self.__class__.__name__} instance is closed")
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No connection available after {timeout} seconds")
+                    self._condition.wait(remaining)
+                if self._idle:
+                    client = self._idle.pop()
+                else:
+                    # Reserve the slot, the connection is created outside the lock
+                    client = None
+                    self._num_connections += 1
+
+            if client is None:
+                try:
+                    client = MDBClient(*self.address, metrics=self.metrics)
+                except BaseException:
+                    self._discard()
+                    raise
+            elif self.check_health and not client.is_healthy():
+                client.close()
+                self._discard()
+                continue
+            with self._condition:
+                self._owners[client] = threading.get_ident()
+            return client
+
+    ## Gives back a connection obtained with `acquire`.
+    def release(self, client: MDBClient) -> None:
+        with self._condition:
+            self._owners.pop(client, None)
+            if not self._closed and not client.is_closed():
+                self._idle.append(client)
+                # Threads waiting for this connection in `_checkout` wait on the same condition
+                self._condition.notify_all()
+                return
+        client.close()
+        self._discard()
+
+    ## Context manager that checks out a connection and releases it on exit.
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[MDBClient]:
+        client = self.acquire(timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    # Sends a request over any free connection and receives its response
+    def _request(self, request_type: protocol.RequestType, data: bytes) -> Tuple[bytearray, protocol.StatusCode]:
+        with self.connection() as client:
+            return client._request(request_type, data)
+
+    # Makes a request over any free connection, its response is decoded after the connection is released
+    def _call(self, request_type: protocol.RequestType, data: bytes, decode: Callable[[bytearray], Any] | None) -> Any:
+        with self.connection() as client:
+            data, _, record = client._exchange(request_type, data)
+        if record is not None:
+            return client.metrics._decode(record, data, decode)
+        return None if decode is None else decode(data)
+
+    # Context manager that checks out `client`, a connection of this pool, once it is idle. Yields
+    # `False` without checking it out if it was closed instead. A connection checked out by the
+    # calling thread is not used by any other thread, so it is yielded right away and left
+    # checked out, as waiting for it would never end
+    @contextmanager
+    def _checkout(self, client: MDBClient) -> Iterator[bool]:
+        with self._condition:
+            if self._owners.get(client) == threading.get_ident():
+                owned = not client.is_closed()
+            else:
+                owned = None
+        if owned is not None:
+            yield owned
+            return
+        with self._condition:
+            while client not in self._idle and not (client.is_closed() or self._closed):
+                self._condition.wait()
+            acquired = client in self._idle
+            if acquired:
+                self._idle.remove(client)
+                self._owners[client] = threading.get_ident()
+        if not acquired:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self.release(client)
+
+    def _discard(self) -> None:
+        with self._condition:
+            self._num_connections -= 1
+            self._condition.notify_all()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(address={self.address}, size={self._num_connections}, max_size={self.max_size})"
+
+
+# Returns a function that gives a connection of its own to every caller, checked out of the
+# pool or opened to the same server as the client
+def _connection_factory(client: "MDBClient | MDBClientPool") -> Callable[[], ContextManager[MDBClient]]:
+    if isinstance(client, MDBClientPool):
+        return client.connection
+    return lambda: closing(client._reconnect())
@@ -0,0 +1,296 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List
+
+from .protocol import BUFFER_SIZE, REQUEST_HEADER_SIZE, RequestType
+
+## Default upper bounds in seconds of the latency histogram buckets.
+DEFAULT_BUCKETS = (
+    0.000_01, 0.000_025, 0.000_05,
+    0.000_1, 0.000_25, 0.000_5,
+    0.001, 0.002_5, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+PHASES = ("wire", "server", "decode")
+
+
+## Timings and sizes of a single request, as seen by the hooks of `ClientMetrics`.
+#
+# Times are `time.perf_counter()` values. `start` is taken right before sending, `sent` when
+# the request was written, `first_byte` when the first frame header arrived, `received` when
+# the last frame arrived and `decoded` when the response was decoded. Timings that were not
+# reached, because of an error or because the response is not decoded, are `None`.
+class RequestRecord:
+    __slots__ = (
+        "request_type",
+        "bytes_sent",
+        "bytes_received",
+        "frames_received",
+        "start",
+        "sent",
+        "first_byte",
+        "received",
+        "decoded",
+        "error",
+    )
+
+    def __init__(self, request_type: RequestType, bytes_sent: int) -> None:
+        ## Request type.
+        self.request_type = request_type
+        ## Bytes of the request, header included.
+        self.bytes_sent = bytes_sent
+        ## Bytes of the response payload, frame headers and padding excluded.
+        self.bytes_received = 0
+        ## Number of frames of the response.
+        self.frames_received = 0
+        self.start: float = None
+        self.sent: float = None
+        self.first_byte: float = None
+        self.received: float = None
+        self.decoded: float = None
+        ## Exception raised by the request or by its decoding, if any.
+        self.error: BaseException | None = None
+
+    ## Seconds spent writing the request and reading the response frames.
+    @property
+    def wire_time(self) -> float | None:
+        if self.received is None or self.sent is None:
+            return None
+        return (self.sent - self.start) + (self.received - self.first_byte)
+
+    ## Seconds between the request being written and the first frame arriving.
+    @property
+    def server_time(self) -> float | None:
+        if self.first_byte is None or self.sent is None:
+            return None
+        return self.first_byte - self.sent
+
+    ## Seconds spent decoding the response.
+    @property
+    def decode_time(self) -> float | None:
+        if self.decoded is None or self.received is None:
+            return None
+        return self.decoded - self.received
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(request_type={_name(self.request_type)}, bytes_sent={self.bytes_sent}, "
+            f"bytes_received={self.bytes_received}, frames_received={self.frames_received})"
+        )
+
+
+## Histogram with fixed buckets.
+#
+# Observing a value is a binary search and an increment, so it is cheap enough to do on
+# every request.
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    ## Constructor. `bounds` are the sorted upper bounds of the buckets, a last bucket
+    # holds the values above them.
+    def __init__(self, bounds: tuple = DEFAULT_BUCKETS) -> None:
+        ## Upper bounds of the buckets.
+        self.bounds = tuple(bounds)
+        ## Number of values in each bucket, not cumulative.
+        self.counts = [0] * (len(self.bounds) + 1)
+        ## Sum of the observed values.
+        self.sum = 0.0
+        ## Number of observed values.
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    ## Upper bound of the bucket holding the `q` quantile, `inf` if it is above every bound.
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    ## Returns the cumulative bucket counts by upper bound, together with the sum and count.
+    def snapshot(self) -> dict:
+        buckets = list()
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+# Counters and histograms of a single request type
+class _RequestStats:
+    __slots__ = ("requests", "errors", "bytes_sent", "bytes_received", "frames_received", "histograms")
+
+    def __init__(self, buckets: tuple) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.histograms = {phase: Histogram(buckets) for phase in PHASES}
+
+
+## Per request type counters and latency histograms of one or more clients.
+#
+# Enabled by giving an instance to `MDBClient` or `MDBClientPool` with the `metrics`
+# argument, and shared by every connection it is given to. For each request type it counts
+# requests, errors, bytes sent, payload bytes received and frames received, and splits the
+# latency of each request in three phases:
+# - `wire`: writing the request and reading the response frames.
+# - `server`: waiting for the first frame after the request was written.
+# - `decode`: decoding the response into Python objects.
+#
+# Requests queued with `MDBClient.pipeline` are written together, so their `server` phase
+# is measured from the end of the previous response.
+#
+# Hooks receive the `RequestRecord` of each request, pre-request hooks before it is sent and
+# post-request hooks once it is done. They run in the thread making the request and any
+# exception they raise is propagated to it.
+class ClientMetrics:
+    ## Constructor.
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        if list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be sorted")
+
+        ## Upper bounds in seconds of the latency histogram buckets.
+        self.buckets = tuple(buckets)
+
+        self._stats: Dict[int, _RequestStats] = dict()
+        self._pre_hooks: List[Callable[[RequestRecord], Any]] = list()
+        self._post_hooks: List[Callable[[RequestRecord], Any]] = list()
+        self._lock = threading.Lock()
+
+    ## Adds a callback called with the `RequestRecord` of every request before it is sent.
+    def add_pre_hook(self, hook: Callable[[RequestRecord], Any]) -> None:
+        self._pre_hooks.append(hook)
+
+    ## Adds a callback called with the `RequestRecord` of every request once it is done.
+    def add_post_hook(self, hook: Callable[[RequestRecord], Any]) -> None:
+        self._post_hooks.append(hook)
+
+    def remove_pre_hook(self, hook: Callable[[RequestRecord], Any]) -> None:
+        self._pre_hooks.remove(hook)
+
+    def remove_post_hook(self, hook: Callable[[RequestRecord], Any]) -> None:
+        self._post_hooks.remove(hook)
+
+    ## Clears every counter and histogram. Hooks are kept.
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = dict()
+
+    ## Returns the counters and histograms by request type name.
+    #
+    # Every request type maps to a dict with the `requests`, `errors`, `bytes_sent`,
+    # `bytes_received` and `frames_received` counters and the `wire`, `server` and `decode`
+    # histograms, as returned by `Histogram.snapshot`.
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            snapshot = dict()
+            for request_type, stats in sorted(self._stats.items()):
+                entry = {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                    "frames_received": stats.frames_received,
+                }
+                for phase, histogram in stats.histograms.items():
+                    entry[phase] = histogram.snapshot()
+                snapshot[_name(request_type)] = entry
+            return snapshot
+
+    ## Returns the counters and histograms in the Prometheus text exposition format.
+    def to_prometheus(self, prefix: str = "pymilldb") -> str:
+        snapshot = self.snapshot()
+        lines = list()
+        counters = [
+            ("requests", "requests_total", "Requests sent to the server."),
+            ("errors", "request_errors_total", "Requests that failed."),
+            ("bytes_sent", "sent_bytes_total", "Bytes sent to the server."),
+            ("bytes_received", "received_bytes_total", "Payload bytes received from the server."),
+            ("frames_received", "received_frames_total", f"Frames of {BUFFER_SIZE} bytes received from the server."),
+        ]
+        for key, name, description in counters:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for request_type, entry in snapshot.items():
+                lines.append(f'{prefix}_{name}{{request_type="{request_type}"}} {entry[key]}')
+
+        name = f"{prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} Time spent in each phase of a request.")
+        lines.append(f"# TYPE {name} histogram")
+        for request_type, entry in snapshot.items():
+            for phase in PHASES:
+                labels = f'request_type="{request_type}",phase="{phase}"'
+                histogram = entry[phase]
+                for bound, count in histogram["buckets"]:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram['sum']!r}")
+                lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self) -> str:
+        with self._lock:
+            num_requests = sum(stats.requests for stats in self._stats.values())
+        return f"{self.__class__.__name__}(requests={num_requests})"
+
+    # Creates the record of a request that is about to be sent
+    def _begin(self, request_type: RequestType, data: bytes) -> RequestRecord:
+        record = RequestRecord(request_type, REQUEST_HEADER_SIZE + len(data))
+        for hook in self._pre_hooks:
+            hook(record)
+        record.start = time.perf_counter()
+        return record
+
+    # Decodes a response, timing the decoding, and ends its record
+    def _decode(self, record: RequestRecord, data: bytearray, decode: Callable[[bytearray], Any] | None) -> Any:
+        if decode is None:
+            self._end(record)
+            return None
+        try:
+            value = decode(data)
+        except BaseException as e:
+            self._end(record, e)
+            raise
+        record.decoded = time.perf_counter()
+        self._end(record)
+        return value
+
+    # Adds a finished request to the counters and histograms
+    def _end(self, record: RequestRecord, error: BaseException | None = None) -> None:
+        record.error = error
+        with self._lock:
+            stats = self._stats.get(record.request_type)
+            if stats is None:
+                stats = self._stats[record.request_type] = _RequestStats(self.buckets)
+            stats.requests += 1
+            stats.errors += error is not None
+            stats.bytes_sent += record.bytes_sent
+            stats.bytes_received += record.bytes_received
+            stats.frames_received += record.frames_received
+            for phase, value in zip(PHASES, (record.wire_time, record.server_time, record.decode_time)):
+                if value is not None:
+                    stats.histograms[phase].observe(value)
+        for hook in self._post_hooks:
+            hook(record)
+
+
+def _name(request_type: int) -> str:
+    try:
+        return RequestType(request_type).name
+    except ValueError:
+        return str(request_type)
@@ -1,53 +1,307 @@
-from typing import TYPE_CHECKING, List
+import threading
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Iterator, List, Tuple
 
-from . import packer
+import numpy as np
+
+from . import decorators, packer
+from .mdb_client_pool import _connection_factory
+from .pipeline import _merge, _prefetch
 from .protocol import RequestType, StatusCode
 
 if TYPE_CHECKING:
+    from .async_mdb_client import AsyncMDBClient
     from .mdb_client import MDBClient
+    from .mdb_client_pool import MDBClientPool
 
 ## Interface for iterating over nodes in MillenniumDB.
+#
+# The iterator lives in the server connection where it was created. When a `MDBClientPool`
+# is given, a connection is checked out for the whole life of the iterator and it is given
+# back with `close`.
+#
+# With `prefetch` set, a background thread keeps requesting batches ahead of the consumer,
+# `prefetch` of them in flight at a time with `MDBClient.pipeline`. Batches are returned as
+# int64 arrays instead of lists when `arrays` is `True`. When `partition` is given as
+# `(index, num_partitions)`, only that partition of the nodes is iterated, partitions being
+# disjoint ranges that together cover every node. See `PartitionedNodeIterator` to scan
+# every partition concurrently. Partitions are created with a request that only
+# `stand_in_server` serves for now, `pymilldb_server` does not implement it yet.
 class NodeIterator:
     ## Constructor.
-    def __init__(self, client: "MDBClient", batch_size: int) -> None:
+    def __init__(
+        self,
+        client: "MDBClient | MDBClientPool",
+        batch_size: int,
+        prefetch: int = 0,
+        arrays: bool = False,
+        partition: Tuple[int, int] | None = None,
+    ) -> None:
         if batch_size <= 0:
             raise ValueError(f"batch_size must be positive integer, got {batch_size}")
+        if prefetch < 0:
+            raise ValueError(f"prefetch must be non-negative integer, got {prefetch}")
+        if partition is not None and not 0 <= partition[0] < partition[1]:
+            raise ValueError(f"partition must be (index, num_partitions) with index < num_partitions, got {partition}")
 
         ## Client instance.
         self.client = client
         ## Maximum batch size.
         self.batch_size = batch_size
+        ## Number of batches requested ahead of the consumer, 0 when disabled.
+        self.prefetch = prefetch
+        ## Whether batches are returned as int64 arrays.
+        self.arrays = arrays
+        ## Partition of the nodes iterated as `(index, num_partitions)`, `None` for every node.
+        self.partition = partition
 
         self._node_iterator_id = None
-        self._create()
+        self._batches: Iterator = None
+        self._exit_stack = ExitStack()
+        self._connection = self._exit_stack.enter_context(client.connection())
+        self._closed = False
+        try:
+            self._create()
+        except BaseException:
+            self.close()
+            raise
+
+    ## Returns `True` if the iterator is closed.
+    def is_closed(self) -> bool:
+        return self._closed
+
+    ## Releases the connection used by the iterator.
+    def close(self) -> None:
+        if not self._closed:
+            self._stop_prefetch()
+            self._exit_stack.close()
+            self._connection = None
+            self._closed = True
+
+    ## Enter context manager.
+    def __enter__(self) -> "NodeIterator":
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_) -> None:
+        self.close()
 
     def _create(self) -> None:
         msg = b""
         msg += packer.pack_uint64(self.batch_size)
-        self.client._send(RequestType.NODE_ITERATOR_CREATE, msg)
+        if self.partition is None:
+            data, _ = self._connection._request(RequestType.NODE_ITERATOR_CREATE, msg)
+        else:
+            msg += packer.pack_uint64(self.partition[0])
+            msg += packer.pack_uint64(self.partition[1])
+            data, _ = self._connection._request(RequestType.NODE_ITERATOR_CREATE_PARTITION, msg)
 
-        data, _ = self.client._recv()
         self._node_iterator_id = packer.unpack_uint64(data, 0, 8)
 
+    @decorators.check_closed
     def __iter__(self) -> "NodeIterator":
+        # A previous iteration may still be prefetching
+        self._stop_prefetch()
+        self._begin()
+        if self.prefetch > 0:
+            self._batches = _prefetch(self._pipelined_batches(), self.prefetch)
+        return self
+
+    @decorators.check_closed
+    def __next__(self) -> List[int] | np.ndarray:
+        if self._batches is not None:
+            return next(self._batches)
+
         msg = b""
         msg += packer.pack_uint64(self._node_iterator_id)
-        self.client._send(RequestType.NODE_ITERATOR_BEGIN, msg)
+        data, status = self._connection._request(RequestType.NODE_ITERATOR_NEXT, msg)
 
-        self.client._recv()
-        return self
+        if status == StatusCode.END_OF_ITERATION:
+            raise StopIteration
+
+        return _unpack_batch_array(data) if self.arrays else _unpack_batch(data)
 
-    def __next__(self) -> List[int]:
+    def _begin(self) -> None:
         msg = b""
         msg += packer.pack_uint64(self._node_iterator_id)
-        self.client._send(RequestType.NODE_ITERATOR_NEXT, msg)
+        self._connection._request(RequestType.NODE_ITERATOR_BEGIN, msg)
+
+    # Requests the batches `prefetch` at a time in a single pipeline, until the end of the
+    # iteration. Requests sent past the end are answered with its status too
+    def _pipelined_batches(self) -> Iterator[List[int] | np.ndarray]:
+        msg = packer.pack_uint64(self._node_iterator_id)
+        unpack = _unpack_batch_array if self.arrays else _unpack_batch
+        while True:
+            with self._connection.pipeline(self.prefetch):
+                results = [
+                    self._connection._call(RequestType.NODE_ITERATOR_NEXT, msg, None) for _ in range(self.prefetch)
+                ]
+            for result in results:
+                data = result.result()
+                if result.status == StatusCode.END_OF_ITERATION:
+                    return
+                yield unpack(data)
+
+    def _stop_prefetch(self) -> None:
+        if self._batches is not None:
+            self._batches.close()
+            self._batches = None
+
+
+## Iterator over the nodes of every partition, scanned concurrently over several connections.
+#
+# The nodes are split in `num_partitions` disjoint ranges, each one iterated by a background
+# thread with a `NodeIterator` on a connection of its own, checked out of the pool when a
+# `MDBClientPool` is given or opened to the same server otherwise. Each thread keeps
+# `prefetch` batches in flight. Batches are returned as they arrive, so batches of different
+# partitions are interleaved, and up to `num_partitions * prefetch` of them wait to be
+# consumed. The connections are released when the iteration ends, fails or is closed.
+#
+# Partitioned iterators are only served by `stand_in_server` for now. The first partition is
+# created before the others, and when the server answers its creation with an error, as
+# `pymilldb_server` does, that partition scans every node with a plain iterator and the others
+# are empty, so the nodes are still returned, over a single connection. Any other error, in
+# any partition, ends the iteration with that error.
+class PartitionedNodeIterator:
+    ## Constructor.
+    def __init__(
+        self,
+        client: "MDBClient | MDBClientPool",
+        batch_size: int,
+        num_partitions: int,
+        prefetch: int = 2,
+        arrays: bool = True,
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive integer, got {batch_size}")
+        if num_partitions <= 0:
+            raise ValueError(f"num_partitions must be positive integer, got {num_partitions}")
+        if prefetch <= 0:
+            raise ValueError(f"prefetch must be positive integer, got {prefetch}")
+
+        ## Client instance.
+        self.client = client
+        ## Maximum batch size.
+        self.batch_size = batch_size
+        ## Number of partitions scanned concurrently.
+        self.num_partitions = num_partitions
+        ## Number of batches in flight in each partition.
+        self.prefetch = prefetch
+        ## Whether batches are returned as int64 arrays.
+        self.arrays = arrays
+
+        self._partitioned = False
+        self._probed = threading.Event()
+        connect = _connection_factory(client)
+        partitions = [self._scan(connect, partition) for partition in range(num_partitions)]
+        self._batches = _merge(partitions, num_partitions * prefetch)
+        self._closed = False
 
-        data, status = self.client._recv()
+    ## Returns `True` if the iterator is closed.
+    def is_closed(self) -> bool:
+        return self._closed
 
+    ## Stops the scan and releases its connections.
+    def close(self) -> None:
+        if not self._closed:
+            self._batches.close()
+            self._closed = True
+
+    ## Enter context manager.
+    def __enter__(self) -> "PartitionedNodeIterator":
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __iter__(self) -> "PartitionedNodeIterator":
+        return self
+
+    @decorators.check_closed
+    def __next__(self) -> List[int] | np.ndarray:
+        try:
+            return next(self._batches)
+        except BaseException:
+            self.close()
+            raise
+
+    # The first partition finds out whether the server has partitioned iterators, and the
+    # others wait for it before they connect
+    def _scan(self, connect, partition: int) -> Iterator[List[int] | np.ndarray]:
+        if partition > 0:
+            self._probed.wait()
+            if not self._partitioned:
+                return
+        with connect() as client:
+            if partition > 0:
+                nodes = NodeIterator(client, self.batch_size, self.prefetch, self.arrays, (partition, self.num_partitions))
+            else:
+                try:
+                    nodes = NodeIterator(client, self.batch_size, self.prefetch, self.arrays, (0, self.num_partitions))
+                    self._partitioned = True
+                except Exception:
+                    if client.is_closed():
+                        raise
+                    # The server answered the creation with an error, it has no partitioned
+                    # iterators, so this partition scans every node and the others are empty
+                    nodes = NodeIterator(client, self.batch_size, self.prefetch, self.arrays)
+                finally:
+                    self._probed.set()
+            with nodes:
+                nodes._begin()
+                yield from nodes._pipelined_batches()
+
+
+## Asyncio counterpart of `NodeIterator`, used with `async for`.
+#
+# Creating the iterator needs a round trip, so instances are created with
+# `await AsyncNodeIterator.create(client, batch_size)`.
+class AsyncNodeIterator:
+    ## Creates a new iterator in the server.
+    @classmethod
+    async def create(cls, client: "AsyncMDBClient", batch_size: int) -> "AsyncNodeIterator":
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive integer, got {batch_size}")
+        data, _ = await client._request(RequestType.NODE_ITERATOR_CREATE, packer.pack_uint64(batch_size))
+        return cls(client, batch_size, packer.unpack_uint64(data, 0, 8))
+
+    ## Constructor, use `create` instead.
+    def __init__(self, client: "AsyncMDBClient", batch_size: int, node_iterator_id: int) -> None:
+        ## Client instance.
+        self.client = client
+        ## Maximum batch size.
+        self.batch_size = batch_size
+
+        self._node_iterator_id = node_iterator_id
+        self._begin = True
+
+    def __aiter__(self) -> "AsyncNodeIterator":
+        # The iteration is restarted lazily, `__aiter__` can not await
+        self._begin = True
+        return self
+
+    async def __anext__(self) -> List[int]:
+        msg = packer.pack_uint64(self._node_iterator_id)
+        if self._begin:
+            await self.client._request(RequestType.NODE_ITERATOR_BEGIN, msg)
+            self._begin = False
+
+        data, status = await self.client._request(RequestType.NODE_ITERATOR_NEXT, msg)
         if status == StatusCode.END_OF_ITERATION:
-            raise StopIteration
+            raise StopAsyncIteration
+        return _unpack_batch(data)
+
+
+def _unpack_batch(data: bytes) -> List[int]:
+    lo, hi = 0, 8
+    num_node_ids = packer.unpack_uint64(data, lo, hi)
+    lo, hi = hi, hi + 8 * num_node_ids
+    return packer.unpack_uint64_vector(data, lo, hi)
+
 
-        lo, hi = 0, 8
-        num_node_ids = packer.unpack_uint64(data, lo, hi)
-        lo, hi = hi, hi + 8 * num_node_ids
-        return packer.unpack_uint64_vector(data, lo, hi)
+def _unpack_batch_array(data: bytes) -> np.ndarray:
+    lo, hi = 0, 8
+    num_node_ids = packer.unpack_uint64(data, lo, hi)
+    lo, hi = hi, hi + 8 * num_node_ids
+    return packer.unpack_uint64_array(data, lo, hi, np.int64)
@@ -1,8 +1,21 @@
 import struct
 from typing import List
 
+import numpy as np
+import torch
+
 from .sampler import GraphSample
 
+# Wire dtypes, everything is sent in big-endian byte order
+UINT64 = np.dtype(">u8")
+FLOAT = np.dtype(">f4")
+
+
+def _as_numpy(vector) -> np.ndarray:
+    if isinstance(vector, torch.Tensor):
+        return vector.detach().cpu().numpy()
+    return vector
+
 
 def pack_byte(b: int) -> bytes:
     return struct.pack(">B", b)
@@ -17,31 +30,22 @@ def pack_uint64(i: int) -> bytes:
 
 
 def pack_string(string: str) -> bytes:
-    return pack_uint64(len(string)) + string.encode("utf-8")
+    encoded = string.encode("utf-8")
+    return pack_uint64(len(encoded)) + encoded
 
 
-def pack_uint64_vector(vector: List[int]) -> bytes:
-    data = b""
-    data += pack_uint64(len(vector))
-    for value in vector:
-        data += pack_uint64(value)
-    return data
+def pack_uint64_vector(vector: List[int] | np.ndarray | torch.Tensor) -> bytes:
+    array = np.asarray(_as_numpy(vector), dtype=UINT64).ravel()
+    return pack_uint64(len(array)) + array.tobytes()
 
 
-def pack_float_vector(vector: List[float]) -> bytes:
-    data = b""
-    data += pack_uint64(len(vector))
-    for value in vector:
-        data += struct.pack(">f", value)
-    return data
+def pack_float_vector(vector: List[float] | np.ndarray | torch.Tensor) -> bytes:
+    array = np.asarray(_as_numpy(vector), dtype=FLOAT).ravel()
+    return pack_uint64(len(array)) + array.tobytes()
 
 
 def pack_string_vector(vector: List[str]) -> bytes:
-    data = b""
-    data += pack_uint64(len(vector))
-    for value in vector:
-        data += pack_string(value)
-    return data
+    return b"".join([pack_uint64(len(vector))] + [pack_string(value) for value in vector])
 
 
 def unpack_bool(data: bytes, index: int) -> bool:
@@ -49,27 +53,42 @@ def unpack_bool(data: bytes, index: int) -> bool:
 
 
 def unpack_uint64(data: bytes, start: int, end: int) -> int:
-    return struct.unpack(">Q", data[start:end])[0]
+    return struct.unpack_from(">Q", data, start)[0]
 
 
 def unpack_int64(data: bytes, start: int, end: int) -> int:
-    return struct.unpack(">q", data[start:end])[0]
+    return struct.unpack_from(">q", data, start)[0]
 
 
 def unpack_float(data: bytes, start: int, end: int) -> float:
-    return struct.unpack(">f", data[start:end])[0]
+    return struct.unpack_from(">f", data, start)[0]
 
 
 def unpack_string(data: bytes, start: int, end: int) -> str:
-    return data[start:end].decode("utf-8")
+    return str(memoryview(data)[start:end], "utf-8")
+
+
+# Decodes `data[start:end]` as big-endian uint64 values into a native array of type `dtype`
+def unpack_uint64_array(data: bytes, start: int, end: int, dtype: np.dtype = np.uint64) -> np.ndarray:
+    return np.frombuffer(data, UINT64, (end - start) // 8, start).astype(dtype)
+
+
+# Decodes `data[start:end]` as big-endian float32 values into a native float32 array, or into
+# the flat float32 array `out` if given
+def unpack_float_array(data: bytes, start: int, end: int, out: np.ndarray | None = None) -> np.ndarray:
+    array = np.frombuffer(data, FLOAT, (end - start) // 4, start)
+    if out is None:
+        return array.astype(np.float32)
+    np.copyto(out, array)
+    return out
 
 
 def unpack_uint64_vector(data: bytes, start: int, end: int) -> List[int]:
-    return [unpack_uint64(data, i, i + 8) for i in range(start, end, 8)]
+    return np.frombuffer(data, UINT64, (end - start) // 8, start).tolist()
 
 
 def unpack_float_vector(data: bytes, start: int, end: int) -> List[float]:
-    return [unpack_float(data, i, i + 4) for i in range(start, end, 4)]
+    return np.frombuffer(data, FLOAT, (end - start) // 4, start).tolist()
 
 
 def unpack_graph(data: bytes) -> "GraphSample":
@@ -80,15 +99,15 @@ def unpack_graph(data: bytes) -> "GraphSample":
     lo, hi = hi, hi + 8
     num_edges = unpack_uint64(data, lo, hi)
 
+    # Node ids fit in int64, edge ids use the most significant bit so they are kept as uint64
     lo, hi = hi, hi + 8 * num_seeds
-    seed_ids = unpack_uint64_vector(data, lo, hi)
+    seed_ids = unpack_uint64_array(data, lo, hi, np.int64)
     lo, hi = hi, hi + 8 * num_nodes
-    node_ids = unpack_uint64_vector(data, lo, hi)
+    node_ids = unpack_uint64_array(data, lo, hi, np.int64)
     lo, hi = hi, hi + 8 * num_edges
-    edge_ids = unpack_uint64_vector(data, lo, hi)
+    edge_ids = unpack_uint64_array(data, lo, hi)
 
-    edge_index = [
-        unpack_uint64_vector(data, i, i + 16)
-        for i in range(hi, hi + 16 * num_edges, 16)
-    ]
+    # Edges are sent as (source, target) pairs, transposed into a contiguous (2, num_edges) tensor
+    pairs = np.frombuffer(data, UINT64, 2 * num_edges, hi).reshape(num_edges, 2)
+    edge_index = torch.from_numpy(pairs.T.astype(np.int64, order="C"))
     return GraphSample(seed_ids, node_ids, edge_ids, edge_index)
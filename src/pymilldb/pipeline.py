@@ -0,0 +1,251 @@
+import queue
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List
+
+from . import packer, protocol
+
+if TYPE_CHECKING:
+    from .mdb_client import MDBClient
+    from .metrics import RequestRecord
+
+# Batches larger than this are sent from a helper thread while the responses are being read,
+# otherwise the server could block writing responses while the client is still sending
+INLINE_SEND_SIZE = 64 * 1024
+
+
+## Result of a request made while a `MDBClient` is in pipelined mode.
+#
+# It is resolved when the pipeline is flushed. Calling `result` before that flushes the
+# pipeline.
+class PipelineResult:
+    def __init__(
+        self, pipeline: "Pipeline", decode: Callable[[bytearray], Any] | None, record: "RequestRecord | None" = None
+    ) -> None:
+        self._pipeline = pipeline
+        self._decode = decode
+        self._record = record
+        self._done = False
+        self._retrieved = False
+        self._value = None
+        self._exception = None
+        ## Status code of the response, set when it is received.
+        self.status: protocol.StatusCode | None = None
+
+    ## Returns `True` if the response was received.
+    def done(self) -> bool:
+        return self._done
+
+    ## Returns the decoded response, flushing the pipeline if needed. Raises the request error if any.
+    def result(self) -> Any:
+        if not self._done:
+            self._pipeline.flush()
+        self._retrieved = True
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+    ## Returns the request error, or `None` if it succeeded, flushing the pipeline if needed.
+    def exception(self) -> BaseException | None:
+        if not self._done:
+            self._pipeline.flush()
+        self._retrieved = True
+        return self._exception
+
+    def _set_response(self, data: bytearray) -> None:
+        try:
+            self._value = data if self._decode is None else self._decode(data)
+            if self._record is not None and self._decode is not None:
+                self._record.decoded = time.perf_counter()
+        except Exception as e:
+            self._exception = e
+        self._done = True
+        if self._record is not None:
+            self._pipeline.client.metrics._end(self._record, self._exception)
+
+    def _set_exception(self, exception: BaseException) -> None:
+        self._exception = exception
+        self._done = True
+        if self._record is not None:
+            self._pipeline.client.metrics._end(self._record, exception)
+
+    def __repr__(self) -> str:
+        state = "pending" if not self._done else "error" if self._exception is not None else "done"
+        return f"{self.__class__.__name__}({state})"
+
+
+# Returns a value obtained without a request, as a resolved `PipelineResult` when `client` is
+# in pipelined mode, so it reads like the results of the requests around it
+def _resolved(client: Any, value: Any) -> Any:
+    pipeline = getattr(client, "_pipeline", None)
+    if pipeline is None:
+        return value
+    result = PipelineResult(pipeline, None)
+    result._set_response(value)
+    return result
+
+
+## Queue of requests sent together over a `MDBClient` connection.
+#
+# Created with `MDBClient.pipeline()`. Requests are queued instead of being sent, then
+# written with a single `sendall` when the pipeline is flushed and their responses are read
+# in order. Every call that goes through the client meanwhile returns a `PipelineResult`.
+class Pipeline:
+    ## Constructor.
+    def __init__(self, client: "MDBClient", max_pending: int = 1024) -> None:
+        if max_pending <= 0:
+            raise ValueError(f"max_pending must be positive integer, got {max_pending}")
+
+        ## Client instance.
+        self.client = client
+        ## The pipeline is flushed automatically when this many requests are queued.
+        self.max_pending = max_pending
+
+        self._requests: List[bytes] = list()
+        self._results: List[PipelineResult] = list()
+        self._failed: List[PipelineResult] = list()
+
+    ## Number of queued requests.
+    def __len__(self) -> int:
+        return len(self._results)
+
+    ## Sends every queued request and reads their responses.
+    def flush(self) -> None:
+        if not self._results:
+            return
+        requests, self._requests = self._requests, list()
+        results, self._results = self._results, list()
+        buffer = b"".join(requests)
+
+        sender = None
+        send_error = list()
+        start = time.perf_counter()
+        if len(buffer) <= INLINE_SEND_SIZE:
+            self.client._sendall(buffer)
+        else:
+            sender = threading.Thread(target=self._send_in_background, args=(buffer, send_error), daemon=True)
+            sender.start()
+        sent = time.perf_counter()
+
+        try:
+            for result in results:
+                record = result._record
+                if record is not None:
+                    # Each request waits for the responses before it
+                    record.start, record.sent = start, sent
+                try:
+                    data, status = self.client._recv(record)
+                except Exception as e:
+                    if self.client.is_closed():
+                        raise
+                    # The server failed this request, the stream is still consistent
+                    result._set_exception(e)
+                    self._failed.append(result)
+                    continue
+                result.status = status
+                result._set_response(data)
+                if result._exception is not None:
+                    self._failed.append(result)
+                if record is not None:
+                    start = sent = record.received
+        except BaseException as e:
+            for result in results:
+                if not result._done:
+                    result._set_exception(e)
+            raise
+        finally:
+            if sender is not None:
+                sender.join()
+        if send_error:
+            raise send_error[0]
+
+    # Queues a request whose response is decoded with `decode`
+    def _call(self, request_type: protocol.RequestType, data: bytes, decode: Callable[[bytearray], Any] | None) -> PipelineResult:
+        self._requests.append(packer.pack_byte(request_type) + packer.pack_uint64(len(data)) + data)
+        metrics = self.client.metrics
+        result = PipelineResult(self, decode, None if metrics is None else metrics._begin(request_type, data))
+        self._results.append(result)
+        if len(self._results) >= self.max_pending:
+            self.flush()
+        return result
+
+    # Drops the requests that were not sent
+    def _discard(self, exception: BaseException) -> None:
+        for result in self._results:
+            result._set_exception(exception)
+        self._requests, self._results = list(), list()
+
+    # Raises the first request error that was never retrieved through its result
+    def _raise_unretrieved(self) -> None:
+        failed, self._failed = self._failed, list()
+        for result in failed:
+            if not result._retrieved:
+                raise result._exception
+
+    def _send_in_background(self, buffer: bytes, errors: List[BaseException]) -> None:
+        sock = self.client._sock
+        try:
+            sock.sendall(buffer)
+        except BaseException as e:
+            errors.append(e)
+            # Wakes up the thread reading the responses, which closes the client
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+# Iterates `iterable` in a background thread, keeping up to `size` items ready
+def _prefetch(iterable: Iterable, size: int) -> Iterator:
+    return _merge([iterable], size)
+
+
+# Iterates every iterable in its own background thread, yielding their items as they are
+# ready, up to `size` of them ahead. Items of each iterable keep their order. The iterables
+# are closed in their threads when they end or when the iteration stops early
+def _merge(iterables: List[Iterable], size: int) -> Iterator:
+    items = queue.Queue(size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce(iterable: Iterable) -> None:
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                put(item)
+                if stop.is_set():
+                    break
+            put(done)
+        except BaseException as e:
+            put(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    producers = [threading.Thread(target=produce, args=(iterable,), daemon=True) for iterable in iterables]
+    for producer in producers:
+        producer.start()
+    try:
+        num_running = len(producers)
+        while num_running > 0:
+            item = items.get()
+            if item is done:
+                num_running -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for producer in producers:
+            producer.join()
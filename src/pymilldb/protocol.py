@@ -2,6 +2,9 @@ from enum import IntEnum
 
 DEFAULT_PORT = 8080
 BUFFER_SIZE = 4096
+REQUEST_HEADER_SIZE = 9  # Request type byte followed by the 8-byte data size
+HEADER_SIZE = 3  # Status byte followed by the 2-byte message size
+PAYLOAD_SIZE = BUFFER_SIZE - HEADER_SIZE
 
 END_MASK = 0b1000_0000  # Set to 1 if it is the last message
 ERROR_MASK = 0b0100_0000  # Set to 1 if the status code is an error
@@ -35,6 +38,18 @@ class RequestType(IntEnum):
     GRAPH_WALKER_GET_NODE = 0b0001_0010
     GRAPH_WALKER_GET_NODE_IDS_BY_LABEL = 0b0001_0011
     GRAPH_WALKER_GET_EDGE_IDS_BY_TYPE = 0b0001_0100
+    # Served by `stand_in_server` only, `pymilldb_server` does not implement it yet
+    GRAPH_WALKER_RESOLVE_NAMES = 0b0001_0101
+    # NODE ITERATOR
+    # Served by `stand_in_server` only, `pymilldb_server` does not implement it yet
+    NODE_ITERATOR_CREATE_PARTITION = 0b0001_0110
+    # GRAPH EXPLORER
+    # Served by `stand_in_server` only, `pymilldb_server` does not implement them yet
+    GRAPH_WALKER_GET_NODES = 0b0001_0111
+    GRAPH_WALKER_GET_EDGES_MANY = 0b0001_1000
+    # SAMPLER
+    # Served by `stand_in_server` only, `pymilldb_server` does not implement it yet
+    SAMPLER_SUBGRAPH_WITH_FEATURES = 0b0001_1001
 
 
 ## Server response status codes.
@@ -62,3 +77,16 @@ def error_status(status: int) -> bool:
 
 def decode_status(status: int) -> "StatusCode":
     return StatusCode(status & STATUS_MASK)
+
+
+## Splits a response in frames of `BUFFER_SIZE` bytes, as the server sends it.
+def pack_response(status: int, payload: bytes) -> bytes:
+    frames = bytearray()
+    for start in range(0, max(len(payload), 1), PAYLOAD_SIZE):
+        chunk = payload[start : start + PAYLOAD_SIZE]
+        last = start + PAYLOAD_SIZE >= len(payload)
+        frames.append(status | END_MASK if last else status)
+        frames += (len(chunk) + HEADER_SIZE).to_bytes(2, "little")
+        frames += chunk
+        frames += bytes(PAYLOAD_SIZE - len(chunk))
+    return bytes(frames)
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+from numbers import Integral
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+
+from . import packer
+from .pipeline import _resolved
+from .protocol import RequestType
+
+if TYPE_CHECKING:
+    from .mdb_client import MDBClient
+    from .mdb_client_pool import MDBClientPool
+
+
+## Resolves node names to node ids, keeping the resolved names in a bounded cache.
+#
+# Every class that takes a node name, such as `GraphWalker` and `TensorStore`, sends it as a
+# string that the server resolves on every request. Resolving the names once and using the
+# ids afterwards sends 8 bytes per key instead and skips the lookup on the server.
+#
+# `resolve` sends the names that are not cached in a single request. The cache holds up to
+# `max_size` names and evicts the least recently used ones. Names that were not found are
+# not cached. Requests can be pipelined with `MDBClient.pipeline`, `resolve` then returns a
+# `PipelineResult`.
+#
+# The names are resolved with a request that only `stand_in_server` serves for now. The
+# `pymilldb_server` does not implement it yet, so against it `resolve` fails for every name
+# that is not cached. The server has no other request that returns the id of a node name, so
+# the class is not exported by `pymilldb` until it does, and is imported from
+# `pymilldb.resolver` to use it with `stand_in_server`.
+class NameResolver:
+    ## Constructor.
+    def __init__(self, client: "MDBClient | MDBClientPool", max_size: int = 1_000_000) -> None:
+        if max_size < 0:
+            raise ValueError(f"max_size must be non-negative integer, got {max_size}")
+
+        ## Client instance.
+        self.client = client
+        ## Maximum number of cached names.
+        self.max_size = max_size
+        ## Number of names read from the cache.
+        self.hits = 0
+        ## Number of names sent to the server. Repeated names of a `resolve` count once.
+        self.misses = 0
+
+        self._ids: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    ## Fraction of names read from the cache.
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    ## Number of cached names.
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    ## Returns `True` if the name is cached.
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    ## Returns the counters and the occupancy of the cache.
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "size": len(self._ids),
+                "max_size": self.max_size,
+            }
+
+    ## Sets the counters to zero.
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits, self.misses = 0, 0
+
+    ## Drops every cached name.
+    def clear(self) -> None:
+        with self._lock:
+            self._ids = OrderedDict()
+
+    ## Returns the node ids of `names` as an int64 array.
+    #
+    # Integers are taken as node ids and returned as they are, so keys that mix names and ids
+    # can be given. Raises `KeyError` if a name is not found.
+    def resolve(self, names: List[int | str]) -> np.ndarray:
+        ids = np.empty(len(names), dtype=np.int64)
+        # Positions of every missing name, each name is sent once
+        missing: Dict[str, List[int]] = dict()
+        with self._lock:
+            for i, name in enumerate(names):
+                if isinstance(name, Integral):
+                    ids[i] = name
+                elif isinstance(name, str):
+                    node_id = self._ids.get(name)
+                    if node_id is None:
+                        missing.setdefault(name, list()).append(i)
+                    else:
+                        self._ids.move_to_end(name)
+                        ids[i] = node_id
+                        self.hits += 1
+                else:
+                    raise TypeError(f"Name must be int or str, got {type(name)}")
+            self.misses += len(missing)
+        if not missing:
+            return _resolved(self.client, ids)
+        missing_names = list(missing)
+
+        def decode(data: bytearray) -> np.ndarray:
+            resolved = packer.unpack_uint64_array(data, 0, len(data), np.int64).tolist()
+            # The null object id marks the names that were not found
+            found = [i for i, node_id in enumerate(resolved) if node_id != 0]
+            self._put([missing_names[i] for i in found], [resolved[i] for i in found])
+            if len(found) < len(resolved):
+                name = next(name for name, node_id in zip(missing_names, resolved) if node_id == 0)
+                raise KeyError(f'Node "{name}" not found')
+            for name, node_id in zip(missing_names, resolved):
+                ids[missing[name]] = node_id
+            return ids
+
+        # Send request
+        msg = packer.pack_string_vector(missing_names)
+        return self.client._call(RequestType.GRAPH_WALKER_RESOLVE_NAMES, msg, decode)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={len(self._ids)}, max_size={self.max_size}, hit_rate={self.hit_rate:.3f})"
+
+    def _put(self, names: List[str], node_ids: List[int]) -> None:
+        with self._lock:
+            if len(names) > self.max_size:
+                names, node_ids = names[len(names) - self.max_size :], node_ids[len(node_ids) - self.max_size :]
+            for name, node_id in zip(names, node_ids):
+                self._ids[name] = node_id
+                self._ids.move_to_end(name)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
@@ -1,65 +1,581 @@
-from typing import TYPE_CHECKING, List, Tuple
+import copy
+import queue
+import threading
+from contextlib import closing
+from typing import TYPE_CHECKING, Callable, ContextManager, Iterator, List, Tuple
 
-from . import packer
+import numpy as np
+import torch
+
+from . import packer, protocol
+from .mdb_client import MDBClient
+from .mdb_client_pool import MDBClientPool, _connection_factory
 from .protocol import RequestType
 
 if TYPE_CHECKING:
-    from .mdb_client import MDBClient
+    from .async_mdb_client import AsyncMDBClient
+    from .tensor_store import AsyncTensorStore, LocalTensorStore, TensorStore
 
 ## GraphSample is the output of a sample.
+#
+# `node_ids` is an int64 array with the seed ids first, `edge_ids` is an uint64 array and
+# `edge_index` is a contiguous `(2, num_edges)` int64 tensor with the source and target node ids.
+#
+# `local_edge_index` holds the positions of the endpoints in `node_ids` instead, as expected by
+# GNN layers, and is computed once on first use. `to_csr`, `to_csc` and `to_pyg` build on it.
 class GraphSample:
     def __init__(
         self,
-        seed_ids: List[int],
-        node_ids: List[int],
-        edge_ids: List[int],
-        edge_index: List[Tuple[int, int]],
+        seed_ids: np.ndarray,
+        node_ids: np.ndarray,
+        edge_ids: np.ndarray,
+        edge_index: torch.Tensor,
     ):
         self.num_seeds = len(seed_ids)
-        self.node_ids = seed_ids + node_ids
+        self.node_ids = np.concatenate((seed_ids, node_ids))
         self.edge_ids = edge_ids
         self.edge_index = edge_index
+        self._local_edge_index: torch.Tensor | None = None
+
+    ## Seed node ids, a view of the first `num_seeds` entries of `node_ids`.
+    @property
+    def seed_ids(self) -> np.ndarray:
+        return self.node_ids[: self.num_seeds]
+
+    ## Number of nodes, seeds included.
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    ## Number of edges.
+    @property
+    def num_edges(self) -> int:
+        return self.edge_index.shape[1]
+
+    ## Boolean tensor that is `True` for the seeds, which are the first `num_seeds` nodes.
+    @property
+    def seed_mask(self) -> torch.Tensor:
+        mask = torch.zeros(self.num_nodes, dtype=torch.bool)
+        mask[: self.num_seeds] = True
+        return mask
+
+    ## `(2, num_edges)` int64 tensor with the positions in `node_ids` of the edge endpoints.
+    @property
+    def local_edge_index(self) -> torch.Tensor:
+        if self._local_edge_index is None:
+            local = self.relabel(self.edge_index.numpy().ravel())
+            self._local_edge_index = torch.from_numpy(local.reshape(2, -1))
+        return self._local_edge_index
+
+    ## Returns the positions in `node_ids` of the node ids in `ids`, as an int64 array.
+    #
+    # Ids within a small range are mapped through a lookup table indexed by id. Any other ids
+    # are hashed into a table several times larger than the number of nodes, and the few that
+    # share a slot with another node are found by a binary search over the sorted node ids.
+    # Repeated node ids map to their first position. Raises `KeyError` if an id is not in
+    # the sample.
+    def relabel(self, ids: np.ndarray | torch.Tensor) -> np.ndarray:
+        if isinstance(ids, torch.Tensor):
+            ids = ids.numpy()
+        ids = np.asarray(ids, dtype=np.int64)
+        node_ids = self.node_ids
+        num_nodes = len(node_ids)
+        if num_nodes == 0:
+            if len(ids) > 0:
+                raise KeyError(f"Node id {ids[0]} is not in the sample")
+            return np.empty(0, dtype=np.int64)
+
+        low, high = node_ids.min(), node_ids.max()
+        if high - low <= _TABLE_RATIO * num_nodes:
+            # Reversed so that the first position of a repeated id is the one kept
+            table = np.full(high - low + 1, -1, dtype=np.int64)
+            table[node_ids[::-1] - low] = np.arange(num_nodes - 1, -1, -1, dtype=np.int64)
+            slots = ids - low
+            inside = (slots >= 0) & (slots < len(table))
+            local = np.full(len(ids), -1, dtype=np.int64)
+            local[inside] = table[slots[inside]]
+            missing = local < 0
+        else:
+            num_bits = int(_TABLE_RATIO * num_nodes).bit_length()
+            node_slots = _hash_slots(node_ids, num_bits)
+            counts = np.bincount(node_slots, minlength=1 << num_bits)
+            table = np.full(1 << num_bits, -1, dtype=np.int64)
+            alone = np.flatnonzero(counts[node_slots] == 1)
+            table[node_slots[alone]] = alone
+
+            slots = _hash_slots(ids, num_bits)
+            local = table[slots]
+            missing = node_ids[local] != ids
+            # Ids in slots shared by several nodes, repeated node ids among them
+            shared = np.flatnonzero(counts[slots] > 1)
+            if len(shared) > 0:
+                positions = np.flatnonzero(counts[node_slots] > 1)
+                order = positions[np.argsort(node_ids[positions], kind="stable")]
+                sorted_ids = node_ids[order]
+                found = np.minimum(np.searchsorted(sorted_ids, ids[shared]), len(sorted_ids) - 1)
+                local[shared] = order[found]
+                missing[shared] = sorted_ids[found] != ids[shared]
+        if missing.any():
+            raise KeyError(f"Node id {ids[np.argmax(missing)]} is not in the sample")
+        return local
+
+    ## Returns the adjacency in CSR format over the positions in `node_ids`.
+    #
+    # Returns `indptr`, `indices` and `perm` int64 tensors: the targets of the edges from node
+    # `i` are `indices[indptr[i]:indptr[i + 1]]`, in their original order, and `perm` holds
+    # the position of every entry of `indices` in `edge_index`, to reorder edge ids or features.
+    def to_csr(self) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        sources, targets = self.local_edge_index.numpy()
+        return _compress(sources, targets, self.num_nodes)
+
+    ## Returns the adjacency in CSC format over the positions in `node_ids`.
+    #
+    # As `to_csr`, grouping the edges by target: the sources of the edges to node `i` are
+    # `indices[indptr[i]:indptr[i + 1]]`.
+    def to_csc(self) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        sources, targets = self.local_edge_index.numpy()
+        return _compress(targets, sources, self.num_nodes)
+
+    ## Returns the sample as a PyTorch Geometric `Data` object.
+    #
+    # `edge_index` is `local_edge_index` and `n_id` the global node ids, sharing memory with the
+    # sample, `seed_mask` marks the seeds and `x` holds the node features when given, one row
+    # per node. Requires the `torch_geometric` package.
+    def to_pyg(self, x: torch.Tensor | None = None):
+        try:
+            from torch_geometric.data import Data
+        except ImportError as e:
+            raise ImportError('to_pyg requires the "torch_geometric" package') from e
+        if x is not None and x.shape[0] != self.num_nodes:
+            raise ValueError(f"x must have {self.num_nodes} rows, got {x.shape[0]}")
+        return Data(
+            x=x,
+            edge_index=self.local_edge_index,
+            num_nodes=self.num_nodes,
+            n_id=torch.from_numpy(self.node_ids),
+            seed_mask=self.seed_mask,
+        )
+
+    ## Returns a copy with `edge_index` in page-locked memory.
+    #
+    # Called by `torch.utils.data.DataLoader` when `pin_memory=True`. The id arrays are NumPy
+    # arrays and are shared with the original sample.
+    def pin_memory(self) -> "GraphSample":
+        sample = copy.copy(self)
+        sample.edge_index = self.edge_index.pin_memory()
+        return sample
 
     def __repr__(self) -> str:
         return (
             f"GraphSample(num_seeds={self.num_seeds}, "
             f"node_ids=[{len(self.node_ids)}], "
             f"edge_ids=[{len(self.edge_ids)}], "
-            f"edge_index=[{len(self.edge_index)}, 2])"
+            f"edge_index=[2, {self.edge_index.shape[1]}])"
         )
 
+
+# Size of the relabeling tables relative to the number of nodes. Ids spanning up to this many
+# times the number of nodes index the table directly, other ids are hashed
+_TABLE_RATIO = 16
+
+
+# Slots of a table of 2 ** `num_bits` entries given to ids by Fibonacci hashing
+def _hash_slots(ids: np.ndarray, num_bits: int) -> np.ndarray:
+    return ((ids.view(np.uint64) * np.uint64(0x9E37_79B9_7F4A_7C15)) >> np.uint64(64 - num_bits)).astype(np.intp)
+
+
+# Groups the edges by `rows` with a stable counting sort. Returns the offsets of every row, the
+# `columns` in the grouped order and the permutation that groups them
+def _compress(rows: np.ndarray, columns: np.ndarray, num_rows: int) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    perm = np.argsort(rows, kind="stable")
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return torch.from_numpy(indptr), torch.from_numpy(columns[perm]), torch.from_numpy(perm)
+
+
+def _pack_sample_request(num_seeds: int, num_neighbors: List[int]) -> bytes:
+    msg = b""
+    msg += packer.pack_uint64(num_seeds)
+    msg += packer.pack_uint64_vector(num_neighbors)
+    return msg
+
+
+# Reads the tensors of a TENSOR_STORE_MULTI_GET response starting at `lo`, one row per node
+def _unpack_features(data: bytes, lo: int, num_nodes: int, tensor_size: int) -> torch.Tensor:
+    num_values = packer.unpack_uint64(data, lo, lo + 8)
+    lo, hi = lo + 8, lo + 8 + 4 * num_values
+    return torch.from_numpy(packer.unpack_float_array(data, lo, hi)).reshape(num_nodes, tensor_size)
+
+
+# The response of SAMPLER_SUBGRAPH_WITH_FEATURES is a sample followed by the tensors of its nodes
+def _unpack_sample_with_features(data: bytes, tensor_size: int) -> Tuple[GraphSample, torch.Tensor]:
+    sample = packer.unpack_graph(data)
+    # Three counts, the node ids, and the id, source and target of every edge
+    lo = 24 + 8 * sample.num_nodes + 24 * sample.num_edges
+    return sample, _unpack_features(data, lo, sample.num_nodes, tensor_size)
+
+
 ## Interface for generating samples from MillenniumDB.
 #
 # The MillenniumDB's server creates a new random seed after each initialization, so the
 # results may vary between different runs.
 class Sampler:
     ## Constructor.
-    def __init__(self, client: "MDBClient"):
+    def __init__(self, client: "MDBClient | MDBClientPool"):
         ## Client instance.
         self.client = client
 
     ## Returns a random subgraph
     def subgraph(self, num_seeds: int, num_neighbors: List[int]) -> GraphSample:
         # Send request
-        msg = b""
-        msg += packer.pack_uint64(num_seeds)
-        msg += packer.pack_uint64_vector(num_neighbors)
-        self.client._send(RequestType.SAMPLER_SUBGRAPH, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        return packer.unpack_graph(data)
+        msg = _pack_sample_request(num_seeds, num_neighbors)
+        return self.client._call(RequestType.SAMPLER_SUBGRAPH, msg, packer.unpack_graph)
 
     ## Returns a random subgraph for edge existance prediction
     def subgraph_edge_existance(
         self, num_preseeds: int, num_neighbors: List[int]
     ) -> GraphSample:
         # Send request
-        msg = b""
-        msg += packer.pack_uint64(num_preseeds)
-        msg += packer.pack_uint64_vector(num_neighbors)
-        self.client._send(RequestType.SAMPLER_SUBGRAPH_EDGE_EXISTANCE, msg)
+        msg = _pack_sample_request(num_preseeds, num_neighbors)
+        return self.client._call(RequestType.SAMPLER_SUBGRAPH_EDGE_EXISTANCE, msg, packer.unpack_graph)
+
+    ## Returns a random subgraph together with the tensors of its nodes in `store`.
+    #
+    # The tensors are a `(sample.num_nodes, store.tensor_size)` float32 tensor whose rows follow
+    # `sample.node_ids`. By default the node ids of the subgraph response are sent back as they
+    # are as the keys of a multi get over the same connection, and the sample is decoded while
+    # the server reads the tensors. With `fused=True` both are read with a single request,
+    # saving a round trip, but that request is only served by `stand_in_server` for now and
+    # `pymilldb_server` answers it with an error.
+    #
+    # A `LocalTensorStore`, or a `TensorStore` with a cache, is read after sampling with its
+    # own `multi_get`, so the local tensors are not fetched from the server.
+    def sample_with_features(
+        self,
+        num_seeds: int,
+        num_neighbors: List[int],
+        store: "TensorStore | LocalTensorStore",
+        fused: bool = False,
+    ) -> Tuple[GraphSample, torch.Tensor]:
+        from .tensor_store import TensorStore
+
+        if not isinstance(store, TensorStore) or store.cache is not None:
+            sample = self.subgraph(num_seeds, num_neighbors)
+            return sample, store.multi_get(sample.node_ids)
+        msg = _pack_sample_request(num_seeds, num_neighbors)
+        with self.client.connection() as client:
+            handle = packer.pack_uint64(store._handle(client))
+            tensor_size = store.tensor_size
+            if fused:
+                # Send request
+                return client._call(
+                    RequestType.SAMPLER_SUBGRAPH_WITH_FEATURES,
+                    handle + msg,
+                    lambda data: _unpack_sample_with_features(data, tensor_size),
+                )
+
+            data, _ = client._request(RequestType.SAMPLER_SUBGRAPH, msg)
+            lo, hi = 0, 8
+            num_nodes = packer.unpack_uint64(data, lo, hi)
+            lo, hi = hi, hi + 8
+            num_nodes += packer.unpack_uint64(data, lo, hi)
+            # The seed and node ids follow the three counts, in the order of `node_ids`
+            keys = packer.pack_bool(True) + packer.pack_uint64(num_nodes) + data[24 : 24 + 8 * num_nodes]
+            return client._overlap(
+                RequestType.TENSOR_STORE_MULTI_GET,
+                handle + keys,
+                lambda: packer.unpack_graph(data),
+                lambda response: _unpack_features(response, 0, num_nodes, tensor_size),
+            )
+
+    ## Returns a `SampleStream` of subgraphs sampled ahead of time by background workers.
+    #
+    # Each of the `num_workers` workers samples over its own connection: a connection checked
+    # out of the pool, or a new connection to the same server when the client is a
+    # `MDBClient`. Up to `prefetch` samples wait in the stream to be consumed. The stream ends
+    # after `num_samples` samples, or never if it is `None`. With `edge_existance=True` the
+    # samples are drawn as with `subgraph_edge_existance` and `num_seeds` is the number of
+    # preseeds. With `pin_memory=True` the samples are pinned by the workers.
+    def stream(
+        self,
+        num_seeds: int,
+        num_neighbors: List[int],
+        prefetch: int = 2,
+        num_workers: int = 1,
+        num_samples: int | None = None,
+        edge_existance: bool = False,
+        pin_memory: bool = False,
+    ) -> "SampleStream":
+        return SampleStream(
+            _connection_factory(self.client),
+            _sample_request_type(edge_existance),
+            _pack_sample_request(num_seeds, num_neighbors),
+            prefetch,
+            num_workers,
+            num_samples,
+            pin_memory,
+        )
+
+    ## Returns a `SamplerDataset` that samples from the same server as this sampler.
+    #
+    # The dataset connects to `client.address` in every process iterating it, so the client
+    # can not have been created from a socket.
+    def dataset(
+        self,
+        num_seeds: int,
+        num_neighbors: List[int],
+        num_samples: int | None = None,
+        edge_existance: bool = False,
+        prefetch: int = 2,
+    ) -> "SamplerDataset":
+        if isinstance(self.client, MDBClient) and self.client._from_socket:
+            raise ValueError("The client was created from a socket, create it with a host and port to use a dataset")
+        host, port = self.client.address
+        return SamplerDataset(num_seeds, num_neighbors, num_samples, host, port, edge_existance, prefetch)
+
+
+## Asyncio counterpart of `Sampler`.
+class AsyncSampler:
+    ## Constructor.
+    def __init__(self, client: "AsyncMDBClient"):
+        ## Client instance.
+        self.client = client
 
-        # Handle response
-        data, _ = self.client._recv()
+    ## Returns a random subgraph
+    async def subgraph(self, num_seeds: int, num_neighbors: List[int]) -> GraphSample:
+        msg = _pack_sample_request(num_seeds, num_neighbors)
+        data, _ = await self.client._request(RequestType.SAMPLER_SUBGRAPH, msg)
+        return packer.unpack_graph(data)
+
+    ## Returns a random subgraph for edge existance prediction
+    async def subgraph_edge_existance(self, num_preseeds: int, num_neighbors: List[int]) -> GraphSample:
+        msg = _pack_sample_request(num_preseeds, num_neighbors)
+        data, _ = await self.client._request(RequestType.SAMPLER_SUBGRAPH_EDGE_EXISTANCE, msg)
         return packer.unpack_graph(data)
+
+    ## Returns a random subgraph together with the tensors of its nodes in `store`.
+    #
+    # By default the tensors are read with a multi get after sampling. With `fused=True` both
+    # are read with a single request, only served by `stand_in_server` for now. See
+    # `Sampler.sample_with_features`.
+    async def sample_with_features(
+        self, num_seeds: int, num_neighbors: List[int], store: "AsyncTensorStore", fused: bool = False
+    ) -> Tuple[GraphSample, torch.Tensor]:
+        if not fused:
+            sample = await self.subgraph(num_seeds, num_neighbors)
+            return sample, await store.multi_get(sample.node_ids.tolist())
+        msg = _pack_sample_request(num_seeds, num_neighbors)
+        data, _ = await store._request(RequestType.SAMPLER_SUBGRAPH_WITH_FEATURES, msg)
+        return _unpack_sample_with_features(data, store.tensor_size)
+
+
+def _sample_request_type(edge_existance: bool) -> RequestType:
+    return RequestType.SAMPLER_SUBGRAPH_EDGE_EXISTANCE if edge_existance else RequestType.SAMPLER_SUBGRAPH
+
+
+# Puts in the queue of a stream when a worker stops, with the exception that stopped it if any
+class _WorkerDone:
+    def __init__(self, exception: BaseException | None = None) -> None:
+        self.exception = exception
+
+
+## Iterator over samples drawn ahead of time by background threads.
+#
+# Created with `Sampler.stream`. The workers spend most of their time waiting for the server
+# or decoding with NumPy, which release the GIL, so sampling overlaps with the consumer.
+# The stream is closed when it ends, when a worker fails, in which case its exception is
+# raised by `next`, or with `close`.
+class SampleStream:
+    ## Constructor. Every worker enters the context manager returned by `connect` to get its connection.
+    def __init__(
+        self,
+        connect: Callable[[], ContextManager["MDBClient"]],
+        request_type: RequestType,
+        msg: bytes,
+        prefetch: int = 2,
+        num_workers: int = 1,
+        num_samples: int | None = None,
+        pin_memory: bool = False,
+    ) -> None:
+        if prefetch <= 0:
+            raise ValueError(f"prefetch must be positive integer, got {prefetch}")
+        if num_workers <= 0:
+            raise ValueError(f"num_workers must be positive integer, got {num_workers}")
+        if num_samples is not None and num_samples < 0:
+            raise ValueError(f"num_samples must be non-negative integer, got {num_samples}")
+
+        ## Maximum number of samples waiting to be consumed.
+        self.prefetch = prefetch
+        ## Number of background workers.
+        self.num_workers = num_workers
+
+        self._connect = connect
+        self._request_type = request_type
+        self._msg = msg
+        self._pin_memory = pin_memory
+        self._remaining = num_samples
+        self._queue: "queue.Queue[GraphSample | _WorkerDone]" = queue.Queue(prefetch)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._num_running = num_workers
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"SampleStream-{i}", daemon=True) for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    ## Returns `True` if the stream is closed.
+    def is_closed(self) -> bool:
+        return self._closed
+
+    ## Stops the workers and releases their connections. Requests in flight are waited for.
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        # Unblocks the workers waiting for room in the queue
+        while any(worker.is_alive() for worker in self._workers):
+            self._drain()
+            for worker in self._workers:
+                worker.join(0.01)
+        self._drain()
+
+    ## Enter context manager.
+    def __enter__(self) -> "SampleStream":
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __iter__(self) -> "SampleStream":
+        return self
+
+    def __next__(self) -> GraphSample:
+        while not self._closed:
+            item = self._queue.get()
+            if not isinstance(item, _WorkerDone):
+                return item
+            self._num_running -= 1
+            if item.exception is not None:
+                self.close()
+                raise item.exception
+            if self._num_running == 0:
+                self.close()
+        raise StopIteration
+
+    def __repr__(self) -> str:
+        state = "closed" if self._closed else f"{self._queue.qsize()} ready"
+        return f"{self.__class__.__name__}({state}, num_workers={self.num_workers}, prefetch={self.prefetch})"
+
+    def _work(self) -> None:
+        exception = None
+        try:
+            with self._connect() as client:
+                while self._claim():
+                    sample = client._call(self._request_type, self._msg, packer.unpack_graph)
+                    if self._pin_memory:
+                        sample = sample.pin_memory()
+                    if not self._put(sample):
+                        return
+        except BaseException as e:
+            exception = e
+        finally:
+            self._put(_WorkerDone(exception))
+
+    # Reserves one of the remaining samples
+    def _claim(self) -> bool:
+        if self._stop.is_set():
+            return False
+        with self._lock:
+            if self._remaining is None:
+                return True
+            if self._remaining == 0:
+                return False
+            self._remaining -= 1
+            return True
+
+    # Waits for room in the queue, returns `False` if the stream was closed meanwhile
+    def _put(self, item: "GraphSample | _WorkerDone") -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _drain(self) -> None:
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+## `torch.utils.data.IterableDataset` of samples drawn from a server.
+#
+# Every iteration opens a new connection in the process iterating, so the dataset can be used
+# with any number of `DataLoader` workers. Each sample is already a minibatch, so the loader
+# must be created with `batch_size=None`:
+#
+#     loader = DataLoader(dataset, batch_size=None, num_workers=4, pin_memory=True)
+#
+# When `num_samples` is given, an epoch yields that many samples in total, split between the
+# loader workers. Otherwise it never ends. Within each process samples are prefetched as with
+# `Sampler.stream`.
+class SamplerDataset(torch.utils.data.IterableDataset):
+    ## Constructor.
+    def __init__(
+        self,
+        num_seeds: int,
+        num_neighbors: List[int],
+        num_samples: int | None = None,
+        host: str = "localhost",
+        port: int = protocol.DEFAULT_PORT,
+        edge_existance: bool = False,
+        prefetch: int = 2,
+    ) -> None:
+        super().__init__()
+        if num_samples is not None and num_samples < 0:
+            raise ValueError(f"num_samples must be non-negative integer, got {num_samples}")
+
+        ## Number of seeds, or preseeds when `edge_existance` is `True`, of every sample.
+        self.num_seeds = num_seeds
+        ## Number of neighbors sampled in each hop.
+        self.num_neighbors = list(num_neighbors)
+        ## Number of samples of an epoch, `None` for an endless dataset.
+        self.num_samples = num_samples
+        ## Address of the server.
+        self.address = (host, port)
+        ## Whether the samples are drawn as with `Sampler.subgraph_edge_existance`.
+        self.edge_existance = edge_existance
+        ## Maximum number of samples prefetched by each process.
+        self.prefetch = prefetch
+
+    def __iter__(self) -> Iterator[GraphSample]:
+        stream = SampleStream(
+            lambda: closing(MDBClient(*self.address)),
+            _sample_request_type(self.edge_existance),
+            _pack_sample_request(self.num_seeds, self.num_neighbors),
+            self.prefetch,
+            num_samples=self._worker_num_samples(),
+        )
+        with stream:
+            yield from stream
+
+    # Number of samples of the calling loader worker
+    def _worker_num_samples(self) -> int | None:
+        worker = torch.utils.data.get_worker_info()
+        if worker is None or self.num_samples is None:
+            return self.num_samples
+        num_samples, remainder = divmod(self.num_samples, worker.num_workers)
+        return num_samples + (worker.id < remainder)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(num_seeds={self.num_seeds}, num_neighbors={self.num_neighbors}, "
+            f"num_samples={self.num_samples}, address={self.address})"
+        )
@@ -0,0 +1,737 @@
+import argparse
+import queue
+import random
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from . import packer, protocol
+from .graph import PropertiesDict
+from .mdb_client import MDBClient
+from .protocol import REQUEST_HEADER_SIZE, RequestType, StatusCode
+
+# Object id masks, following the identifiers used by MillenniumDB
+NODE_ID_MASK = 0x2000_0000_0000_0000
+EDGE_ID_MASK = 0x8000_0000_0000_0000
+
+_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliett"]
+
+
+## Synthetic graph served by `StandInServer`.
+#
+# Nodes are named `{prefix}{index}` and edges are drawn uniformly at random. Labels, edge types
+# and properties are derived from the node and edge indices with a seeded generator, so they
+# are deterministic and cost no memory.
+class SyntheticGraph:
+    ## Constructor.
+    def __init__(
+        self,
+        num_nodes: int = 10_000,
+        avg_degree: int = 8,
+        num_labels: int = 4,
+        num_edge_types: int = 4,
+        num_properties: int = 3,
+        name_prefix: str = "Q",
+        seed: int = 0,
+    ) -> None:
+        if num_nodes <= 0:
+            raise ValueError(f"num_nodes must be positive integer, got {num_nodes}")
+
+        ## Number of nodes.
+        self.num_nodes = num_nodes
+        ## Prefix of the node names.
+        self.name_prefix = name_prefix
+        ## Label names.
+        self.labels = [f"label{i}" for i in range(num_labels)]
+        ## Edge type names.
+        self.edge_types = [f"type{i}" for i in range(num_edge_types)]
+        ## Maximum number of properties of each node and edge.
+        self.num_properties = num_properties
+        ## Seed of the generator.
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        num_edges = num_nodes * avg_degree
+        ## Node ids, in iteration order.
+        self.node_ids = np.arange(num_nodes, dtype=np.int64) | NODE_ID_MASK
+        ## Source node index of each edge.
+        self.sources = rng.integers(0, num_nodes, num_edges, dtype=np.int64)
+        ## Target node index of each edge.
+        self.targets = rng.integers(0, num_nodes, num_edges, dtype=np.int64)
+        ## Edge type index of each edge.
+        self.types = rng.integers(0, max(num_edge_types, 1), num_edges, dtype=np.int64)
+        ## Label index of each node.
+        self.node_labels = rng.integers(0, max(num_labels, 1), num_nodes, dtype=np.int64)
+
+        # Adjacency in CSR format, holding edge indices sorted by source and by target
+        self._out_edges, self._out_indptr = self._csr(self.sources)
+        self._in_edges, self._in_indptr = self._csr(self.targets)
+
+    def _csr(self, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        edges = np.argsort(nodes, kind="stable")
+        indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=self.num_nodes), out=indptr[1:])
+        return edges, indptr
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.sources)
+
+    ## Returns the edge ids of the given edge indices.
+    def edge_ids(self, edges: np.ndarray) -> np.ndarray:
+        return edges.astype(np.uint64) | np.uint64(EDGE_ID_MASK)
+
+    ## Returns the node index of a node id or name, raising `KeyError` if it does not exist.
+    def node_index(self, node: int | str) -> int:
+        if isinstance(node, str):
+            if node.startswith(self.name_prefix) and node[len(self.name_prefix) :].isdigit():
+                index = int(node[len(self.name_prefix) :])
+                if index < self.num_nodes:
+                    return index
+            raise KeyError(f'Node "{node}" not found')
+        index = node ^ NODE_ID_MASK
+        if node & NODE_ID_MASK == 0 or index >= self.num_nodes:
+            raise KeyError(f"Node {node} not found")
+        return index
+
+    ## Returns the name of a node index.
+    def node_name(self, index: int) -> str:
+        return f"{self.name_prefix}{index}"
+
+    ## Returns the labels of a node index.
+    def node_label_names(self, index: int) -> List[str]:
+        return [self.labels[self.node_labels[index]]] if self.labels else list()
+
+    ## Returns the properties of a node index.
+    def node_properties(self, index: int) -> PropertiesDict:
+        return self._properties(2 * index)
+
+    ## Returns the properties of an edge index.
+    def edge_properties(self, index: int) -> PropertiesDict:
+        return self._properties(2 * index + 1)
+
+    ## Returns the indices of the outgoing or incoming edges of a node index.
+    def edges(self, index: int, outgoing: bool) -> np.ndarray:
+        if outgoing:
+            return self._out_edges[self._out_indptr[index] : self._out_indptr[index + 1]]
+        return self._in_edges[self._in_indptr[index] : self._in_indptr[index + 1]]
+
+    ## Samples up to `num_neighbors[i]` outgoing edges of every node reached in hop `i`.
+    #
+    # Returns the seed indices, the indices of the other reached nodes and the sampled edge indices.
+    def sample(
+        self, seeds: np.ndarray, num_neighbors: List[int], rng: np.random.Generator
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        visited[seeds] = True
+        frontier = seeds
+        nodes, edges = list(), list()
+        for fanout in num_neighbors:
+            if len(frontier) == 0 or fanout == 0:
+                break
+            degree = self._out_indptr[frontier + 1] - self._out_indptr[frontier]
+            frontier = frontier[degree > 0]
+            degree = degree[degree > 0]
+            # Random positions within the adjacency of each frontier node, duplicates are dropped
+            offsets = (rng.random((len(frontier), fanout)) * degree[:, None]).astype(np.int64)
+            positions = np.unique(self._out_indptr[frontier][:, None] + offsets)
+            hop_edges = self._out_edges[positions]
+            edges.append(hop_edges)
+            reached = np.unique(self.targets[hop_edges])
+            frontier = reached[~visited[reached]]
+            visited[frontier] = True
+            nodes.append(frontier)
+        empty = np.zeros(0, dtype=np.int64)
+        return seeds, np.concatenate(nodes) if nodes else empty, np.concatenate(edges) if edges else empty
+
+    def _properties(self, seed: int) -> PropertiesDict:
+        rng = random.Random(self.seed * 1_000_003 + seed)
+        properties = dict()
+        for i in range(rng.randint(0, self.num_properties)):
+            value_type = rng.randint(0, 3)
+            if value_type == 0:
+                value = rng.random() < 0.5
+            elif value_type == 1:
+                value = rng.randint(-10_000, 10_000)
+            elif value_type == 2:
+                # Representable as float32, as the server sends it
+                value = struct.unpack(">f", struct.pack(">f", rng.uniform(-10_000, 10_000)))[0]
+            else:
+                value = rng.choice(_WORDS)
+            properties[f"prop{i}"] = value
+        return properties
+
+
+# Tensors of a store, rows are appended to a growable matrix
+class _SyntheticTensorStore:
+    def __init__(self, tensor_size: int) -> None:
+        self.tensor_size = tensor_size
+        self.rows: Dict[int | str, int] = dict()
+        self.matrix = np.zeros((16, tensor_size), dtype=np.float32)
+
+    def insert(self, keys: List[int | str], tensors: np.ndarray) -> None:
+        for key, tensor in zip(keys, tensors.reshape(len(keys), self.tensor_size)):
+            row = self.rows.get(key)
+            if row is None:
+                row = len(self.rows)
+                if row == len(self.matrix):
+                    self.matrix = np.concatenate((self.matrix, np.zeros_like(self.matrix)))
+                self.rows[key] = row
+            self.matrix[row] = tensor
+
+    def get(self, keys: List[int | str]) -> np.ndarray:
+        try:
+            rows = [self.rows[key] for key in keys]
+        except KeyError as e:
+            raise KeyError(f"Key {e.args[0]} not found in the tensor store") from None
+        return self.matrix[rows]
+
+
+# Reads the fields of a request
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def bool(self) -> bool:
+        self.pos += 1
+        return packer.unpack_bool(self.data, self.pos - 1)
+
+    def uint64(self) -> int:
+        self.pos += 8
+        return packer.unpack_uint64(self.data, self.pos - 8, self.pos)
+
+    def string(self) -> str:
+        size = self.uint64()
+        self.pos += size
+        return packer.unpack_string(self.data, self.pos - size, self.pos)
+
+    def uint64_array(self) -> np.ndarray:
+        size = self.uint64()
+        self.pos += 8 * size
+        return packer.unpack_uint64_array(self.data, self.pos - 8 * size, self.pos)
+
+    def float_array(self) -> np.ndarray:
+        size = self.uint64()
+        self.pos += 4 * size
+        return packer.unpack_float_array(self.data, self.pos - 4 * size, self.pos)
+
+    def key(self) -> int | str:
+        return self.uint64() if self.bool() else self.string()
+
+    def keys(self) -> List[int | str]:
+        if self.bool():
+            return self.uint64_array().tolist()
+        return [self.string() for _ in range(self.uint64())]
+
+
+# Per-connection state: handles of the open tensor stores and node iterators
+class _Session:
+    def __init__(self, seed: int | None) -> None:
+        self.tensor_stores: Dict[int, str] = dict()
+        self.node_iterators: Dict[int, List[int]] = dict()
+        self.next_handle = 0
+        self.rng = np.random.default_rng(seed)
+
+    def new_handle(self) -> int:
+        self.next_handle += 1
+        return self.next_handle
+
+
+## Pure-Python stand-in for the `pymilldb_server`.
+#
+# Speaks the client protocol (`protocol.RequestType` requests answered with 4096-byte frames)
+# with a `SyntheticGraph` behind the sampler, node iterator and graph walker requests and
+# in-memory tensor stores. It is meant for tests and benchmarks of the client, without a
+# MillenniumDB database.
+#
+# Every response is sent `latency` seconds after its request arrived, requests in flight at
+# the same time overlap their latency as on a real link. Responses are throttled to
+# `bandwidth` bytes per second when given. Connections are served on TCP with `start` or on
+# a socket pair with `connect`, each one in its own thread.
+class StandInServer:
+    ## Constructor.
+    def __init__(
+        self,
+        graph: SyntheticGraph | None = None,
+        latency: float = 0.0,
+        bandwidth: float | None = None,
+        seed: int | None = None,
+    ) -> None:
+        ## Graph behind the sampler, node iterator and graph walker requests.
+        self.graph = SyntheticGraph() if graph is None else graph
+        ## Seconds between the arrival of a request and its response.
+        self.latency = latency
+        ## Maximum bytes per second sent by each connection, `None` for unlimited.
+        self.bandwidth = bandwidth
+        ## Seed for the samplers of the connections, `None` for a random one.
+        self.seed = seed
+        ## Address where the server listens, set by `start`.
+        self.address: Tuple[str, int] = None
+
+        self._tensor_stores: Dict[str, _SyntheticTensorStore] = dict()
+        self._lock = threading.Lock()
+        self._listener: socket.socket = None
+        self._sockets: List[socket.socket] = list()
+        self._num_sessions = 0
+        self._closed = False
+        self._handlers: Dict[RequestType, Callable[[_Session, _Reader], bytes]] = {
+            RequestType.SAMPLER_SUBGRAPH: self._sampler_subgraph,
+            RequestType.SAMPLER_SUBGRAPH_EDGE_EXISTANCE: self._sampler_subgraph_edge_existance,
+            RequestType.SAMPLER_SUBGRAPH_WITH_FEATURES: self._sampler_subgraph_with_features,
+            RequestType.TENSOR_STORE_EXISTS: self._tensor_store_exists,
+            RequestType.TENSOR_STORE_CREATE: self._tensor_store_create,
+            RequestType.TENSOR_STORE_REMOVE: self._tensor_store_remove,
+            RequestType.TENSOR_STORE_OPEN: self._tensor_store_open,
+            RequestType.TENSOR_STORE_CLOSE: self._tensor_store_close,
+            RequestType.TENSOR_STORE_CONTAINS: self._tensor_store_contains,
+            RequestType.TENSOR_STORE_INSERT: self._tensor_store_insert,
+            RequestType.TENSOR_STORE_MULTI_INSERT: self._tensor_store_multi_insert,
+            RequestType.TENSOR_STORE_GET: self._tensor_store_get,
+            RequestType.TENSOR_STORE_MULTI_GET: self._tensor_store_multi_get,
+            RequestType.TENSOR_STORE_SIZE: self._tensor_store_size,
+            RequestType.NODE_ITERATOR_CREATE: self._node_iterator_create,
+            RequestType.NODE_ITERATOR_CREATE_PARTITION: self._node_iterator_create_partition,
+            RequestType.NODE_ITERATOR_BEGIN: self._node_iterator_begin,
+            RequestType.NODE_ITERATOR_NEXT: self._node_iterator_next,
+            RequestType.GRAPH_WALKER_GET_EDGES: self._graph_walker_get_edges,
+            RequestType.GRAPH_WALKER_GET_NODE: self._graph_walker_get_node,
+            RequestType.GRAPH_WALKER_GET_NODE_IDS_BY_LABEL: self._graph_walker_get_node_ids_by_label,
+            RequestType.GRAPH_WALKER_GET_EDGE_IDS_BY_TYPE: self._graph_walker_get_edge_ids_by_type,
+            RequestType.GRAPH_WALKER_RESOLVE_NAMES: self._graph_walker_resolve_names,
+            RequestType.GRAPH_WALKER_GET_NODES: self._graph_walker_get_nodes,
+            RequestType.GRAPH_WALKER_GET_EDGES_MANY: self._graph_walker_get_edges_many,
+        }
+
+    ## Starts listening on TCP in a background thread and returns the address.
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        if self._listener is not None:
+            raise RuntimeError("The server is already listening")
+        self._listener = socket.create_server((host, port))
+        self.address = self._listener.getsockname()[:2]
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self.address
+
+    ## Returns the client side of a new socket pair served in a background thread.
+    def socketpair(self) -> socket.socket:
+        client_sock, server_sock = socket.socketpair()
+        self._spawn(server_sock)
+        return client_sock
+
+    ## Returns a `MDBClient` connected through a new socket pair. The connections it opens for
+    # other classes are socket pairs too.
+    def connect(self) -> MDBClient:
+        return MDBClient(sock=self.socketpair(), connect=self.socketpair)
+
+    ## Stops listening and closes every connection.
+    def close(self) -> None:
+        self._closed = True
+        if self._listener is not None:
+            self._listener.close()
+        with self._lock:
+            sockets, self._sockets = self._sockets, list()
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    ## Enter context manager.
+    def __enter__(self) -> "StandInServer":
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    ## Serves a connection until it is closed.
+    def serve(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._num_sessions += 1
+            session = _Session(None if self.seed is None else self.seed + self._num_sessions)
+        header = bytearray(REQUEST_HEADER_SIZE)
+        responses, sender = None, None
+        if self.latency > 0 or self.bandwidth is not None:
+            # Responses are delayed and throttled by another thread, so requests that arrive back
+            # to back overlap their latency as they would on a real link
+            responses = queue.SimpleQueue()
+            sender = threading.Thread(target=self._send_responses, args=(sock, responses), daemon=True)
+            sender.start()
+        try:
+            while not self._closed:
+                if not self._recv_into(sock, memoryview(header)):
+                    return
+                arrival = time.monotonic()
+                request_type = header[0]
+                data = bytearray(packer.unpack_uint64(header, 1, REQUEST_HEADER_SIZE))
+                if not self._recv_into(sock, memoryview(data)):
+                    return
+                status, payload = self._handle(session, request_type, data)
+                if responses is None:
+                    sock.sendall(protocol.pack_response(status, payload))
+                else:
+                    responses.put((arrival + self.latency, protocol.pack_response(status, payload)))
+        except OSError:
+            pass
+        finally:
+            if sender is not None:
+                responses.put(None)
+                sender.join()
+            with self._lock:
+                if sock in self._sockets:
+                    self._sockets.remove(sock)
+            sock.close()
+
+    def _accept(self) -> None:
+        while not self._closed:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._spawn(sock)
+
+    def _spawn(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._sockets.append(sock)
+        threading.Thread(target=self.serve, args=(sock,), daemon=True).start()
+
+    def _recv_into(self, sock: socket.socket, view: memoryview) -> bool:
+        while len(view) > 0:
+            num_bytes = sock.recv_into(view)
+            if num_bytes == 0:
+                return False
+            view = view[num_bytes:]
+        return True
+
+    def _send_responses(self, sock: socket.socket, responses: "queue.SimpleQueue[Tuple[float, bytes] | None]") -> None:
+        try:
+            while (response := responses.get()) is not None:
+                deadline, data = response
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.bandwidth is None:
+                    sock.sendall(data)
+                    continue
+                chunk_size = 64 * 1024
+                for start in range(0, len(data), chunk_size):
+                    chunk = data[start : start + chunk_size]
+                    sock.sendall(chunk)
+                    time.sleep(len(chunk) / self.bandwidth)
+        except OSError:
+            # The connection is closed, the reading side notices it too
+            pass
+
+    def _handle(self, session: _Session, request_type: int, data: bytes) -> Tuple[int, bytes]:
+        try:
+            handler = self._handlers.get(request_type)
+            if handler is None:
+                raise ValueError(f"Unknown request type: {request_type}")
+            return self._status(handler(session, _Reader(data)))
+        except Exception as e:
+            message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            return StatusCode.EXCEPTION, str(message).encode("utf-8")
+
+    def _status(self, response: bytes | Tuple[int, bytes]) -> Tuple[int, bytes]:
+        if isinstance(response, tuple):
+            return response
+        return StatusCode.SUCCESS, response
+
+    # SAMPLER
+    def _pack_sample(self, seeds: np.ndarray, nodes: np.ndarray, edges: np.ndarray) -> bytes:
+        graph = self.graph
+        pairs = np.stack((graph.node_ids[graph.sources[edges]], graph.node_ids[graph.targets[edges]]), axis=1)
+        return b"".join(
+            [
+                packer.pack_uint64(len(seeds)),
+                packer.pack_uint64(len(nodes)),
+                packer.pack_uint64(len(edges)),
+                graph.node_ids[seeds].astype(packer.UINT64).tobytes(),
+                graph.node_ids[nodes].astype(packer.UINT64).tobytes(),
+                graph.edge_ids(edges).astype(packer.UINT64).tobytes(),
+                pairs.astype(packer.UINT64).tobytes(),
+            ]
+        )
+
+    def _sample(self, session: _Session, reader: _Reader) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        num_seeds = reader.uint64()
+        num_neighbors = reader.uint64_array().tolist()
+        seeds = session.rng.choice(self.graph.num_nodes, min(num_seeds, self.graph.num_nodes), replace=False)
+        return self.graph.sample(seeds, num_neighbors, session.rng)
+
+    def _sampler_subgraph(self, session: _Session, reader: _Reader) -> bytes:
+        return self._pack_sample(*self._sample(session, reader))
+
+    def _sampler_subgraph_with_features(self, session: _Session, reader: _Reader) -> bytes:
+        # The sample is followed by the tensors of its nodes, as a multi get would return them
+        store = self._tensor_store(session, reader)
+        seeds, nodes, edges = self._sample(session, reader)
+        keys = self.graph.node_ids[np.concatenate((seeds, nodes))].tolist()
+        with self._lock:
+            features = store.get(keys)
+        return self._pack_sample(seeds, nodes, edges) + packer.pack_float_vector(features)
+
+    def _sampler_subgraph_edge_existance(self, session: _Session, reader: _Reader) -> bytes:
+        # The seeds are the endpoints of random edges of the preseeds
+        num_preseeds = reader.uint64()
+        num_neighbors = reader.uint64_array().tolist()
+        graph = self.graph
+        preseeds = session.rng.choice(graph.num_nodes, min(num_preseeds, graph.num_nodes), replace=False)
+        _, _, edges = graph.sample(preseeds, [1], session.rng)
+        seeds = np.unique(np.concatenate((preseeds, graph.targets[edges])))
+        return self._pack_sample(*graph.sample(seeds, num_neighbors, session.rng))
+
+    # TENSOR STORE
+    def _tensor_store(self, session: _Session, reader: _Reader) -> _SyntheticTensorStore:
+        handle = reader.uint64()
+        if handle not in session.tensor_stores:
+            raise ValueError(f"Invalid tensor store handle: {handle}")
+        name = session.tensor_stores[handle]
+        with self._lock:
+            if name not in self._tensor_stores:
+                raise ValueError(f'Tensor store "{name}" was removed')
+            return self._tensor_stores[name]
+
+    def _tensor_store_key(self, key: int | str) -> int | str:
+        # Keys given by name are stored by the node id
+        if isinstance(key, str):
+            return int(self.graph.node_ids[self.graph.node_index(key)])
+        return key
+
+    def _tensor_store_exists(self, session: _Session, reader: _Reader) -> bytes:
+        name = reader.string()
+        with self._lock:
+            return packer.pack_bool(name in self._tensor_stores)
+
+    def _tensor_store_create(self, session: _Session, reader: _Reader) -> bytes:
+        tensor_size = reader.uint64()
+        name = reader.string()
+        with self._lock:
+            if name in self._tensor_stores:
+                raise ValueError(f'Tensor store "{name}" already exists')
+            self._tensor_stores[name] = _SyntheticTensorStore(tensor_size)
+        return b""
+
+    def _tensor_store_remove(self, session: _Session, reader: _Reader) -> bytes:
+        name = reader.string()
+        with self._lock:
+            if self._tensor_stores.pop(name, None) is None:
+                raise ValueError(f'Tensor store "{name}" does not exist')
+        return b""
+
+    def _tensor_store_open(self, session: _Session, reader: _Reader) -> bytes:
+        name = reader.string()
+        with self._lock:
+            if name not in self._tensor_stores:
+                raise ValueError(f'Tensor store "{name}" does not exist')
+            tensor_size = self._tensor_stores[name].tensor_size
+        handle = session.new_handle()
+        session.tensor_stores[handle] = name
+        return packer.pack_uint64(handle) + packer.pack_uint64(tensor_size)
+
+    def _tensor_store_close(self, session: _Session, reader: _Reader) -> bytes:
+        handle = reader.uint64()
+        if session.tensor_stores.pop(handle, None) is None:
+            raise ValueError(f"Invalid tensor store handle: {handle}")
+        return b""
+
+    def _tensor_store_contains(self, session: _Session, reader: _Reader) -> bytes:
+        store = self._tensor_store(session, reader)
+        try:
+            key = self._tensor_store_key(reader.key())
+        except KeyError:
+            return packer.pack_bool(False)
+        return packer.pack_bool(key in store.rows)
+
+    def _tensor_store_insert(self, session: _Session, reader: _Reader) -> bytes:
+        store = self._tensor_store(session, reader)
+        key = self._tensor_store_key(reader.key())
+        tensor = reader.float_array()
+        if len(tensor) != store.tensor_size:
+            raise ValueError(f"Tensor size must be {store.tensor_size}, got {len(tensor)}")
+        with self._lock:
+            store.insert([key], tensor)
+        return b""
+
+    def _tensor_store_multi_insert(self, session: _Session, reader: _Reader) -> bytes:
+        store = self._tensor_store(session, reader)
+        keys = [self._tensor_store_key(key) for key in reader.keys()]
+        tensors = reader.float_array()
+        if len(tensors) != len(keys) * store.tensor_size:
+            raise ValueError(f"Expected {len(keys) * store.tensor_size} values, got {len(tensors)}")
+        with self._lock:
+            store.insert(keys, tensors)
+        return b""
+
+    def _tensor_store_get(self, session: _Session, reader: _Reader) -> bytes:
+        store = self._tensor_store(session, reader)
+        key = self._tensor_store_key(reader.key())
+        with self._lock:
+            return packer.pack_float_vector(store.get([key]))
+
+    def _tensor_store_multi_get(self, session: _Session, reader: _Reader) -> bytes:
+        store = self._tensor_store(session, reader)
+        keys = [self._tensor_store_key(key) for key in reader.keys()]
+        with self._lock:
+            return packer.pack_float_vector(store.get(keys))
+
+    def _tensor_store_size(self, session: _Session, reader: _Reader) -> bytes:
+        store = self._tensor_store(session, reader)
+        return packer.pack_uint64(len(store.rows))
+
+    # NODE ITERATOR
+    def _node_iterator(self, session: _Session, reader: _Reader) -> List[int]:
+        handle = reader.uint64()
+        if handle not in session.node_iterators:
+            raise ValueError(f"Invalid node iterator handle: {handle}")
+        return session.node_iterators[handle]
+
+    def _node_iterator_create(self, session: _Session, reader: _Reader) -> bytes:
+        batch_size = reader.uint64()
+        handle = session.new_handle()
+        # Batch size, position and range of nodes of the iterator
+        session.node_iterators[handle] = [batch_size, 0, 0, self.graph.num_nodes]
+        return packer.pack_uint64(handle)
+
+    def _node_iterator_create_partition(self, session: _Session, reader: _Reader) -> bytes:
+        batch_size = reader.uint64()
+        partition = reader.uint64()
+        num_partitions = reader.uint64()
+        if partition >= num_partitions:
+            raise ValueError(f"Invalid partition {partition} of {num_partitions}")
+        num_nodes = self.graph.num_nodes
+        start, end = partition * num_nodes // num_partitions, (partition + 1) * num_nodes // num_partitions
+        handle = session.new_handle()
+        session.node_iterators[handle] = [batch_size, start, start, end]
+        return packer.pack_uint64(handle)
+
+    def _node_iterator_begin(self, session: _Session, reader: _Reader) -> bytes:
+        iterator = self._node_iterator(session, reader)
+        iterator[1] = iterator[2]
+        return b""
+
+    def _node_iterator_next(self, session: _Session, reader: _Reader) -> bytes | Tuple[int, bytes]:
+        iterator = self._node_iterator(session, reader)
+        batch_size, position, _, end = iterator
+        if position >= end:
+            return StatusCode.END_OF_ITERATION, b""
+        iterator[1] = min(position + batch_size, end)
+        return packer.pack_uint64_vector(self.graph.node_ids[position : iterator[1]])
+
+    # GRAPH WALKER
+    def _graph_walker_get_node(self, session: _Session, reader: _Reader) -> bytes:
+        return self._pack_node(self.graph.node_index(reader.key()))
+
+    def _graph_walker_get_nodes(self, session: _Session, reader: _Reader) -> bytes:
+        return b"".join(self._pack_node(self.graph.node_index(key)) for key in reader.keys())
+
+    def _pack_node(self, index: int) -> bytes:
+        graph = self.graph
+        data = bytearray()
+        data += _pack_cstring(graph.node_name(index))
+        labels = graph.node_label_names(index)
+        data += packer.pack_uint64(len(labels))
+        for label in labels:
+            data += _pack_cstring(label)
+        data += _pack_properties(graph.node_properties(index))
+        return bytes(data)
+
+    def _graph_walker_get_edges(self, session: _Session, reader: _Reader) -> bytes:
+        index = self.graph.node_index(reader.key())
+        return self._pack_edges(self.graph.edges(index, reader.bool()))
+
+    def _graph_walker_get_edges_many(self, session: _Session, reader: _Reader) -> bytes:
+        graph = self.graph
+        indices = [graph.node_index(key) for key in reader.keys()]
+        outgoing = reader.bool()
+        edges = [graph.edges(index, outgoing) for index in indices]
+        counts = packer.pack_uint64_vector([len(node_edges) for node_edges in edges])
+        return counts + b"".join(self._pack_edges(node_edges) for node_edges in edges)
+
+    def _pack_edges(self, edges: np.ndarray) -> bytes:
+        graph = self.graph
+        data = bytearray()
+        for edge in edges.tolist():
+            data += packer.pack_uint64(int(graph.node_ids[graph.sources[edge]]))
+            data += packer.pack_uint64(int(graph.node_ids[graph.targets[edge]]))
+            data += packer.pack_uint64(edge | EDGE_ID_MASK)
+            data += _pack_cstring(graph.edge_types[graph.types[edge]])
+            data += _pack_properties(graph.edge_properties(edge))
+        return bytes(data)
+
+    def _graph_walker_get_node_ids_by_label(self, session: _Session, reader: _Reader) -> bytes:
+        graph = self.graph
+        label = reader.string()
+        if label not in graph.labels:
+            return b""
+        nodes = np.flatnonzero(graph.node_labels == graph.labels.index(label))
+        return graph.node_ids[nodes].astype(packer.UINT64).tobytes()
+
+    def _graph_walker_get_edge_ids_by_type(self, session: _Session, reader: _Reader) -> bytes:
+        graph = self.graph
+        edge_type = reader.string()
+        if reader.bool():
+            index = graph.node_index(reader.key())
+            edges = graph.edges(index, reader.bool())
+        else:
+            edges = np.arange(graph.num_edges)
+        if edge_type not in graph.edge_types:
+            return b""
+        edges = edges[graph.types[edges] == graph.edge_types.index(edge_type)]
+        return graph.edge_ids(edges).astype(packer.UINT64).tobytes()
+
+    def _graph_walker_resolve_names(self, session: _Session, reader: _Reader) -> bytes:
+        graph = self.graph
+        node_ids = np.zeros(reader.uint64(), dtype=np.int64)
+        for i in range(len(node_ids)):
+            try:
+                node_ids[i] = graph.node_ids[graph.node_index(reader.string())]
+            except KeyError:
+                # Left as the null object id
+                pass
+        return node_ids.astype(packer.UINT64).tobytes()
+
+
+def _pack_cstring(string: str) -> bytes:
+    return string.encode("utf-8") + b"\x00"
+
+
+def _pack_properties(properties: PropertiesDict) -> bytes:
+    data = bytearray(packer.pack_uint64(len(properties)))
+    for key, value in properties.items():
+        data += _pack_cstring(key)
+        if isinstance(value, bool):
+            data += b"\x01" + packer.pack_bool(value)
+        elif isinstance(value, int):
+            data += b"\x02" + struct.pack(">q", value)
+        elif isinstance(value, float):
+            data += b"\x03" + struct.pack(">f", value)
+        else:
+            data += b"\x04" + _pack_cstring(value)
+    return bytes(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pure-Python stand-in for the pymilldb_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT)
+    parser.add_argument("--num-nodes", type=int, default=10_000)
+    parser.add_argument("--avg-degree", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added before every response")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes per second of each connection")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    graph = SyntheticGraph(args.num_nodes, args.avg_degree, seed=0 if args.seed is None else args.seed)
+    server = StandInServer(graph, latency=args.latency, bandwidth=args.bandwidth, seed=args.seed)
+    print("Listening on {}:{}".format(*server.start(args.host, args.port)))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.close()
@@ -0,0 +1,226 @@
+import threading
+from typing import Dict, List, Literal, Tuple, Union
+
+import numpy as np
+import torch
+
+Key = Union[int, str]
+
+
+## Client-side cache of the tensors read from a `TensorStore`.
+#
+# Enabled by giving an instance to `TensorStore` with the `cache` argument. Cached tensors are
+# kept in a single preallocated matrix that holds as many rows as fit in `max_bytes`. When it
+# is full, the least recently used rows are evicted with `policy="lru"`, or the least
+# frequently used ones with `policy="lfu"`.
+#
+# `TensorStore.get` and `TensorStore.multi_get` serve the cached keys locally and fetch the
+# rest with a single request, `multi_get` also fetching repeated keys once. `insert` and
+# `multi_insert` drop the keys they write from the cache, both when the write is sent and when
+# it is acknowledged. Writes made by other clients are not seen until the key is evicted.
+#
+# Keys are cached as they are given. A tensor read by node name and by node id is cached
+# twice, and a write by one of them does not drop the other. Use the same kind of key for reads
+# and writes, for instance node ids.
+class TensorCache:
+    ## Constructor.
+    def __init__(self, max_bytes: int, policy: Literal["lru", "lfu"] = "lru") -> None:
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be non-negative integer, got {max_bytes}")
+        if policy not in ["lru", "lfu"]:
+            raise ValueError('policy must be either "lru" or "lfu"')
+
+        ## Memory budget of the cached tensors in bytes.
+        self.max_bytes = max_bytes
+        ## Eviction policy.
+        self.policy = policy
+        ## Fixed size of the cached tensors, set by the store using the cache.
+        self.tensor_size: int = None
+        ## Number of keys read from the cache.
+        self.hits = 0
+        ## Number of keys read from the server. Repeated keys of a `multi_get` count once.
+        self.misses = 0
+        ## Number of rows evicted to make room for others.
+        self.evictions = 0
+
+        self._slots: Dict[Key, int] = dict()
+        self._lock = threading.RLock()
+        # Allocated on first use, when the tensor size is known
+        self._rows: torch.Tensor = None
+        self._keys: List[Key | None] = list()
+        self._occupied: np.ndarray = None
+        self._free: List[int] = list()
+        # Last access for "lru", number of accesses for "lfu"
+        self._scores: np.ndarray = None
+        self._tick = 0
+        # Incremented by every invalidation, reads that overlap with one are not cached
+        self._generation = 0
+
+    ## Maximum number of cached tensors.
+    @property
+    def capacity(self) -> int:
+        if self.tensor_size is None:
+            return 0
+        return self.max_bytes // (4 * self.tensor_size)
+
+    ## Fraction of keys read from the cache.
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    ## Number of cached tensors.
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    ## Returns `True` if the key is cached.
+    def __contains__(self, key: Key) -> bool:
+        return key in self._slots
+
+    ## Returns the counters and the occupancy of the cache.
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "evictions": self.evictions,
+                "size": len(self._slots),
+                "capacity": self.capacity,
+                "bytes": len(self._slots) * 4 * (self.tensor_size or 0),
+            }
+
+    ## Sets the counters to zero.
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+    ## Drops every cached tensor.
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._slots = dict()
+            if self._rows is not None:
+                self._keys = [None] * len(self._keys)
+                self._occupied[:] = False
+                self._free = list(range(len(self._keys) - 1, -1, -1))
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(size={len(self._slots)}, capacity={self.capacity}, "
+            f"policy={self.policy}, hit_rate={self.hit_rate:.3f})"
+        )
+
+    # Binds the cache to the tensor size of a store
+    def _bind(self, tensor_size: int) -> None:
+        with self._lock:
+            if self.tensor_size is not None and self.tensor_size != tensor_size:
+                raise ValueError(f"Cache holds tensors of size {self.tensor_size}, the store has size {tensor_size}")
+            self.tensor_size = tensor_size
+
+    # Copies the cached rows of `keys` into `out`. Returns the positions of the missing ones and
+    # the generation to give to `_put` when they are read
+    def _get(self, keys: List[Key], out: torch.Tensor) -> Tuple[np.ndarray, int]:
+        with self._lock:
+            slots = np.fromiter((self._slots.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+            hit = slots >= 0
+            missing = np.flatnonzero(~hit)
+            num_hits = len(keys) - len(missing)
+            self.hits += num_hits
+            self.misses += len(missing)
+            if num_hits > 0:
+                hit_slots = slots[hit]
+                if num_hits == len(keys):
+                    out.copy_(self._rows[torch.from_numpy(hit_slots)])
+                else:
+                    out[torch.from_numpy(np.flatnonzero(hit))] = self._rows[torch.from_numpy(hit_slots)]
+                self._touch(hit_slots)
+            return missing, self._generation
+
+    # Caches the rows read for `keys`, evicting others if needed. Nothing is cached if there was
+    # an invalidation since `generation` was taken, the rows may predate it
+    def _put(self, keys: List[Key], rows: torch.Tensor, generation: int) -> None:
+        with self._lock:
+            capacity = self.capacity
+            if capacity == 0 or generation != self._generation:
+                return
+            if self._rows is None:
+                self._rows = torch.empty(capacity, self.tensor_size, dtype=torch.float32)
+                self._keys = [None] * capacity
+                self._occupied = np.zeros(capacity, dtype=bool)
+                self._free = list(range(capacity - 1, -1, -1))
+                self._scores = np.zeros(capacity, dtype=np.int64)
+            # Only the last rows fit when there are more than the capacity
+            if len(keys) > capacity:
+                keys, rows = keys[-capacity:], rows[-capacity:]
+
+            slots = np.empty(len(keys), dtype=np.int64)
+            new, existing = list(), list()
+            for i, key in enumerate(keys):
+                slot = self._slots.get(key)
+                if slot is None:
+                    new.append(i)
+                else:
+                    slots[i] = slot
+                    existing.append(slot)
+            self._evict(len(new) - len(self._free), existing)
+            for i in new:
+                slot = self._free.pop()
+                self._slots[keys[i]] = slot
+                self._keys[slot] = keys[i]
+                slots[i] = slot
+            self._occupied[slots] = True
+            index = torch.from_numpy(slots)
+            self._rows[index] = rows.to(dtype=torch.float32)
+            if self.policy == "lfu":
+                self._scores[slots[new]] = 0
+            self._touch(slots)
+
+    # Drops `keys` from the cache
+    def _invalidate(self, keys: List[Key]) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                slot = self._slots.pop(key, None)
+                if slot is not None:
+                    self._keys[slot] = None
+                    self._occupied[slot] = False
+                    self._free.append(slot)
+
+    # Evicts `num_slots` rows with the lowest scores, except the rows in `keep`
+    def _evict(self, num_slots: int, keep: List[int]) -> None:
+        if num_slots <= 0:
+            return
+        candidates = self._occupied.copy()
+        candidates[keep] = False
+        candidates = np.flatnonzero(candidates)
+        victims = candidates[np.argpartition(self._scores[candidates], num_slots - 1)[:num_slots]]
+        for slot in victims.tolist():
+            del self._slots[self._keys[slot]]
+            self._keys[slot] = None
+            self._free.append(slot)
+        self._occupied[victims] = False
+        self.evictions += len(victims)
+
+    def _touch(self, slots: np.ndarray) -> None:
+        if self.policy == "lru":
+            self._tick += 1
+            self._scores[slots] = self._tick
+        else:
+            self._scores[slots] += 1
+
+
+# Returns the distinct keys in order of appearance and the position of every key among them,
+# or `None` when there are no repeated keys
+def _unique_keys(keys) -> Tuple[List[Key], torch.Tensor | None]:
+    if isinstance(keys, torch.Tensor):
+        keys = keys.detach().cpu().numpy()
+    if isinstance(keys, np.ndarray):
+        if keys.dtype.kind not in "iu":
+            raise TypeError(f"Key array must have an integer dtype, got {keys.dtype}")
+        keys = keys.ravel().tolist()
+    positions: Dict[Key, int] = dict()
+    inverse = [positions.setdefault(key, len(positions)) for key in keys]
+    if len(positions) == len(inverse):
+        return list(positions), None
+    return list(positions), torch.tensor(inverse, dtype=torch.int64)
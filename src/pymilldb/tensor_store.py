@@ -1,13 +1,177 @@
+import os
+import queue
+import socket
+import threading
+import time
 from collections.abc import Iterable
-from typing import TYPE_CHECKING, List, Union
+from numbers import Integral
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Tuple, Union
+from weakref import WeakKeyDictionary
 
+import numpy as np
 import torch
 
 from . import decorators, packer
-from .protocol import RequestType
+from .mdb_client import MDBClient
+from .mdb_client_pool import MDBClientPool
+from .pipeline import _prefetch, _resolved
+from .protocol import RequestType, StatusCode
+from .tensor_cache import TensorCache, _unique_keys
 
 if TYPE_CHECKING:
-    from .mdb_client import MDBClient
+    from .async_mdb_client import AsyncMDBClient
+
+
+def _pack_keys(keys: Union[List[int], List[str], np.ndarray, torch.Tensor]) -> bytes:
+    # Integer arrays and tensors are packed as a whole, without checking every element
+    if isinstance(keys, torch.Tensor):
+        keys = keys.detach().cpu().numpy()
+    if isinstance(keys, np.ndarray):
+        if keys.dtype.kind not in "iu":
+            raise TypeError(f"Key array must have an integer dtype, got {keys.dtype}")
+        return packer.pack_bool(True) + packer.pack_uint64_vector(keys)
+    if all(isinstance(key, Integral) for key in keys):
+        return packer.pack_bool(True) + packer.pack_uint64_vector(keys)
+    if all(isinstance(key, str) for key in keys):
+        return packer.pack_bool(False) + packer.pack_string_vector(keys)
+    raise TypeError(f"Key must be List[int] or List[str], got {type(keys)}")
+
+
+def _pack_key(key: Union[int, str]) -> bytes:
+    packed_key = b""
+    if isinstance(key, Integral):
+        packed_key += packer.pack_bool(True)
+        packed_key += packer.pack_uint64(key)
+    elif isinstance(key, str):
+        packed_key += packer.pack_bool(False)
+        packed_key += packer.pack_string(key)
+    else:
+        raise TypeError(f"Key must be int or str, got {type(key)}")
+    return packed_key
+
+
+def _pack_tensor(tensor: torch.Tensor) -> bytes:
+    if tensor.dtype != torch.float32:
+        raise ValueError(f"Tensor dtype must be torch.float32, got {type(tensor)}")
+    return packer.pack_float_vector(tensor.flatten())
+
+
+def _pack_tensors(tensors: torch.Tensor) -> bytes:
+    if tensors.dtype != torch.float32:
+        raise ValueError(f"Tensor dtype must be torch.float32, got {type(tensors)}")
+    if len(tensors.size()) != 2:
+        raise ValueError(f"Tensors must be 2-dimensional, but got {len(tensors.size())}-dimensional tensor")
+    # Written as a plain vector, the server knows the matrix shape
+    return packer.pack_float_vector(tensors.flatten())
+
+
+def _unpack_bool(data: bytes) -> bool:
+    return packer.unpack_bool(data, 0)
+
+
+def _unpack_uint64(data: bytes) -> int:
+    return packer.unpack_uint64(data, 0, 8)
+
+
+# Decodes the floats straight from the buffer, into `out` if given
+def _unpack_tensor(data: bytes, out: torch.Tensor | None = None) -> torch.Tensor:
+    lo, hi = 0, 8
+    vector_size = packer.unpack_uint64(data, lo, hi)
+    lo, hi = hi, hi + 4 * vector_size
+    if out is None:
+        return torch.from_numpy(packer.unpack_float_array(data, lo, hi))
+    if out.numel() != vector_size:
+        raise ValueError(f"out has {out.numel()} elements, but the response has {vector_size}")
+    if out.device.type == "cpu" and out.is_contiguous():
+        # Byte swapped into the tensor memory, pinned memory included
+        packer.unpack_float_array(data, lo, hi, out.detach().numpy().reshape(-1))
+    else:
+        out.copy_(torch.from_numpy(packer.unpack_float_array(data, lo, hi)).view(out.shape))
+    return out
+
+
+# Magic number of the files written by `TensorStore.export`, followed by the number of keys and
+# the tensor size as big-endian uint64
+_LOCAL_HEADER = b"MDBTENS1"
+
+
+# Returns integer keys as a non-negative int64 or uint64 array
+def _integer_keys(keys) -> np.ndarray:
+    if isinstance(keys, torch.Tensor):
+        keys = keys.detach().cpu().numpy()
+    elif isinstance(keys, range):
+        keys = np.arange(keys.start, keys.stop, keys.step, dtype=np.int64)
+    keys = np.asarray(keys).ravel()
+    if len(keys) == 0:
+        return keys.astype(np.uint64)
+    if keys.dtype.kind not in "iu":
+        raise TypeError(f"Keys must be integers, got {keys.dtype}")
+    if keys.dtype.kind == "i" and keys.min() < 0:
+        raise ValueError(f"Keys must be non-negative, got {keys.min()}")
+    return keys
+
+
+# Returns the keys in a form that can be sliced into chunks
+def _sliceable_keys(keys):
+    if isinstance(keys, range):
+        return np.arange(keys.start, keys.stop, keys.step, dtype=np.int64)
+    return keys
+
+
+# Splits a bulk load source in `(keys, rows)` chunks of at most `chunk_rows` rows, skipping the
+# first `start` rows. Returns the chunks and the total number of rows if known
+def _bulk_chunks(keys, source, chunk_rows: int, start: int) -> Tuple[Iterator[Tuple[Any, Any]], int | None]:
+    if isinstance(source, (np.ndarray, torch.Tensor)):
+        if keys is None:
+            raise ValueError("keys are required when the source is an array or a tensor")
+        if len(keys) != len(source):
+            raise ValueError(f"Got {len(keys)} keys for {len(source)} tensors")
+        keys = _sliceable_keys(keys)
+
+        def array_chunks():
+            for lo in range(start, len(source), chunk_rows):
+                yield keys[lo : lo + chunk_rows], source[lo : lo + chunk_rows]
+
+        return array_chunks(), len(source)
+
+    if keys is not None:
+        raise ValueError("keys must be None when the source is an iterator of (keys, tensors) chunks")
+
+    def iterator_chunks():
+        offset = 0
+        for chunk_keys, rows in source:
+            if len(chunk_keys) != len(rows):
+                raise ValueError(f"Got {len(chunk_keys)} keys for {len(rows)} tensors")
+            skip = min(max(start - offset, 0), len(rows))
+            offset += len(rows)
+            for lo in range(skip, len(rows), chunk_rows):
+                yield chunk_keys[lo : lo + chunk_rows], rows[lo : lo + chunk_rows]
+
+    return iterator_chunks(), None
+
+
+# Encodes a bulk load chunk as a multi_insert request
+def _pack_bulk_chunk(keys, rows, tensor_size: int) -> Tuple[int, bytes]:
+    array = rows.detach().cpu().numpy() if isinstance(rows, torch.Tensor) else np.asarray(rows)
+    if array.dtype.kind != "f":
+        raise TypeError(f"Tensors must have a floating point dtype, got {array.dtype}")
+    if array.ndim != 2 or array.shape[1] != tensor_size:
+        raise ValueError(f"Tensors must have shape (num_rows, {tensor_size}), got {array.shape}")
+    return len(array), _pack_keys(keys) + packer.pack_float_vector(array)
+
+
+def _write_checkpoint(path: str, offset: int) -> None:
+    # Replaced atomically, so a crash never leaves a partial offset
+    with open(path + ".tmp", "w") as file:
+        file.write(str(offset))
+    os.replace(path + ".tmp", path)
+
+
+def _check_out(out: torch.Tensor, shape: Tuple[int, ...]) -> None:
+    if out.dtype != torch.float32:
+        raise ValueError(f"out dtype must be torch.float32, got {out.dtype}")
+    if tuple(out.shape) != shape:
+        raise ValueError(f"out shape must be {shape}, got {tuple(out.shape)}")
 
 
 ## Interface for storing tensors in the MillenniumDB's TensorStore.
@@ -15,62 +179,70 @@ if TYPE_CHECKING:
 # TensorStore is a key-value store where the key is a `(uint64 object_id)` and the value is
 # a `(vector<float> tensor)`. The tensor size is fixed and is specified when the store is
 # created. For consistency and our own use cases the tensors cannot be removed.
+#
+# When a `MDBClientPool` is given, the store is opened lazily in every connection that
+# serves one of its requests and `close` closes it in all of them. Requests can be
+# pipelined with `MDBClient.pipeline`, every method then returns a `PipelineResult`.
+#
+# Reads can be cached on the client by giving a `TensorCache`.
 class TensorStore:
     ## Returns `True` if the store exists.
     @staticmethod
-    def exists(client: "MDBClient", name: str) -> bool:
+    def exists(client: "MDBClient | MDBClientPool", name: str) -> bool:
         # Send request
         msg = b""
         msg += packer.pack_string(name)
-        client._send(RequestType.TENSOR_STORE_EXISTS, msg)
-
-        # Handle response
-        data, _ = client._recv()
-        return packer.unpack_bool(data, 0)
+        return client._call(RequestType.TENSOR_STORE_EXISTS, msg, _unpack_bool)
 
     ## Creates a new store on disk.
     @staticmethod
-    def create(client: "MDBClient", name: str, tensor_size: int) -> None:
+    def create(client: "MDBClient | MDBClientPool", name: str, tensor_size: int) -> None:
         if tensor_size <= 0:
             raise ValueError(f"tensor_size must be positive integer, got {tensor_size}")
         # Send request
         msg = b""
         msg += packer.pack_uint64(tensor_size)
         msg += packer.pack_string(name)
-        client._send(RequestType.TENSOR_STORE_CREATE, msg)
-
-        # Handle response
-        client._recv()
+        client._call(RequestType.TENSOR_STORE_CREATE, msg, None)
 
     ## Removes a store from disk.
     @staticmethod
-    def remove(client: "MDBClient", name: str) -> None:
+    def remove(client: "MDBClient | MDBClientPool", name: str) -> None:
         # Send request
         msg = b""
         msg += packer.pack_string(name)
-        client._send(RequestType.TENSOR_STORE_REMOVE, msg)
-
-        # Handle response
-        client._recv()
+        client._call(RequestType.TENSOR_STORE_REMOVE, msg, None)
 
     ## Constructor for opening an existing store.
-    def __init__(self, client: "MDBClient", name: str) -> None:
+    def __init__(self, client: "MDBClient | MDBClientPool", name: str, cache: TensorCache | None = None) -> None:
         ## Client instance.
         self.client = client
         ## Name of the store.
         self.name = name
         ## Fixed size for the tensors.
         self.tensor_size = None
+        ## Client-side cache of the read tensors, `None` when disabled.
+        self.cache = cache
 
-        self._tensor_store_id = None
+        # Handles of the store in each connection where it was opened
+        self._tensor_store_ids: WeakKeyDictionary["MDBClient", int] = WeakKeyDictionary()
+        self._lock = threading.Lock()
         self._closed = True
-        self._open()
+        with client.connection() as connection:
+            self._handle(connection)
+        if cache is not None:
+            cache._bind(self.tensor_size)
+        self._closed = False
 
     ## Returns `True` if the store is open.
     def is_closed(self) -> bool:
         return self._closed
 
     ## Closes the store.
+    #
+    # With a `MDBClientPool` the store is closed in each of its connections while that
+    # connection is checked out, waiting for the ones other threads are using to be released.
+    # Connections the calling thread has checked out are used right away.
     def close(self) -> None:
         if not self._closed:
             self._close()
@@ -108,173 +280,716 @@ class TensorStore:
     ## Returns `True` if the store contains the given key.
     @decorators.check_closed
     def contains(self, key: Union[int, str]) -> bool:
-        packed_key = b""
-        if isinstance(key, int):
-            packed_key += packer.pack_bool(True)
-            packed_key += packer.pack_uint64(key)
-        elif isinstance(key, str):
-            packed_key += packer.pack_bool(False)
-            packed_key += packer.pack_string(key)
-        else:
-            raise TypeError(f"Key must be int or str, got {type(key)}")
+        packed_key = _pack_key(key)
 
         # Send request
         msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
         msg += packed_key
-        self.client._send(RequestType.TENSOR_STORE_CONTAINS, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        return packer.unpack_bool(data, 0)
+        return self._call(RequestType.TENSOR_STORE_CONTAINS, msg, _unpack_bool)
 
     ## Inserts a tensor into the store.
     @decorators.check_closed
     def insert(self, key: Union[int, str], tensor: torch.Tensor) -> None:
-        packed_key = b""
-        if isinstance(key, int):
-            packed_key += packer.pack_bool(True)
-            packed_key += packer.pack_uint64(key)
-        elif isinstance(key, str):
-            packed_key += packer.pack_bool(False)
-            packed_key += packer.pack_string(key)
-        else:
-            raise TypeError(f"Key must be int or str, got {type(key)}")
-
-        if tensor.dtype != torch.float32:
-            raise ValueError(f"Tensor dtype must be torch.float32, got {type(tensor)}")
+        packed_key = _pack_key(key)
+        packed_tensor = _pack_tensor(tensor)
+        invalidate = self._invalidate([key])
 
         # Send request
         msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
         msg += packed_key
-        msg += packer.pack_float_vector(tensor.flatten())
-        self.client._send(RequestType.TENSOR_STORE_INSERT, msg)
-
-        # Handle response
-        self.client._recv()
+        msg += packed_tensor
+        return self._call(RequestType.TENSOR_STORE_INSERT, msg, invalidate)
 
     ## Inserts multiple tensors into the store.
     @decorators.check_closed
     def multi_insert(self, keys: Union[List[int], List[str]], tensors: torch.Tensor) -> None:
-        packed_key = b""
-        if all(isinstance(key, int) for key in keys):
-            packed_key += packer.pack_bool(True)
-            packed_key += packer.pack_uint64_vector(keys)
-        elif all(isinstance(key, str) for key in keys):
-            packed_key += packer.pack_bool(False)
-            packed_key += packer.pack_string_vector(keys)
-        else:
-            raise TypeError(f"Key must be List[int] or List[str], got {type(keys)}")
-
-        if tensors.dtype != torch.float32:
-            raise ValueError(f"Tensor dtype must be torch.float32, got {type(tensors)}")
-        if len(tensors.size()) != 2:
-            raise ValueError(f"Tensors must be 2-dimensional, but got {len(tensors.size())}-dimensional tensor")
+        packed_key = _pack_keys(keys)
+        packed_tensors = _pack_tensors(tensors)
+        invalidate = self._invalidate(keys)
 
         # Send request
         msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
         msg += packed_key
-        # Written as a plain vector, the server knows the matrix shape
-        msg += packer.pack_float_vector(tensors.flatten())
-        self.client._send(RequestType.TENSOR_STORE_MULTI_INSERT, msg)
-
-        # Handle response
-        self.client._recv()
+        msg += packed_tensors
+        return self._call(RequestType.TENSOR_STORE_MULTI_INSERT, msg, invalidate)
 
     ## Gets a tensor from the store.
+    #
+    # The tensor is decoded into `out` if given, a float32 tensor of shape `(tensor_size,)`
+    # that is returned. It can be pinned or on another device.
     @decorators.check_closed
-    def get(self, key: Union[int, str]) -> torch.Tensor:
-        packed_key = b""
-        if isinstance(key, int):
-            packed_key += packer.pack_bool(True)
-            packed_key += packer.pack_uint64(key)
-        elif isinstance(key, str):
-            packed_key += packer.pack_bool(False)
-            packed_key += packer.pack_string(key)
-        else:
-            raise TypeError(f"Key must be int or str, got {type(key)}")
+    def get(self, key: Union[int, str], out: torch.Tensor | None = None) -> torch.Tensor:
+        packed_key = _pack_key(key)
+        if out is not None:
+            _check_out(out, (self.tensor_size,))
+        if self.cache is not None:
+            return self._cached_get(key, packed_key, out)
 
         # Send request
         msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
         msg += packed_key
-        self.client._send(RequestType.TENSOR_STORE_GET, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        lo, hi = 0, 8
-        vector_size = packer.unpack_uint64(data, lo, hi)
-        lo, hi = hi, hi + 4 * vector_size
-        return torch.tensor(
-            data=packer.unpack_float_vector(data, lo, hi),
-            dtype=torch.float32,
-        )
+        return self._call(RequestType.TENSOR_STORE_GET, msg, lambda data: _unpack_tensor(data, out))
 
     ## Gets multiple tensors from the store.
+    #
+    # The tensors are decoded into `out` if given, a float32 tensor of shape
+    # `(len(keys), tensor_size)` that is returned. It can be pinned or on another device.
     @decorators.check_closed
-    def multi_get(self, keys: Union[List[int], List[str]]) -> torch.Tensor:
-        packed_key = b""
-        if all(isinstance(key, int) for key in keys):
-            packed_key += packer.pack_bool(True)
-            packed_key += packer.pack_uint64_vector(keys)
-        elif all(isinstance(key, str) for key in keys):
-            packed_key += packer.pack_bool(False)
-            packed_key += packer.pack_string_vector(keys)
-        else:
-            raise TypeError(f"Key must be List[int] or List[str], got {type(keys)}")
+    def multi_get(self, keys: Union[List[int], List[str]], out: torch.Tensor | None = None) -> torch.Tensor:
+        num_keys, tensor_size = len(keys), self.tensor_size
+        if out is not None:
+            _check_out(out, (num_keys, tensor_size))
+        if self.cache is not None:
+            return self._cached_multi_get(keys, out)
+        packed_key = _pack_keys(keys)
 
         # Send request
         msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
         msg += packed_key
-        self.client._send(RequestType.TENSOR_STORE_MULTI_GET, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        lo, hi = 0, 8
-        vector_size = packer.unpack_uint64(data, lo, hi)
-        lo, hi = hi, hi + 4 * vector_size
-        return torch.tensor(
-            data=packer.unpack_float_vector(data, lo, hi),
-            dtype=torch.float32,
-        ).reshape(len(keys), self.tensor_size)
+        if out is not None:
+            return self._call(RequestType.TENSOR_STORE_MULTI_GET, msg, lambda data: _unpack_tensor(data, out))
+        return self._call(
+            RequestType.TENSOR_STORE_MULTI_GET, msg, lambda data: _unpack_tensor(data).reshape(num_keys, tensor_size)
+        )
 
     ## Returns the number of tensors in the store.
     @decorators.check_closed
     def size(self) -> int:
-        # Send request
-        msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
-        self.client._send(RequestType.TENSOR_STORE_SIZE, msg)
-
-        # Handle response
-        data, _ = self.client._recv()
-        return packer.unpack_uint64(data, 0, 8)
-
-    def _open(self) -> None:
+        return self._call(RequestType.TENSOR_STORE_SIZE, b"", _unpack_uint64)
+
+    ## Inserts a large number of tensors in chunks and returns the number of rows loaded.
+    #
+    # `source` is a 2-dimensional NumPy array, memmap or tensor of floats, with one row per
+    # key in `keys`, or an iterator of `(keys, tensors)` chunks, in which case `keys` must be
+    # `None`. Rows are sent as float32, so float64 sources are rounded, in chunks of about
+    # `chunk_bytes` bytes. Chunks are encoded and written over one connection by background
+    # threads, which keep `window` chunks in flight: the next chunk is written as soon as the
+    # oldest one is acknowledged, so encoding, sending and ingestion overlap.
+    #
+    # Loading starts at row `start`. When `checkpoint` is a file path, the number of rows
+    # acknowledged by the server is written there after every chunk and loading resumes from
+    # it if the file exists. The file is removed when the load completes. Inserting a key again
+    # replaces its tensor, so a load interrupted midway can safely be resumed.
+    #
+    # `progress`, if given, is called after every chunk with the number of rows loaded, the
+    # total number of rows if known, and the rows per second since the call began.
+    #
+    # Cached tensors, if any, are dropped from the cache.
+    @decorators.check_closed
+    def bulk_load(
+        self,
+        keys: Union[List[int], List[str], np.ndarray, torch.Tensor, range, None],
+        source: Union[np.ndarray, torch.Tensor, Iterable],
+        chunk_bytes: int = 8 << 20,
+        window: int = 2,
+        start: int = 0,
+        checkpoint: str | None = None,
+        progress: Callable[[int, int | None, float], Any] | None = None,
+    ) -> int:
+        if chunk_bytes <= 0:
+            raise ValueError(f"chunk_bytes must be positive integer, got {chunk_bytes}")
+        if window <= 0:
+            raise ValueError(f"window must be positive integer, got {window}")
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                start = max(start, int(file.read()))
+
+        tensor_size = self.tensor_size
+        chunk_rows = max(1, chunk_bytes // (4 * tensor_size))
+        chunks, total = _bulk_chunks(keys, source, chunk_rows, start)
+        encoded = (_pack_bulk_chunk(chunk_keys, rows, tensor_size) for chunk_keys, rows in chunks)
+        if self.cache is not None:
+            self.cache.clear()
+
+        try:
+            return self._bulk_load(encoded, window, start, total, checkpoint, progress)
+        finally:
+            # Reads made while loading may have cached tensors that were replaced
+            if self.cache is not None:
+                self.cache.clear()
+
+    def _bulk_load(
+        self,
+        encoded: Iterator[Tuple[int, bytes]],
+        window: int,
+        start: int,
+        total: int | None,
+        checkpoint: str | None,
+        progress: Callable[[int, int | None, float], Any] | None,
+    ) -> int:
+        offset = start
+        began = time.monotonic()
+        # Rows and record of every chunk written and not acknowledged yet, in order
+        in_flight: queue.Queue = queue.Queue()
+        slots = threading.Semaphore(window)
+        stop = threading.Event()
+        send_error: List[BaseException] = list()
+        done = object()
+
+        with self.client.connection() as client, client._lock:
+            if client._pipeline is not None:
+                client._pipeline.flush()
+            handle = packer.pack_uint64(self._handle(client))
+            sock, metrics = client._sock, client.metrics
+
+            # Writes the next chunk as soon as one of the `window` in flight is acknowledged
+            def send() -> None:
+                try:
+                    for num_rows, msg in _prefetch(encoded, window):
+                        slots.acquire()
+                        if stop.is_set():
+                            break
+                        data = handle + msg
+                        record = None if metrics is None else metrics._begin(RequestType.TENSOR_STORE_MULTI_INSERT, data)
+                        in_flight.put((num_rows, record))
+                        header = packer.pack_byte(RequestType.TENSOR_STORE_MULTI_INSERT) + packer.pack_uint64(len(data))
+                        try:
+                            sock.sendall(header + data)
+                        except BaseException:
+                            # A partially written chunk leaves the stream in an unknown state. The
+                            # shutdown wakes up the thread reading the acknowledgements, which
+                            # closes the client
+                            try:
+                                sock.shutdown(socket.SHUT_RDWR)
+                            except OSError:
+                                pass
+                            raise
+                        if record is not None:
+                            record.sent = time.perf_counter()
+                except BaseException as e:
+                    send_error.append(e)
+                finally:
+                    in_flight.put(done)
+
+            sender = threading.Thread(target=send, daemon=True)
+            sender.start()
+            error = None
+            try:
+                while True:
+                    item = in_flight.get()
+                    if item is done:
+                        break
+                    num_rows, record = item
+                    try:
+                        client._recv(record)
+                    except Exception as e:
+                        if client.is_closed():
+                            raise
+                        # The server failed this chunk, the acknowledgements of the chunks
+                        # already written are still read so the stream stays consistent
+                        if record is not None:
+                            metrics._end(record, e)
+                        if error is None:
+                            error = e
+                            stop.set()
+                        slots.release()
+                        continue
+                    if record is not None:
+                        metrics._end(record)
+                    slots.release()
+                    if error is not None:
+                        continue
+                    offset += num_rows
+                    if checkpoint is not None:
+                        _write_checkpoint(checkpoint, offset)
+                    if progress is not None:
+                        progress(offset, total, (offset - start) / max(time.monotonic() - began, 1e-9))
+            except BaseException:
+                # Server errors are handled above, so this is a failure of the client itself,
+                # such as `progress` raising or an interrupt. The acknowledgements of the chunks
+                # in flight are left unread, so the connection can not be used anymore
+                if not client.is_closed():
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                    client.close()
+                if checkpoint is not None:
+                    _write_checkpoint(checkpoint, offset)
+                raise
+            finally:
+                stop.set()
+                slots.release()
+                # A closed connection ends a write in progress with an error
+                if not client.is_closed():
+                    sender.join()
+        if error is None and send_error:
+            error = send_error[0]
+        if error is not None:
+            if checkpoint is not None:
+                _write_checkpoint(checkpoint, offset)
+            raise error
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return offset
+
+    ## Gets the tensors of a large number of keys in chunks, yielding `(keys, tensors)` pairs.
+    #
+    # Keys are requested in chunks of about `chunk_bytes` bytes of tensors, `window` chunks
+    # at a time over one connection, and the next window is fetched by a background thread
+    # while the current one is consumed. Chunks are yielded in order, each with its slice of
+    # `keys`, and no more than about `3 * window` chunks are held in memory, however many
+    # keys are requested. The connection is only held while a window is fetched, so other
+    # requests can go through it between windows.
+    #
+    # The cache, if any, is not used.
+    @decorators.check_closed
+    def iter_multi_get(
+        self,
+        keys: Union[List[int], List[str], np.ndarray, torch.Tensor, range],
+        chunk_bytes: int = 8 << 20,
+        window: int = 2,
+    ) -> Iterator[Tuple[Any, torch.Tensor]]:
+        return _prefetch(self._chunked_multi_get(keys, chunk_bytes, window, None), window)
+
+    ## Gets the tensors of a large number of keys in chunks, decoding them into `out`.
+    #
+    # `out` is a float32 array, memmap or tensor of shape `(len(keys), tensor_size)`, or the
+    # path of a `.npy` file that is created as a memmap. Chunks are fetched as in
+    # `iter_multi_get` and decoded straight into their rows of `out`, which is returned.
+    @decorators.check_closed
+    def multi_get_into(
+        self,
+        keys: Union[List[int], List[str], np.ndarray, torch.Tensor, range],
+        out: Union[str, np.ndarray, torch.Tensor],
+        chunk_bytes: int = 8 << 20,
+        window: int = 2,
+    ) -> Union[np.ndarray, torch.Tensor]:
+        shape = (len(keys), self.tensor_size)
+        if isinstance(out, str):
+            out = np.lib.format.open_memmap(out, mode="w+", dtype=np.float32, shape=shape)
+        rows = torch.from_numpy(out) if isinstance(out, np.ndarray) else out
+        _check_out(rows, shape)
+        for _ in _prefetch(self._chunked_multi_get(keys, chunk_bytes, window, rows), window):
+            pass
+        if isinstance(out, np.memmap):
+            out.flush()
+        return out
+
+    ## Writes the tensors of `keys` to a local file that `LocalTensorStore` can open.
+    #
+    # The file holds the distinct keys sorted, followed by their tensors as a contiguous
+    # float32 matrix. Keys must be integers, as the server gives no way to list the keys of a
+    # store they are usually the node ids of a `NodeIterator`. Tensors are fetched as in
+    # `multi_get_into` and written straight into the file, which only appears at `path` once
+    # it is complete. Returns the number of tensors written.
+    @decorators.check_closed
+    def export(
+        self,
+        path: str,
+        keys: Union[List[int], np.ndarray, torch.Tensor, range],
+        chunk_bytes: int = 8 << 20,
+        window: int = 2,
+    ) -> int:
+        keys = np.unique(_integer_keys(keys))
+        tensor_size = self.tensor_size
+        header = _LOCAL_HEADER + packer.pack_uint64(len(keys)) + packer.pack_uint64(tensor_size)
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(header)
+                file.write(keys.astype("<u8").tobytes())
+                file.truncate(len(header) + 8 * len(keys) + 4 * len(keys) * tensor_size)
+            if len(keys) > 0:
+                offset = len(header) + 8 * len(keys)
+                matrix = np.memmap(temp_path, dtype="<f4", mode="r+", offset=offset, shape=(len(keys), tensor_size))
+                self.multi_get_into(keys, matrix, chunk_bytes, window)
+                del matrix
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return len(keys)
+
+    # Fetches `keys` in pipelined windows of chunks, yielding the chunks once their window is
+    # read. Tensors are decoded into the rows of `out` if given
+    def _chunked_multi_get(
+        self, keys, chunk_bytes: int, window: int, out: torch.Tensor | None
+    ) -> Iterator[Tuple[Any, torch.Tensor]]:
+        if chunk_bytes <= 0:
+            raise ValueError(f"chunk_bytes must be positive integer, got {chunk_bytes}")
+        if window <= 0:
+            raise ValueError(f"window must be positive integer, got {window}")
+        keys = _sliceable_keys(keys)
+        tensor_size = self.tensor_size
+        chunk_rows = max(1, chunk_bytes // (4 * tensor_size))
+
+        def decoder(lo: int, hi: int) -> Callable[[bytearray], torch.Tensor]:
+            if out is not None:
+                return lambda data: _unpack_tensor(data, out[lo:hi])
+            return lambda data: _unpack_tensor(data).reshape(hi - lo, tensor_size)
+
+        for window_lo in range(0, len(keys), chunk_rows * window):
+            window_hi = min(window_lo + chunk_rows * window, len(keys))
+            with self.client.connection() as client:
+                handle = packer.pack_uint64(self._handle(client))
+                results = list()
+                with client.pipeline(window):
+                    for lo in range(window_lo, window_hi, chunk_rows):
+                        hi = min(lo + chunk_rows, window_hi)
+                        msg = handle + _pack_keys(keys[lo:hi])
+                        result = client._call(RequestType.TENSOR_STORE_MULTI_GET, msg, decoder(lo, hi))
+                        results.append((keys[lo:hi], result))
+            for chunk_keys, result in results:
+                yield chunk_keys, result.result()
+
+    def _cached_get(self, key: Union[int, str], packed_key: bytes, out: torch.Tensor | None) -> torch.Tensor:
+        row = torch.empty(1, self.tensor_size, dtype=torch.float32)
+        missing, generation = self.cache._get([key], row)
+        if len(missing) == 0:
+            return self._resolved(row[0] if out is None else out.copy_(row[0]))
+
+        def decode(data: bytearray) -> torch.Tensor:
+            tensor = _unpack_tensor(data)
+            self.cache._put([key], tensor.reshape(1, -1), generation)
+            return tensor if out is None else out.copy_(tensor)
+
+        return self._call(RequestType.TENSOR_STORE_GET, packed_key, decode)
+
+    # Serves the cached keys and fetches the others, each distinct key once
+    def _cached_multi_get(self, keys: Union[List[int], List[str]], out: torch.Tensor | None) -> torch.Tensor:
+        unique_keys, inverse = _unique_keys(keys)
+        # Rows are written straight into `out` when it maps one to one to the distinct keys
+        if out is not None and inverse is None and out.device.type == "cpu":
+            rows = out
+        else:
+            rows = torch.empty(len(unique_keys), self.tensor_size, dtype=torch.float32)
+        missing, generation = self.cache._get(unique_keys, rows)
+
+        def result() -> torch.Tensor:
+            value = rows if inverse is None else rows[inverse]
+            return value if out is None or value is out else out.copy_(value)
+
+        if len(missing) == 0:
+            return self._resolved(result())
+        missing_keys = [unique_keys[i] for i in missing.tolist()]
+
+        def decode(data: bytearray) -> torch.Tensor:
+            if len(missing_keys) == len(unique_keys):
+                fetched = _unpack_tensor(data, rows)
+            else:
+                fetched = _unpack_tensor(data).reshape(len(missing_keys), self.tensor_size)
+                rows[torch.from_numpy(missing)] = fetched
+            self.cache._put(missing_keys, fetched, generation)
+            return result()
+
+        return self._call(RequestType.TENSOR_STORE_MULTI_GET, _pack_keys(missing_keys), decode)
+
+    # Drops `keys` from the cache before they are written. Returns the decoding of the write
+    # acknowledgement, which drops them again: a read made on another connection while the write
+    # was in flight may have cached the old tensors
+    def _invalidate(self, keys) -> Callable[[bytearray], None] | None:
+        if self.cache is None:
+            return None
+        keys = _unique_keys(keys)[0]
+        self.cache._invalidate(keys)
+
+        def decode(_: bytearray) -> None:
+            self.cache._invalidate(keys)
+
+        return decode
+
+    # Returns a value served without a request, as a resolved `PipelineResult` in pipelined mode
+    def _resolved(self, value: Any) -> Any:
+        return _resolved(self.client, value)
+
+    # Makes a request prefixed with the handle of the store in the connection it goes through
+    def _call(self, request_type: RequestType, msg: bytes, decode: Callable[[bytearray], Any] | None) -> Any:
+        with self.client.connection() as client:
+            return client._call(request_type, packer.pack_uint64(self._handle(client)) + msg, decode)
+
+    # Returns the handle of the store in `client`, opening the store there on first use. The
+    # store is opened holding the lock of the connection only, so first uses on different
+    # connections do not wait for each other
+    def _handle(self, client: "MDBClient") -> int:
+        with self._lock:
+            tensor_store_id = self._tensor_store_ids.get(client)
+        if tensor_store_id is not None:
+            return tensor_store_id
+        with client._lock:
+            with self._lock:
+                tensor_store_id = self._tensor_store_ids.get(client)
+            if tensor_store_id is None:
+                tensor_store_id = self._open(client)
+                with self._lock:
+                    self._tensor_store_ids[client] = tensor_store_id
+            return tensor_store_id
+
+    def _open(self, client: "MDBClient") -> int:
         # Send request
         msg = b""
         msg += packer.pack_string(self.name)
-        self.client._send(RequestType.TENSOR_STORE_OPEN, msg)
+        data, _ = client._request(RequestType.TENSOR_STORE_OPEN, msg)
 
         # Handle response
-        data, _ = self.client._recv()
         lo, hi = 0, 8
-        self._tensor_store_id = packer.unpack_uint64(data, lo, hi)
+        tensor_store_id = packer.unpack_uint64(data, lo, hi)
         lo, hi = hi, hi + 8
         self.tensor_size = packer.unpack_uint64(data, lo, hi)
-        self._closed = False
+        return tensor_store_id
 
     def _close(self) -> None:
+        with self._lock:
+            handles = list(self._tensor_store_ids.items())
+            self._tensor_store_ids.clear()
+        for client, tensor_store_id in handles:
+            # A pooled connection is closed while checked out, so no other thread is using it
+            if isinstance(self.client, MDBClientPool):
+                with self.client._checkout(client) as acquired:
+                    if acquired:
+                        self._close_handle(client, tensor_store_id)
+            # Handles die with their connection
+            elif not client.is_closed():
+                self._close_handle(client, tensor_store_id)
+        self.tensor_size = None
+        self._closed = True
+
+    def _close_handle(self, client: "MDBClient", tensor_store_id: int) -> None:
         # Send request
         msg = b""
-        msg += packer.pack_uint64(self._tensor_store_id)
-        self.client._send(RequestType.TENSOR_STORE_CLOSE, msg)
+        msg += packer.pack_uint64(tensor_store_id)
+        client._request(RequestType.TENSOR_STORE_CLOSE, msg)
 
-        # Handle response
-        self.client._recv()
-        self.tensor_size = None
-        self._tensor_store_id = None
+
+## Asyncio counterpart of `TensorStore`.
+#
+# Opening a store needs a round trip, so instances are created with `await AsyncTensorStore.open(client, name)`.
+class AsyncTensorStore:
+    ## Returns `True` if the store exists.
+    @staticmethod
+    async def exists(client: "AsyncMDBClient", name: str) -> bool:
+        data, _ = await client._request(RequestType.TENSOR_STORE_EXISTS, packer.pack_string(name))
+        return packer.unpack_bool(data, 0)
+
+    ## Creates a new store on disk.
+    @staticmethod
+    async def create(client: "AsyncMDBClient", name: str, tensor_size: int) -> None:
+        if tensor_size <= 0:
+            raise ValueError(f"tensor_size must be positive integer, got {tensor_size}")
+        msg = b""
+        msg += packer.pack_uint64(tensor_size)
+        msg += packer.pack_string(name)
+        await client._request(RequestType.TENSOR_STORE_CREATE, msg)
+
+    ## Removes a store from disk.
+    @staticmethod
+    async def remove(client: "AsyncMDBClient", name: str) -> None:
+        await client._request(RequestType.TENSOR_STORE_REMOVE, packer.pack_string(name))
+
+    ## Opens an existing store.
+    @classmethod
+    async def open(cls, client: "AsyncMDBClient", name: str) -> "AsyncTensorStore":
+        data, _ = await client._request(RequestType.TENSOR_STORE_OPEN, packer.pack_string(name))
+        lo, hi = 0, 8
+        tensor_store_id = packer.unpack_uint64(data, lo, hi)
+        lo, hi = hi, hi + 8
+        tensor_size = packer.unpack_uint64(data, lo, hi)
+        return cls(client, name, tensor_store_id, tensor_size)
+
+    ## Constructor, use `open` instead.
+    def __init__(self, client: "AsyncMDBClient", name: str, tensor_store_id: int, tensor_size: int) -> None:
+        ## Client instance.
+        self.client = client
+        ## Name of the store.
+        self.name = name
+        ## Fixed size for the tensors.
+        self.tensor_size = tensor_size
+
+        self._tensor_store_id = tensor_store_id
+        self._closed = False
+
+    ## Returns `True` if the store is open.
+    def is_closed(self) -> bool:
+        return self._closed
+
+    ## Closes the store.
+    async def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            await self._request(RequestType.TENSOR_STORE_CLOSE, b"")
+            self.tensor_size = None
+
+    ## Enter context manager.
+    async def __aenter__(self) -> "AsyncTensorStore":
+        return self
+
+    ## Exit context manager.
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    ## Returns `True` if the store contains the given key.
+    @decorators.check_closed
+    async def contains(self, key: Union[int, str]) -> bool:
+        data, _ = await self._request(RequestType.TENSOR_STORE_CONTAINS, _pack_key(key))
+        return packer.unpack_bool(data, 0)
+
+    ## Inserts a tensor into the store.
+    @decorators.check_closed
+    async def insert(self, key: Union[int, str], tensor: torch.Tensor) -> None:
+        msg = _pack_key(key) + _pack_tensor(tensor)
+        await self._request(RequestType.TENSOR_STORE_INSERT, msg)
+
+    ## Inserts multiple tensors into the store.
+    @decorators.check_closed
+    async def multi_insert(self, keys: Union[List[int], List[str]], tensors: torch.Tensor) -> None:
+        msg = _pack_keys(keys) + _pack_tensors(tensors)
+        await self._request(RequestType.TENSOR_STORE_MULTI_INSERT, msg)
+
+    ## Gets a tensor from the store, decoded into `out` if given as with `TensorStore.get`.
+    @decorators.check_closed
+    async def get(self, key: Union[int, str], out: torch.Tensor | None = None) -> torch.Tensor:
+        if out is not None:
+            _check_out(out, (self.tensor_size,))
+        data, _ = await self._request(RequestType.TENSOR_STORE_GET, _pack_key(key))
+        return _unpack_tensor(data, out)
+
+    ## Gets multiple tensors from the store, decoded into `out` if given as with `TensorStore.multi_get`.
+    @decorators.check_closed
+    async def multi_get(self, keys: Union[List[int], List[str]], out: torch.Tensor | None = None) -> torch.Tensor:
+        if out is not None:
+            _check_out(out, (len(keys), self.tensor_size))
+        data, _ = await self._request(RequestType.TENSOR_STORE_MULTI_GET, _pack_keys(keys))
+        if out is not None:
+            return _unpack_tensor(data, out)
+        return _unpack_tensor(data).reshape(len(keys), self.tensor_size)
+
+    ## Returns the number of tensors in the store.
+    @decorators.check_closed
+    async def size(self) -> int:
+        data, _ = await self._request(RequestType.TENSOR_STORE_SIZE, b"")
+        return packer.unpack_uint64(data, 0, 8)
+
+    async def _request(self, request_type: RequestType, msg: bytes) -> Tuple[bytearray, StatusCode]:
+        return await self.client._request(request_type, packer.pack_uint64(self._tensor_store_id) + msg)
+
+
+## Read-only store of the tensors written by `TensorStore.export`, served from a local file.
+#
+# The file is memory-mapped, so reading tensors is a binary search of the sorted keys and a
+# copy from the page cache, and processes of the same host opening the same file share its
+# memory. Instances can be pickled, for instance to `DataLoader` workers, and the file is
+# mapped again where they are unpickled. Only integer keys are supported.
+class LocalTensorStore:
+    ## Constructor.
+    def __init__(self, path: str) -> None:
+        ## Path of the file.
+        self.path = path
+
+        with open(path, "rb") as file:
+            header = file.read(len(_LOCAL_HEADER) + 16)
+        if header[: len(_LOCAL_HEADER)] != _LOCAL_HEADER:
+            raise ValueError(f"{path} is not a file written by TensorStore.export")
+        lo, hi = len(_LOCAL_HEADER), len(_LOCAL_HEADER) + 8
+        num_keys = packer.unpack_uint64(header, lo, hi)
+        lo, hi = hi, hi + 8
+        ## Fixed size for the tensors.
+        self.tensor_size = packer.unpack_uint64(header, lo, hi)
+
+        if num_keys > 0:
+            self._keys = np.memmap(path, dtype="<u8", mode="r", offset=hi, shape=(num_keys,))
+            offset = hi + 8 * num_keys
+            self._tensors = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(num_keys, self.tensor_size))
+        else:
+            # Empty memmaps are not allowed
+            self._keys = np.empty(0, dtype=np.uint64)
+            self._tensors = np.empty((0, self.tensor_size), dtype=np.float32)
+        self._closed = False
+
+    ## Sorted keys of the store, as a read-only array.
+    @property
+    def keys(self) -> np.ndarray:
+        return self._keys
+
+    ## Returns `True` if the store is open.
+    def is_closed(self) -> bool:
+        return self._closed
+
+    ## Closes the store.
+    def close(self) -> None:
+        self._keys, self._tensors = None, None
         self._closed = True
+
+    ## Returns the number of tensors in the store.
+    def __len__(self) -> int:
+        return self.size()
+
+    ## Enter context manager.
+    def __enter__(self):
+        return self
+
+    ## Exit context manager.
+    def __exit__(self, *_):
+        self.close()
+
+    def __reduce__(self):
+        return self.__class__, (self.path,)
+
+    ## Get tensors from the store with the pythonic syntax `store[key]`.
+    def __getitem__(self, key: Union[int, List[int]]) -> torch.Tensor:
+        if isinstance(key, Iterable):
+            return self.multi_get(key)
+        else:
+            return self.get(key)
+
+    ## Returns `True` if the store contains the given key with the pythonic syntax `key in store`.
+    def __contains__(self, key: int) -> bool:
+        return self.contains(key)
+
+    ## Returns `True` if the store contains the given key.
+    @decorators.check_closed
+    def contains(self, key: int) -> bool:
+        if not isinstance(key, Integral):
+            raise TypeError(f"Key must be int, got {type(key)}")
+        if key < 0:
+            return False
+        i = np.searchsorted(self._keys, np.uint64(key))
+        return bool(i < len(self._keys) and self._keys[i] == key)
+
+    ## Gets a tensor from the store, into `out` if given.
+    @decorators.check_closed
+    def get(self, key: int, out: torch.Tensor | None = None) -> torch.Tensor:
+        if not isinstance(key, Integral):
+            raise TypeError(f"Key must be int, got {type(key)}")
+        if out is not None:
+            _check_out(out, (self.tensor_size,))
+        tensor = torch.from_numpy(np.array(self._tensors[self._rows([key])[0]]))
+        return tensor if out is None else out.copy_(tensor)
+
+    ## Gets multiple tensors from the store, into `out` if given.
+    #
+    # Keys are looked up together with a single vectorized search. `out` is a float32 tensor of
+    # shape `(len(keys), tensor_size)`.
+    @decorators.check_closed
+    def multi_get(
+        self, keys: Union[List[int], np.ndarray, torch.Tensor], out: torch.Tensor | None = None
+    ) -> torch.Tensor:
+        rows = self._rows(keys)
+        if out is None:
+            return torch.from_numpy(self._tensors.take(rows, axis=0))
+        _check_out(out, (len(rows), self.tensor_size))
+        if out.device.type == "cpu" and out.is_contiguous():
+            self._tensors.take(rows, axis=0, out=out.detach().numpy())
+        else:
+            out.copy_(torch.from_numpy(self._tensors.take(rows, axis=0)))
+        return out
+
+    ## Returns the number of tensors in the store.
+    @decorators.check_closed
+    def size(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={self.path!r}, size={len(self)}, tensor_size={self.tensor_size})"
+
+    # Returns the rows of `keys`, raising `KeyError` for the first missing one
+    def _rows(self, keys) -> np.ndarray:
+        keys = _integer_keys(keys).astype(np.uint64, copy=False)
+        rows = np.searchsorted(self._keys, keys)
+        if len(self._keys) == 0:
+            found = np.zeros(len(keys), dtype=bool)
+        else:
+            found = self._keys.take(np.minimum(rows, len(self._keys) - 1)) == keys
+        if not found.all():
+            raise KeyError(f"Key {keys[np.argmin(found)]} not found in the tensor store")
+        return rows
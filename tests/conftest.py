@@ -0,0 +1,27 @@
+import pytest
+
+from pymilldb import MDBClient
+from pymilldb.stand_in_server import StandInServer, SyntheticGraph
+
+
+@pytest.fixture(scope="session")
+def graph() -> SyntheticGraph:
+    return SyntheticGraph(num_nodes=1_000, avg_degree=8)
+
+
+@pytest.fixture
+def server(graph):
+    with StandInServer(graph, seed=0) as server:
+        server.start()
+        yield server
+
+
+# Every test taking a client runs over TCP and over a socket pair
+@pytest.fixture(params=["tcp", "socketpair"])
+def client(request, server):
+    if request.param == "tcp":
+        client = MDBClient(*server.address)
+    else:
+        client = server.connect()
+    with client:
+        yield client
@@ -0,0 +1,64 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+import torch
+
+from pymilldb import AsyncMDBClient, AsyncSampler, AsyncTensorStore
+from pymilldb.protocol import BUFFER_SIZE, END_MASK
+
+
+def test_requests(server):
+    async def main():
+        async with AsyncMDBClient(*server.address) as client:
+            samples = await asyncio.gather(*(AsyncSampler(client).subgraph(4, [3]) for _ in range(4)))
+        assert all(sample.num_seeds == 4 for sample in samples)
+
+    asyncio.run(main())
+
+
+# Answers the first request with a frame whose status code is unknown
+def _serve_invalid_status(sock: socket.socket) -> None:
+    sock.recv(BUFFER_SIZE)
+    sock.sendall(bytes([END_MASK | 0b0011_1111, 3, 0]).ljust(BUFFER_SIZE, b"\0"))
+
+
+def test_invalid_response_fails_pending_requests():
+    client_sock, server_sock = socket.socketpair()
+    threading.Thread(target=_serve_invalid_status, args=(server_sock,), daemon=True).start()
+
+    async def main():
+        client = await AsyncMDBClient(sock=client_sock).connect()
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(AsyncSampler(client).subgraph(4, [3]), 1.0)
+        assert client.is_closed()
+        with pytest.raises(Exception, match="closed"):
+            await AsyncSampler(client).subgraph(4, [3])
+
+    asyncio.run(main())
+    server_sock.close()
+
+
+def test_close_awaits_the_reader(server):
+    async def main():
+        client = await AsyncMDBClient(*server.address).connect()
+        reader = client._reader_task
+        await client.close()
+        assert reader.done()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("fused", [True, False])
+def test_sample_with_features(server, fused):
+    async def main():
+        async with AsyncMDBClient(*server.address) as client:
+            await AsyncTensorStore.create(client, "features", 2)
+            async with await AsyncTensorStore.open(client, "features") as store:
+                node_ids = server.graph.node_ids.tolist()
+                await store.multi_insert(node_ids, torch.arange(2.0 * len(node_ids)).reshape(-1, 2))
+                sample, tensors = await AsyncSampler(client).sample_with_features(8, [4, 3], store, fused=fused)
+                assert torch.equal(tensors, await store.multi_get(sample.node_ids.tolist()))
+
+    asyncio.run(main())
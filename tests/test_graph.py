@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from pymilldb import EdgeTable, GraphBuilder, GraphWalker
+from pymilldb.pipeline import PipelineResult
+from pymilldb.resolver import NameResolver
+
+
+def edge_tuples(edges):
+    return [(edge.edge_id, edge.source, edge.target, edge.edge_type, edge.properties) for edge in edges]
+
+
+def test_pipelined_lookups(client, graph):
+    walker = GraphWalker(client)
+    with client.pipeline() as pipeline:
+        results = [walker.get_node(int(node_id)) for node_id in graph.node_ids[:10]]
+        assert all(isinstance(result, PipelineResult) for result in results)
+        assert len(pipeline) == 10
+    assert [result.result().name for result in results] == [f"Q{i}" for i in range(10)]
+    assert walker.get_node("Q3").name == "Q3"
+
+
+def test_pipelined_errors_are_stored_in_their_results(client):
+    walker = GraphWalker(client)
+    with client.pipeline():
+        first = walker.get_node("Q1")
+        missing = walker.get_node("missing")
+        last = walker.get_node("Q2")
+        assert isinstance(missing.exception(), Exception)
+    assert first.result().name == "Q1" and last.result().name == "Q2"
+
+    # An error that was never retrieved is raised when the block exits
+    with pytest.raises(Exception, match="not found"):
+        with client.pipeline():
+            walker.get_node("missing")
+    assert walker.get_node("Q1").name == "Q1"
+
+
+def test_edge_table_matches_the_edges(client):
+    walker = GraphWalker(client)
+    for direction in ["outgoing", "incoming"]:
+        edges = walker.get_edges("Q7", direction)
+        table = walker.get_edges("Q7", direction, columnar=True)
+        assert isinstance(table, EdgeTable) and len(table) == len(edges) > 0
+        assert table.edge_id.dtype == np.uint64 and table.source.dtype == np.int64
+        assert edge_tuples(table) == edge_tuples(edges)
+        assert edge_tuples(table[1:3]) == edge_tuples(edges[1:3])
+        assert table.types() == [edge.edge_type for edge in edges]
+
+
+def test_batched_lookups_match_single_lookups(client, graph):
+    walker = GraphWalker(client)
+    keys = ["Q5", "Q9", "Q5"]
+    assert [node.name for node in walker.get_nodes(keys)] == keys
+    assert [node.name for node in walker.get_nodes(graph.node_ids[[5, 9]])] == ["Q5", "Q9"]
+
+    offsets, table = walker.get_edges_many(keys, "outgoing", columnar=True)
+    _, edges = walker.get_edges_many(keys, "outgoing")
+    assert edge_tuples(table) == edge_tuples(edges)
+    for i, key in enumerate(keys):
+        assert edge_tuples(edges[offsets[i] : offsets[i + 1]]) == edge_tuples(walker.get_edges(key, "outgoing"))
+
+
+def test_name_resolver(client, graph):
+    resolver = NameResolver(client, max_size=2)
+    node_ids = graph.node_ids.tolist()
+    assert resolver.resolve(["Q1", 5, "Q2", "Q1"]).tolist() == [node_ids[1], 5, node_ids[2], node_ids[1]]
+    assert resolver.misses == 2 and len(resolver) == 2
+    resolver.resolve(["Q3"])
+    assert "Q1" not in resolver and "Q3" in resolver
+    with pytest.raises(KeyError, match="missing"):
+        resolver.resolve(["missing"])
+
+
+def test_add_nodes_from_rejects_invalid_and_repeated_names():
+    builder = GraphBuilder()
+    rejected = builder.add_nodes_from(
+        np.array(["a", "1b", "c", "a", "d_2", "_e"]),
+        labels=["x", "y", None, ["z", "w"], "x", "y"],
+        properties={"weight": [1.0, 2.0, np.nan, 4.0, 5.0, 6.0]},
+    )
+    assert rejected.tolist() == [1, 3, 5]
+    assert [(node.name, node.labels, node.properties) for node in builder.nodes] == [
+        ("a", ["x"], {"weight": 1.0}),
+        ("c", [], {}),
+        ("d_2", ["x"], {"weight": 5.0}),
+    ]
+
+    # Names of existing nodes are rejected too, while names only used by edges are not
+    builder.add_edges_from(["a"], ["f"], "t")
+    assert builder.add_nodes_from(["c", "f"]).tolist() == [0]
+    assert [node.name for node in builder.nodes] == ["a", "c", "d_2", "f"]
+
+
+def test_add_edges_from_rejects_invalid_endpoints():
+    builder = GraphBuilder()
+    rejected = builder.add_edges_from(["a", "b", "_c"], ["b", "2", "a"], ["t", "u", "t"])
+    assert rejected.tolist() == [1, 2]
+    assert [(edge.source, edge.target, edge.edge_type) for edge in builder.edges] == [("a", "b", "t")]
+    with pytest.raises(ValueError, match="targets"):
+        builder.add_edges_from(["a"], ["b", "c"], "t")
@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pymilldb import NodeIterator, PartitionedNodeIterator
+from pymilldb.protocol import RequestType
+
+
+def test_prefetched_batches(client, graph):
+    batches = list(NodeIterator(client, 64, prefetch=3, arrays=True))
+    assert all(isinstance(batch, np.ndarray) for batch in batches)
+    assert np.concatenate(batches).tolist() == graph.node_ids.tolist()
+
+
+def test_partitions_cover_every_node(client, graph):
+    node_ids = list()
+    for partition in range(3):
+        with NodeIterator(client, 100, partition=(partition, 3)) as nodes:
+            node_ids += [node_id for batch in nodes for node_id in batch]
+    assert node_ids == graph.node_ids.tolist()
+
+
+def test_partitioned_scan_without_server_partitions(client, server, graph):
+    del server._handlers[RequestType.NODE_ITERATOR_CREATE_PARTITION]
+    with PartitionedNodeIterator(client, 100, num_partitions=4) as nodes:
+        node_ids = np.concatenate(list(nodes))
+    assert node_ids.tolist() == graph.node_ids.tolist()
+
+
+# Makes the server fail the `call`-th creation of a partitioned iterator
+def fail_partition(server, call):
+    create = server._handlers[RequestType.NODE_ITERATOR_CREATE_PARTITION]
+    calls = itertools.count()
+
+    def handler(session, reader):
+        if next(calls) == call:
+            raise RuntimeError("partition failed")
+        return create(session, reader)
+
+    server._handlers[RequestType.NODE_ITERATOR_CREATE_PARTITION] = handler
+
+
+def test_partitioned_scan_raises_when_a_partition_fails(client, server):
+    # The first partition is created before the others, so this is one of the others
+    fail_partition(server, 1)
+    with PartitionedNodeIterator(client, 100, num_partitions=4) as nodes:
+        with pytest.raises(Exception, match="partition failed"):
+            list(nodes)
+
+
+def test_partitioned_scan_falls_back_once(client, server, graph):
+    fail_partition(server, 0)
+    with PartitionedNodeIterator(client, 100, num_partitions=4) as nodes:
+        node_ids = np.concatenate(list(nodes))
+    assert node_ids.tolist() == graph.node_ids.tolist()
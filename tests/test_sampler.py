@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import torch
+
+from pymilldb import MDBClient, PartitionedNodeIterator, Sampler, TensorCache, TensorStore
+from pymilldb.protocol import RequestType
+from pymilldb.sampler import GraphSample
+
+
+def test_stream_opens_connections_to_the_same_server(client):
+    with Sampler(client).stream(4, [3, 2], num_workers=2, num_samples=6) as stream:
+        samples = list(stream)
+    assert len(samples) == 6
+    assert all(sample.num_seeds == 4 for sample in samples)
+
+
+def test_partitioned_node_iterator_opens_connections_to_the_same_server(client, graph):
+    with PartitionedNodeIterator(client, 100, num_partitions=3) as iterator:
+        node_ids = sorted(node_id for batch in iterator for node_id in batch.tolist())
+    assert node_ids == graph.node_ids.tolist()
+
+
+def test_client_from_socket_without_connect_can_not_reconnect(server):
+    with MDBClient(sock=server.socketpair()) as client:
+        with Sampler(client).stream(4, [3, 2]) as stream:
+            with pytest.raises(ValueError, match="created from a socket"):
+                next(stream)
+
+
+def test_dataset_needs_an_address(server):
+    with server.connect() as client:
+        with pytest.raises(ValueError, match="created from a socket"):
+            Sampler(client).dataset(4, [3, 2])
+    with MDBClient(*server.address) as client:
+        dataset = Sampler(client).dataset(4, [3, 2], num_samples=2)
+        assert len(list(dataset)) == 2
+
+
+def test_local_edge_index_relabels_the_edges(client):
+    sample = Sampler(client).subgraph(8, [4, 3])
+    local = sample.local_edge_index
+    assert local.dtype == torch.int64 and local.shape == sample.edge_index.shape
+    assert np.array_equal(sample.node_ids[local.numpy()], sample.edge_index.numpy())
+    assert sample.seed_mask.sum() == sample.num_seeds == 8
+
+
+@pytest.mark.parametrize("node_ids", [np.array([40, 10, 30, 10, 20]), np.array([1 << 40, 7, 1 << 50, 7, -3])])
+def test_relabel_with_a_table_and_with_hashing(node_ids):
+    edge_index = torch.empty(2, 0, dtype=torch.int64)
+    sample = GraphSample(node_ids[:2], node_ids[2:], np.empty(0, dtype=np.uint64), edge_index)
+    # Repeated ids map to their first position
+    assert sample.relabel(node_ids[[4, 3, 0, 2]]).tolist() == [4, 1, 0, 2]
+    with pytest.raises(KeyError, match="not in the sample"):
+        sample.relabel(np.array([node_ids[0], 12345]))
+
+
+def test_to_csr_groups_the_edges_by_source(client):
+    sample = Sampler(client).subgraph(8, [4, 3])
+    indptr, indices, perm = sample.to_csr()
+    sources, targets = sample.local_edge_index.numpy()
+    assert indptr[-1] == sample.num_edges
+    for node in range(sample.num_nodes):
+        edges = perm[indptr[node] : indptr[node + 1]].numpy()
+        assert (sources[edges] == node).all()
+        assert np.array_equal(indices[indptr[node] : indptr[node + 1]].numpy(), targets[edges])
+
+
+@pytest.fixture
+def features(client, graph):
+    TensorStore.create(client, "features", 3)
+    store = TensorStore(client, "features")
+    tensors = torch.arange(3 * graph.num_nodes, dtype=torch.float32).reshape(-1, 3)
+    store.multi_insert(graph.node_ids.tolist(), tensors)
+    return store
+
+
+@pytest.mark.parametrize("fused", [True, False])
+def test_sample_with_features(client, features, fused):
+    sample, tensors = Sampler(client).sample_with_features(8, [4, 3], features, fused=fused)
+    assert tensors.shape == (sample.num_nodes, 3)
+    assert torch.equal(tensors, features.multi_get(sample.node_ids.tolist()))
+
+
+def test_sample_with_features_reads_cached_tensors(client, features):
+    store = TensorStore(client, "features", cache=TensorCache(1 << 20))
+    sample, tensors = Sampler(client).sample_with_features(8, [4, 3], store)
+    assert torch.equal(tensors, features.multi_get(sample.node_ids.tolist()))
+    assert all(node_id in store.cache for node_id in sample.node_ids.tolist())
+
+
+def test_sample_with_features_by_default_without_the_fused_request(client, server, features):
+    del server._handlers[RequestType.SAMPLER_SUBGRAPH_WITH_FEATURES]
+    sample, tensors = Sampler(client).sample_with_features(8, [4, 3], features)
+    assert torch.equal(tensors, features.multi_get(sample.node_ids.tolist()))
+    with pytest.raises(Exception, match="Unknown request type"):
+        Sampler(client).sample_with_features(8, [4, 3], features, fused=True)
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from pymilldb import ClientMetrics, MDBClient, MDBClientPool, TensorCache, TensorStore
+from pymilldb.stand_in_server import StandInServer
+
+
+@pytest.fixture
+def pool(server):
+    with MDBClientPool(*server.address, max_size=4) as pool:
+        yield pool
+
+
+def test_handles_are_opened_concurrently(graph):
+    with StandInServer(graph, latency=0.05) as server:
+        server.start()
+        with MDBClientPool(*server.address, max_size=4) as pool:
+            TensorStore.create(pool, "features", 4)
+            store = TensorStore(pool, "features")
+            barrier = threading.Barrier(4)
+
+            def open_handle():
+                with pool.connection() as client:
+                    barrier.wait()
+                    store._handle(client)
+                    barrier.wait()
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=open_handle) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # One round trip of 50 ms when the connections open the store at the same time
+            assert time.perf_counter() - start < 0.15
+            assert len(store._tensor_store_ids) == 4
+            store.close()
+
+
+def test_close_waits_for_checked_out_connections(pool):
+    TensorStore.create(pool, "features", 4)
+    store = TensorStore(pool, "features")
+    client = pool.acquire()
+    closer = threading.Thread(target=store.close)
+    closer.start()
+    closer.join(0.1)
+    assert closer.is_alive()
+    pool.release(client)
+    closer.join(1.0)
+    assert not closer.is_alive() and store.is_closed()
+
+
+def test_close_skips_closed_connections(pool):
+    TensorStore.create(pool, "features", 4)
+    store = TensorStore(pool, "features")
+    client = pool.acquire()
+    client.close()
+    pool.release(client)
+    store.close()
+    assert store.is_closed()
+
+
+def test_insert_drops_rows_cached_while_in_flight(client):
+    TensorStore.create(client, "features", 4)
+    store = TensorStore(client, "features", cache=TensorCache(1 << 20))
+    store.insert(1, torch.zeros(4))
+    row = torch.empty(1, 4)
+    with client.pipeline():
+        store.insert(1, torch.ones(4))
+        # A read of the old tensor on another connection, cached before the insert is acknowledged
+        _, generation = store.cache._get([1], row)
+        store.cache._put([1], torch.zeros(1, 4), generation)
+    assert 1 not in store.cache
+    assert torch.equal(store.get(1), torch.ones(4))
+    assert torch.equal(store.get(1), torch.ones(4))
+
+
+def test_cache_is_consistent_with_concurrent_writes(server):
+    with MDBClientPool(*server.address, max_size=4) as pool:
+        TensorStore.create(pool, "features", 4)
+        store = TensorStore(pool, "features", cache=TensorCache(1 << 20))
+        keys = list(range(16))
+        store.multi_insert(keys, torch.zeros(16, 4))
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                store.multi_get(keys)
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        for value in range(1, 20):
+            store.multi_insert(keys, torch.full((16, 4), float(value)))
+        stop.set()
+        for reader in readers:
+            reader.join()
+        assert torch.equal(store.multi_get(keys), torch.full((16, 4), 19.0))
+
+
+def test_bulk_load_keeps_the_window_in_flight(graph):
+    metrics = ClientMetrics()
+    in_flight, at_ack = [0], list()
+
+    def begin(record):
+        in_flight[0] += 1
+
+    def end(record):
+        in_flight[0] -= 1
+        at_ack.append(in_flight[0])
+
+    with StandInServer(graph, latency=0.01) as server:
+        client = MDBClient(sock=server.socketpair(), metrics=metrics)
+        TensorStore.create(client, "features", 4)
+        store = TensorStore(client, "features")
+        metrics.add_pre_hook(begin)
+        metrics.add_post_hook(end)
+        source = np.random.default_rng(0).random((400, 4), dtype=np.float32)
+        assert store.bulk_load(range(400), source, chunk_bytes=4 * 4 * 10, window=4) == 400
+        metrics.remove_pre_hook(begin)
+        metrics.remove_post_hook(end)
+        # The next chunk is written when the oldest one is acknowledged, not after the whole window
+        assert len(at_ack) == 40 and min(at_ack[:-4]) > 0
+        assert torch.equal(store.multi_get(list(range(400))), torch.from_numpy(source))
+
+
+def test_bulk_load_resumes_from_the_checkpoint(client, tmp_path):
+    TensorStore.create(client, "features", 4)
+    store = TensorStore(client, "features")
+    checkpoint = str(tmp_path / "checkpoint")
+
+    def chunks():
+        yield list(range(10)), np.ones((10, 4), dtype=np.float32)
+        yield list(range(10, 20)), np.ones((10, 5), dtype=np.float32)
+
+    with pytest.raises(ValueError):
+        store.bulk_load(None, chunks(), checkpoint=checkpoint)
+    with open(checkpoint) as file:
+        assert file.read() == "10"
+
+    source = np.arange(80, dtype=np.float32).reshape(20, 4)
+    assert store.bulk_load(range(20), source, chunk_bytes=4 * 4 * 3, checkpoint=checkpoint) == 20
+    assert not os.path.exists(checkpoint)
+    assert torch.equal(store.multi_get(list(range(10, 20))), torch.from_numpy(source[10:]))
+
+
+def test_bulk_load_server_error_keeps_the_connection(client, tmp_path):
+    TensorStore.create(client, "features", 4)
+    store = TensorStore(client, "features")
+    checkpoint = str(tmp_path / "checkpoint")
+    keys = ["Q1"] * 5 + ["missing"] * 5 + ["Q2"] * 10
+    with pytest.raises(Exception, match="not found"):
+        store.bulk_load(keys, np.ones((20, 4), dtype=np.float32), chunk_bytes=4 * 4 * 5, checkpoint=checkpoint)
+    with open(checkpoint) as file:
+        assert file.read() == "5"
+    assert not client.is_closed()
+    assert store.contains("Q1")
+
+
+def failing_progress(offset, total, rate):
+    raise RuntimeError("progress failed")
+
+
+def test_bulk_load_client_error_closes_the_connection(client):
+    TensorStore.create(client, "features", 4)
+    store = TensorStore(client, "features")
+    source = np.ones((100, 4), dtype=np.float32)
+    with pytest.raises(RuntimeError, match="progress failed"):
+        store.bulk_load(range(100), source, chunk_bytes=4 * 4 * 10, window=4, progress=failing_progress)
+    # The acknowledgements of the chunks in flight were not read, so no later request reads them
+    assert client.is_closed()
+    with pytest.raises(Exception, match="closed"):
+        store.multi_get([1, 2])
+
+
+def test_bulk_load_client_error_discards_the_pooled_connection(graph):
+    with StandInServer(graph, latency=0.01) as server:
+        server.start()
+        with MDBClientPool(*server.address, max_size=1) as pool:
+            TensorStore.create(pool, "features", 4)
+            store = TensorStore(pool, "features")
+            source = np.ones((100, 4), dtype=np.float32)
+            with pytest.raises(RuntimeError, match="progress failed"):
+                store.bulk_load(range(100), source, chunk_bytes=4 * 4 * 10, window=4, progress=failing_progress)
+            assert torch.equal(store.multi_get([1, 2]), torch.ones(2, 4))
+
+
+def test_close_in_the_thread_holding_the_connection(pool):
+    TensorStore.create(pool, "features", 4)
+    store = TensorStore(pool, "features")
+    with pool.connection() as client:
+        store._handle(client)
+        closer = threading.Thread(target=store.close)
+        closer.start()
+        closer.join(0.1)
+        # Another thread waits for the connection, the thread holding it does not
+        assert closer.is_alive()
+    closer.join(1.0)
+    assert not closer.is_alive()
+
+    store = TensorStore(pool, "features")
+    with pool.connection() as client:
+        store._handle(client)
+        store.close()
+        assert store.is_closed() and not client.is_closed()
+        # The handle was closed on the connection, which is still in sync
+        assert TensorStore(client, "features").size() == 0